@@ -16,6 +16,8 @@ DATASET_YAML = DATASET_DIR / "data.yaml"
 DATASET_TRAIN = DATASET_DIR / "train/images"
 DATASET_VAL = DATASET_DIR / "val/images"
 DATASET_TEST = DATASET_DIR / "test/images"
+# File extensions treated as images by training, evaluation, streaming and batch uploads
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
 
 # ----------------------------------------------------------------------------
 # Roboflow settings (update ROBOFLOW_API_KEY before running download script)
@@ -34,10 +36,74 @@ YOLO_BASE_MODEL = "yolov8n.pt"
 CONFIDENCE_THRESHOLD = 0.25
 IOU_THRESHOLD = 0.45
 IMAGE_SIZE = 640
+# Tiled YOLO inference for large scenes: tile edge and pixels shared by neighbouring tiles.
+YOLO_TILE_SIZE = int(os.getenv("YOLO_TILE_SIZE", "640"))
+YOLO_TILE_OVERLAP = int(os.getenv("YOLO_TILE_OVERLAP", "128"))
 BATCH_SIZE = 16
 LEARNING_RATE = 0.001
 PATIENCE = 10
 
+# ----------------------------------------------------------------------------
+# Model registry (named segmentation/detection versions, see src/models/registry.py)
+# ----------------------------------------------------------------------------
+# JSON list of model specs; without it only the built-in DeepLab model is registered.
+MODEL_REGISTRY_PATH = Path(os.getenv("MODEL_REGISTRY_PATH", str(MODEL_DIR / "registry.json")))
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "deeplab-muad")
+# Optional candidate version receiving CANDIDATE_TRAFFIC_SHARE (0..1) of requests.
+CANDIDATE_MODEL = os.getenv("CANDIDATE_MODEL", "")
+CANDIDATE_TRAFFIC_SHARE = float(os.getenv("CANDIDATE_TRAFFIC_SHARE", "0.0"))
+# Also run the candidate in the background on default-routed requests and compare outputs.
+CANDIDATE_SHADOW = os.getenv("CANDIDATE_SHADOW", "0") == "1"
+# Loaded models beyond this budget are unloaded least-recently-used first.
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "4096"))
+# Bearer token for POST /api/models/default and /api/models/candidate; empty disables them.
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN", "")
+# Serve the built-in model with a NumPy stand-in (offline load tests, demos).
+USE_STUB_MODEL = os.getenv("USE_STUB_MODEL", "0") == "1"
+# Emulated CPU time per image for the stand-in model.
+STUB_MODEL_LATENCY_MS = float(os.getenv("STUB_MODEL_LATENCY_MS", "50"))
+
+# ----------------------------------------------------------------------------
+# Model artifact store (seed with `python -m src.seed_models`)
+# ----------------------------------------------------------------------------
+# Absolute, so every working directory shares one copy of each download.
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", str(PROJECT_ROOT / ".cache" / "models"))).absolute()
+# Never contact the Hugging Face Hub; missing artifacts are an error.
+MODEL_OFFLINE = os.getenv("MODEL_OFFLINE", "0") == "1"
+
+# ----------------------------------------------------------------------------
+# Training acceleration (used by `python -m src.train --accelerate`)
+# ----------------------------------------------------------------------------
+# Dataloader workers; 0 means "size to the CPU count".
+TRAIN_WORKERS = int(os.getenv("TRAIN_WORKERS", "0"))
+# Upper bound for workers regardless of core count (Ultralytics spawns one
+# process per worker, so very high counts only add memory pressure).
+TRAIN_MAX_WORKERS = 16
+# Share of currently available RAM the decoded image cache may occupy before
+# falling back to the on-disk .npy cache.
+TRAIN_CACHE_RAM_FRACTION = 0.5
+
+# ----------------------------------------------------------------------------
+# Hyperparameter sweeps (used by `python -m src.sweep`)
+# ----------------------------------------------------------------------------
+SWEEP_DB_PATH = LOGS_DIR / "sweeps.sqlite3"
+SWEEP_PROJECT_DIR = PROJECT_ROOT / "runs" / "sweeps"
+# CPU threads given to each trial; concurrent trials = cores // this value.
+SWEEP_THREADS_PER_TRIAL = int(os.getenv("SWEEP_THREADS_PER_TRIAL", "4"))
+# Hard cap on concurrent trials; 0 means "derive from the CPU count only".
+SWEEP_MAX_PARALLEL = int(os.getenv("SWEEP_MAX_PARALLEL", "0"))
+# Median pruning: compare from this epoch on, once enough trials reported it.
+SWEEP_PRUNE_WARMUP_EPOCHS = 3
+SWEEP_PRUNE_MIN_TRIALS = 3
+SWEEP_METRIC = "metrics/mAP50-95(B)"
+SWEEP_SEARCH_SPACE = {
+    "epochs": 30,
+    "imgsz": {"choice": [512, 640]},
+    "batch": {"choice": [8, 16]},
+    "lr0": {"loguniform": [1e-4, 1e-2]},
+    "patience": {"choice": [5, 10]},
+}
+
 # ----------------------------------------------------------------------------
 # Classes
 # ----------------------------------------------------------------------------
@@ -53,6 +119,56 @@ ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "tif", "tiff"}
 UPLOAD_FOLDER = PROJECT_ROOT / "static" / "uploads"
 DETECTIONS_FOLDER = PROJECT_ROOT / "static" / "detections"
 REPORTS_FOLDER = PROJECT_ROOT / "reports"
+# Concurrent inference jobs in DetectionManager; 0 means "one per CPU core".
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+# DeepLab worker processes, each with its own model and pinned cores; 0 runs in-process.
+INFERENCE_PROCESSES = int(os.getenv("INFERENCE_PROCESSES", "0"))
+# TensorFlow intra-op threads per worker process; 0 splits the available cores evenly.
+INFERENCE_THREADS_PER_PROCESS = int(os.getenv("INFERENCE_THREADS_PER_PROCESS", "0"))
+INFERENCE_INTER_OP_THREADS = int(os.getenv("INFERENCE_INTER_OP_THREADS", "1"))
+INFERENCE_PIN_CORES = os.getenv("INFERENCE_PIN_CORES", "1") == "1"
+# Keep a copy of each upload in UPLOAD_FOLDER (written in the background).
+PERSIST_UPLOADS = os.getenv("PERSIST_UPLOADS", "1") == "1"
+# Storage of probability maps kept with results: "float32" (dense), "uint8" or "float16".
+PROB_MAP_DTYPE = os.getenv("PROB_MAP_DTYPE", "uint8")
+# Static water masks per area: <area>.png (non-zero = water) or <area>.json polygons.
+ROI_MASKS_DIR = Path(os.getenv("ROI_MASKS_DIR", str(PROJECT_ROOT / "roi")))
+
+# ----------------------------------------------------------------------------
+# Batch API (/api/batch): request body limit applies to that endpoint only
+# ----------------------------------------------------------------------------
+BATCH_MAX_CONTENT_LENGTH = int(os.getenv("BATCH_MAX_CONTENT_LENGTH", str(2 * 1024 ** 3)))  # 2 GB
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "1000"))
+BATCH_MAX_FILE_BYTES = int(os.getenv("BATCH_MAX_FILE_BYTES", str(64 * 1024 ** 2)))
+# Uncompressed total per request (guards against archive bombs).
+BATCH_MAX_TOTAL_BYTES = int(os.getenv("BATCH_MAX_TOTAL_BYTES", str(4 * 1024 ** 3)))
+# Zip archives need random access: kept in memory up to this size, then spooled to disk.
+BATCH_ZIP_SPOOL_BYTES = int(os.getenv("BATCH_ZIP_SPOOL_BYTES", str(64 * 1024 ** 2)))
+# Images per inference batch and images decoded/queued ahead of the response.
+BATCH_INFERENCE_SIZE = int(os.getenv("BATCH_INFERENCE_SIZE", "8"))
+BATCH_MAX_IN_FLIGHT = int(os.getenv("BATCH_MAX_IN_FLIGHT", "32"))
+
+# ----------------------------------------------------------------------------
+# Storage lifecycle for UPLOAD_FOLDER, DETECTIONS_FOLDER and REPORTS_FOLDER
+# ----------------------------------------------------------------------------
+STORAGE_SWEEPER_ENABLED = os.getenv("STORAGE_SWEEPER_ENABLED", "1") == "1"
+STORAGE_SWEEP_INTERVAL_SECONDS = 600
+# Total budget across the managed folders; oldest files are evicted beyond it.
+STORAGE_MAX_BYTES = int(os.getenv("STORAGE_MAX_BYTES", str(5 * 1024 ** 3)))
+# Files older than this are evicted regardless of size (0 disables).
+STORAGE_MAX_AGE_SECONDS = int(os.getenv("STORAGE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+# Overlays older than this are re-encoded more compactly (0 disables).
+STORAGE_COMPRESS_AFTER_SECONDS = int(os.getenv("STORAGE_COMPRESS_AFTER_SECONDS", str(24 * 3600)))
+# Never touch files younger than this, so in-flight artifacts are safe.
+STORAGE_MIN_AGE_SECONDS = 60
+
+# ----------------------------------------------------------------------------
+# Detection history (every processed image, its summary and artifacts)
+# ----------------------------------------------------------------------------
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "sqlite")
+HISTORY_DB_PATH = Path(os.getenv("HISTORY_DB_PATH", PROJECT_ROOT / "history" / "detections.sqlite3"))
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 200
 
 # ----------------------------------------------------------------------------
 # Logging configuration
@@ -60,6 +176,16 @@ REPORTS_FOLDER = PROJECT_ROOT / "reports"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE = LOGS_DIR / "app.log"
 
+# ----------------------------------------------------------------------------
+# Per-request profiling (X-Profile header / ?profile=1, or sampled)
+# ----------------------------------------------------------------------------
+# Fraction of requests profiled without being asked (0 disables sampling).
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Also capture a TensorFlow op-level trace (TensorBoard profile plugin) per profiled request.
+PROFILE_TF_TRACE = os.getenv("PROFILE_TF_TRACE", "0") == "1"
+PROFILE_TF_LOGDIR = LOGS_DIR / "tf_profiles"
+
 # ----------------------------------------------------------------------------
 # Utility helpers
 # ----------------------------------------------------------------------------
@@ -0,0 +1,118 @@
+"""
+Throughput scaling of the multiprocess DeepLab inference pool for 1..N worker processes.
+Run from project root using: python scripts/benchmark_inference.py --processes 1 2 4 8 [--images 64] [--size 1024]
+
+Use --stub to exercise the pool (shared memory, pinning, postprocessing) with a
+NumPy stand-in model when TensorFlow or the model weights are not available.
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import LOGS_DIR, PROB_MAP_DTYPE
+from src.models.process_pool import ProcessInferencePool
+from src.models.segmentation import DeepLabSegmenter
+
+
+class _StubModel:
+    """CPU-bound stand-in: a few dense layers per pixel, 2-class logits where dark means oil."""
+
+    input_shape = (None, None, None, 3)
+
+    def __init__(self, width: int = 64, layers: int = 4) -> None:
+        rng = np.random.default_rng(0)
+        self.weights = [rng.standard_normal((3 if i == 0 else width, width)).astype(np.float32) / 8 for i in range(layers)]
+
+    def predict(self, batch, verbose=0):
+        x = batch.reshape(-1, 3)
+        for w in self.weights:
+            x = np.tanh(x @ w)
+        score = -3.0 * batch[..., 0:1] + 0.01 * x[:, :1].reshape(batch.shape[:-1] + (1,))
+        return np.concatenate([-score, score], axis=-1)
+
+
+def _stub_segmenter(input_size, prob_dtype):
+    segmenter = DeepLabSegmenter(input_size=input_size, prob_dtype=prob_dtype)
+    segmenter._model = _StubModel()
+    return segmenter
+
+
+def _images(count: int, size: int):
+    rng = np.random.default_rng(1)
+    images = []
+    for _ in range(count):
+        arr = np.full((size, size, 3), 200, dtype=np.uint8)
+        y, x = rng.integers(0, size // 2, 2)
+        arr[y:y + size // 4, x:x + size // 3] = 10
+        images.append(arr)
+    return images
+
+
+def main() -> int:
+    cpu = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    parser = argparse.ArgumentParser(description="Benchmark inference throughput for 1..N worker processes")
+    parser.add_argument("--processes", type=int, nargs="+", default=[n for n in (1, 2, 4, 8, 16, 32) if n <= cpu])
+    parser.add_argument("--images", type=int, default=64, help="images per measurement")
+    parser.add_argument("--size", type=int, default=1024, help="synthetic scene edge length in pixels")
+    parser.add_argument("--input-size", type=int, default=512)
+    parser.add_argument("--no-pin", action="store_true", help="do not pin workers to cores")
+    parser.add_argument("--stub", action="store_true", help="use a NumPy stand-in model instead of DeepLab")
+    parser.add_argument("--output", type=Path, help="JSON results file (default: logs/inference_benchmark.json)")
+    args = parser.parse_args()
+
+    input_size = (args.input_size, args.input_size)
+    factory = functools.partial(_stub_segmenter, input_size, PROB_MAP_DTYPE) if args.stub else None
+    kwargs = {"input_size": input_size, "prob_dtype": PROB_MAP_DTYPE}
+    images = _images(args.images, args.size)
+
+    rows = []
+    for processes in args.processes:
+        pool = ProcessInferencePool(processes, segmenter_kwargs=kwargs, factory=factory, pin_cores=not args.no_pin)
+        start = time.perf_counter()
+        pool.start()
+        startup = time.perf_counter() - start
+        try:
+            for future in [pool.submit(img) for img in images[:processes]]:
+                future.result()  # warm-up: first predict per worker
+            start = time.perf_counter()
+            for future in [pool.submit(img) for img in images]:
+                future.result()
+            seconds = time.perf_counter() - start
+        finally:
+            pool.close()
+        rows.append({
+            "processes": processes,
+            "threads_per_process": pool.threads,
+            "cores": pool.core_groups if not args.no_pin else None,
+            "startup_s": round(startup, 2),
+            "seconds": round(seconds, 3),
+            "images_per_s": round(args.images / seconds, 2),
+        })
+        print(f"{processes:>3} proc x {pool.threads:>2} thr: {rows[-1]['images_per_s']:>8.2f} img/s  (startup {startup:.1f}s)")
+
+    base = rows[0]["images_per_s"] / rows[0]["processes"]
+    print(f"\n{'procs':>5} {'img/s':>9} {'speedup':>8} {'efficiency':>10}")
+    for row in rows:
+        row["speedup"] = round(row["images_per_s"] / rows[0]["images_per_s"], 2)
+        row["efficiency"] = round(row["images_per_s"] / (base * row["processes"]), 2)
+        print(f"{row['processes']:>5} {row['images_per_s']:>9.2f} {row['speedup']:>8.2f} {row['efficiency']:>10.2f}")
+
+    output = args.output or LOGS_DIR / "inference_benchmark.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"cpu_count": cpu, "stub": args.stub, "size": args.size, "results": rows}, indent=2))
+    print(f"[SUCCESS] Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
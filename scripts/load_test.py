@@ -0,0 +1,272 @@
+"""
+Synthetic, label-aware load against the Flask app for capacity planning.
+Run from project root using: python scripts/load_test.py --url http://127.0.0.1:5000 --requests 200 --concurrency 8 [--rate 5]
+
+Start the server with USE_STUB_MODEL=1 to test offline; STUB_MODEL_LATENCY_MS sets
+the emulated inference cost per image. Images are synthesized with known spill
+coverage (or sampled from --dataset), each upload may be followed by a report
+download, and /api/metrics is polled for server-side CPU, memory and queue depth.
+"""
+
+import argparse
+import io
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import IMAGE_SUFFIXES, LOGS_DIR
+
+RECORD_ID = re.compile(rb"/report/record/(\d+)")
+
+
+def synth_image(width: int, height: int, coverage: float, rng: np.random.Generator):
+    """PNG of textured sea with dark slicks covering ``coverage`` percent; returns (bytes, actual %)."""
+    sea = rng.normal(185, 12, (height, width)).clip(140, 235)
+    mask = Image.new("L", (width, height), 0)
+    draw = ImageDraw.Draw(mask)
+    target = coverage / 100.0 * width * height
+    covered = 0
+    while covered < target:
+        cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        rx, ry = rng.uniform(0.02, 0.15) * width, rng.uniform(0.01, 0.08) * height
+        draw.ellipse((cx - rx, cy - ry, cx + rx, cy + ry), fill=255)
+        covered = np.count_nonzero(np.asarray(mask))
+    slick = np.asarray(mask.filter(ImageFilter.GaussianBlur(2))) / 255.0
+    gray = sea * (1 - slick) + rng.normal(40, 8, (height, width)) * slick
+    rgb = np.stack([gray, gray * 1.02, gray * 1.05], axis=-1).clip(0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(rgb).save(buffer, format="PNG")
+    return buffer.getvalue(), covered / float(width * height) * 100.0
+
+
+def dataset_images(directory: Path, count: int, rng: random.Random):
+    paths = [p for p in directory.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES]
+    if not paths:
+        raise FileNotFoundError(f"No images under {directory}")
+    return [(path.read_bytes(), path.name, None) for path in rng.sample(paths, min(count, len(paths)))]
+
+
+def _parse_size(value: str):
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def _multipart(field: str, filename: str, data: bytes):
+    boundary = uuid.uuid4().hex
+    body = b"".join([
+        f"--{boundary}\r\n".encode(),
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'.encode(),
+        b"Content-Type: application/octet-stream\r\n\r\n",
+        data,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _http(method: str, url: str, timeout: float, body: bytes = None, content_type: str = None):
+    request = urllib.request.Request(url, data=body, method=method)
+    if content_type:
+        request.add_header("Content-Type", content_type)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read()
+
+
+class LoadRun:
+    """Collects one sample per HTTP call: (operation, latency_s, response_s, ok)."""
+
+    def __init__(self, args, images):
+        self.args = args
+        self.images = images
+        self.samples = []
+        self.label_errors = []
+        self.metrics = []
+        self._lock = threading.Lock()
+        self._rng = random.Random(args.seed)
+        self._done = threading.Event()
+
+    def _call(self, operation, scheduled, method, path, body=None, content_type=None):
+        start = time.perf_counter()
+        try:
+            status, payload = _http(method, self.args.url + path, self.args.timeout, body, content_type)
+            ok = 200 <= status < 300
+        except OSError:
+            status, payload, ok = None, b"", False
+        end = time.perf_counter()
+        with self._lock:
+            self.samples.append((operation, end - start, end - (scheduled or start), ok))
+        return ok, payload
+
+    def session(self, index, scheduled):
+        data, name, coverage = self.images[index % len(self.images)]
+        body, content_type = _multipart("image", name, data)
+        ok, page = self._call("upload", scheduled, "POST", "/upload", body, content_type)
+        match = RECORD_ID.search(page) if ok else None
+        if match is None:
+            return
+        record_id = match.group(1).decode()
+        if coverage is not None and self.args.check_labels:
+            ok, payload = self._call("history", None, "GET", f"/api/history/{record_id}")
+            if ok:
+                predicted = json.loads(payload)["summary"]["coverage_percent"]
+                with self._lock:
+                    self.label_errors.append(abs(predicted - coverage))
+        with self._lock:
+            wants_report = self._rng.random() < self.args.report_ratio
+        if wants_report:
+            self._call("report", None, "GET", f"/report/record/{record_id}")
+
+    def poll_metrics(self):
+        while True:
+            try:
+                status, payload = _http("GET", self.args.url + "/api/metrics", self.args.timeout)
+                if status == 200:
+                    self.metrics.append({"t": time.time(), **json.loads(payload)})
+            except OSError:
+                pass
+            if self._done.wait(self.args.metrics_interval):
+                return
+
+    def run(self):
+        poller = threading.Thread(target=self.poll_metrics, daemon=True)
+        poller.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            if self.args.rate > 0:
+                # Open loop: Poisson arrivals; latency counts from the scheduled arrival,
+                # so client-side queueing under overload is not hidden.
+                arrival = start
+                arrivals = np.random.default_rng(self.args.seed).exponential(1.0 / self.args.rate, self.args.requests)
+                for index, gap in enumerate(arrivals):
+                    arrival += gap
+                    time.sleep(max(0.0, arrival - time.perf_counter()))
+                    pool.submit(self.session, index, arrival)
+            else:
+                for index in range(self.args.requests):
+                    pool.submit(self.session, index, None)
+        wall = time.perf_counter() - start
+        self._done.set()
+        poller.join()
+        return wall
+
+
+def _percentiles(values):
+    arr = np.asarray(values, dtype=np.float64) * 1000.0
+    if arr.size == 0:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    return {"p50": float(np.percentile(arr, 50)), "p95": float(np.percentile(arr, 95)), "p99": float(np.percentile(arr, 99)), "mean": float(arr.mean())}
+
+
+def summarize(run: LoadRun, wall: float):
+    operations = {}
+    for operation in sorted({sample[0] for sample in run.samples}):
+        rows = [sample for sample in run.samples if sample[0] == operation]
+        ok = [sample for sample in rows if sample[3]]
+        operations[operation] = {
+            "requests": len(rows),
+            "errors": len(rows) - len(ok),
+            "error_rate": (len(rows) - len(ok)) / len(rows),
+            "throughput_per_s": len(ok) / wall,
+            "latency_ms": _percentiles([sample[1] for sample in ok]),
+            "response_ms": _percentiles([sample[2] for sample in ok]),
+        }
+    server = {}
+    if len(run.metrics) >= 2:
+        first, last = run.metrics[0], run.metrics[-1]
+        elapsed = max(last["t"] - first["t"], 1e-9)
+        cpu_count = last["process"]["cpu_count"] or 1
+        server = {
+            "cpu_count": cpu_count,
+            "cpu_utilization": (last["process"]["cpu_seconds"] - first["process"]["cpu_seconds"]) / elapsed / cpu_count,
+            "peak_rss_mb": max((m["process"]["rss_mb"] or 0.0) for m in run.metrics),
+            "max_rss_mb": last["process"]["max_rss_mb"],
+            "peak_threads": max(m["process"]["threads"] for m in run.metrics),
+            "peak_in_flight": max(m["inference"]["in_flight"] for m in run.metrics),
+            "inference_workers": last["inference"]["workers"],
+            "models": last["models"],
+        }
+    labels = {}
+    if run.label_errors:
+        errors = np.asarray(run.label_errors)
+        labels = {"checked": int(errors.size), "mean_abs_coverage_error_pct": float(errors.mean()), "max_abs_coverage_error_pct": float(errors.max())}
+    return {"wall_s": wall, "operations": operations, "server": server, "labels": labels}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test /upload and the report endpoints")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--requests", type=int, default=100, help="upload sessions to run")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum sessions in flight")
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson arrival rate in sessions/s (0: closed loop)")
+    parser.add_argument("--size", nargs="+", default=["1024"], help="image sizes, e.g. 512 1024x768")
+    parser.add_argument("--coverage", type=float, nargs="+", default=[0.0, 2.0, 10.0], help="spill coverage in percent")
+    parser.add_argument("--variants", type=int, default=12, help="distinct images to generate")
+    parser.add_argument("--dataset", type=Path, help="sample real images from this directory instead")
+    parser.add_argument("--report-ratio", type=float, default=0.2, help="share of uploads followed by a PDF report")
+    parser.add_argument("--check-labels", action="store_true", help="compare reported coverage with the synthetic label")
+    parser.add_argument("--metrics-interval", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON results file (default: logs/load_test.json)")
+    args = parser.parse_args()
+    args.url = args.url.rstrip("/")
+
+    if args.dataset:
+        images = dataset_images(args.dataset, args.variants, random.Random(args.seed))
+    else:
+        rng = np.random.default_rng(args.seed)
+        combos = [(_parse_size(size), coverage) for size in args.size for coverage in args.coverage]
+        images = []
+        for i in range(max(args.variants, len(combos))):
+            (width, height), coverage = combos[i % len(combos)]
+            data, actual = synth_image(width, height, coverage, rng)
+            images.append((data, f"synthetic_{width}x{height}_{i}.png", actual))
+    print(f"Prepared {len(images)} images; running {args.requests} sessions at concurrency {args.concurrency}"
+          + (f", {args.rate}/s Poisson arrivals" if args.rate > 0 else ""))
+
+    run = LoadRun(args, images)
+    wall = run.run()
+    results = summarize(run, wall)
+
+    print(f"\n{'operation':<10} {'ok':>6} {'err%':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for operation, row in results["operations"].items():
+        lat = row["response_ms"]
+        if lat["p50"] is None:
+            print(f"{operation:<10} {0:>6} {row['error_rate'] * 100:>6.1f} {0:>8.2f} {'-':>9} {'-':>9} {'-':>9}")
+            continue
+        print(f"{operation:<10} {row['requests'] - row['errors']:>6} {row['error_rate'] * 100:>6.1f} "
+              f"{row['throughput_per_s']:>8.2f} {lat['p50']:>9.1f} {lat['p95']:>9.1f} {lat['p99']:>9.1f}")
+    server = results["server"]
+    if server:
+        print(f"\nServer: CPU {server['cpu_utilization'] * 100:.0f}% of {server['cpu_count']} cores, "
+              f"peak RSS {server['peak_rss_mb'] or 0:.0f} MB, peak in-flight {server['peak_in_flight']}"
+              f" ({server['inference_workers']} inference workers)")
+    if results["labels"]:
+        print(f"Coverage error vs. labels: mean {results['labels']['mean_abs_coverage_error_pct']:.2f} pts "
+              f"({results['labels']['checked']} images)")
+
+    output = args.output or LOGS_DIR / "load_test.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()}, **results}, indent=2))
+    print(f"[SUCCESS] Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,21 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, url_for
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context, url_for
+import functools
+import hmac
+import io
+import itertools
+import json
 import os
 import logging
+import tarfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
 from werkzeug.utils import secure_filename
 from config import *
-from src.utils.detector import DetectionManager
+from src.utils.batch import BatchBudget, BatchLimitError, BatchLimits, iter_upload
+from src.utils.detector import DetectionManager, ResultExpiredError, new_request_id
+from src.utils.profiling import resource_usage
+from src.utils.storage import StorageManager
 
 # Configure logging
 logging.basicConfig(
@@ -16,6 +28,10 @@ app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = str(UPLOAD_FOLDER)
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 detector = DetectionManager()
+# Evicted uploads and overlays are detached from their history records.
+storage = StorageManager(on_evict=detector.history.forget_files)
+if STORAGE_SWEEPER_ENABLED:
+	storage.start()
 
 @app.route('/')
 def index():
@@ -35,22 +51,35 @@ def upload():
 		if file.filename == '':
 			return jsonify({'error': 'Empty filename'}), 400
 
-		# Save and process image
+		# Decode straight from the request buffer; the upload copy (if kept) is written in the
+		# background. The request id keeps simultaneous uploads of the same name apart.
+		area = request.form.get('area') or None
+		if area and area not in detector.roi.names():
+			return jsonify({'error': f'Unknown area {area}'}), 400
 		filename = secure_filename(file.filename)
-		os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-		filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-		file.save(filepath)
+		request_id = new_request_id()
+		persist_path = Path(app.config['UPLOAD_FOLDER']) / f"{request_id}_{filename}" if PERSIST_UPLOADS else None
 
-		# Get segmentation results
-		results = detector.process_image(filepath)
+		# Get segmentation results (optionally geotagged for history queries)
+		results = detector.process_image(
+			file.read(),
+			location=_parse_location(request.form),
+			image_name=filename,
+			request_id=request_id,
+			persist_path=persist_path,
+			area=area,
+			profile=_profile_requested(),
+		)
 
 		# Build optional PDF now or via separate route
 		return render_template(
 			'results.html',
 			results={
 				'image_name': results.image_name,
+				'record_id': results.record_id,
 				'detection_summary': results.summary,
-				'overlay_path': url_for('static', filename=f"detections/overlay_{results.image_name}"),
+				'overlay_path': url_for('static', filename=f"detections/{results.annotated_image_path.name}"),
+				'profiled': 'profile' in results.summary,
 			}
 		)
 
@@ -58,25 +87,249 @@ def upload():
 		logging.error(f"Error processing upload: {e}")
 		return jsonify({'error': str(e)}), 500
 
+@app.route('/api/batch', methods=['POST'])
+def batch_upload():
+	"""Many images (multipart ``images``/``archive`` fields or a raw zip/tar body) -> NDJSON results."""
+	# Only this endpoint accepts large bodies; /upload keeps MAX_CONTENT_LENGTH.
+	request.max_content_length = BATCH_MAX_CONTENT_LENGTH
+	if request.mimetype == 'multipart/form-data':
+		uploads = []
+		for f in (f for key in ('images', 'archive') for f in request.files.getlist(key) if f.filename):
+			# Take over the spooled file: Flask closes request.files when the view returns,
+			# before the response body below has been generated.
+			uploads.append((f.filename, f.stream))
+			f.stream = io.BytesIO()
+	else:
+		# Raw body: read straight off the socket, so a tar is unpacked while it arrives.
+		filename = request.args.get('filename') or _ARCHIVE_TYPES.get(request.mimetype)
+		uploads = [(filename, request.stream)] if filename else []
+	if not uploads:
+		return jsonify({'error': 'No images or archive uploaded'}), 400
+	persist_folder = Path(app.config['UPLOAD_FOLDER']) if PERSIST_UPLOADS else None
+	return Response(stream_with_context(_batch_results(uploads, persist_folder)), mimetype='application/x-ndjson')
+
 @app.route('/report/<path:filename>')
 def generate_report(filename):
 	try:
-		# Build report from last results
-		from pathlib import Path
-		image_name = filename
-		# Recreate DetectionResult minimal to generate report using existing overlay
-		class _DR:
-			pass
-		dr = _DR()
-		dr.image_name = image_name
-		dr.annotated_image_path = Path(DETECTIONS_FOLDER) / f"overlay_{image_name}"
-		dr.summary = {}
-		pdf_path = detector.build_pdf_report(dr)
+		# Build report from the stored result so the summary metrics are preserved
+		result = detector.get_result(filename)
+		if result is None:
+			return jsonify({'error': f'No detection recorded for {filename}'}), 404
+		pdf_path = detector.build_pdf_report(result)
 		return send_from_directory(pdf_path.parent, pdf_path.name, as_attachment=True)
+	except ResultExpiredError as e:
+		return jsonify({'error': str(e)}), 410
 	except Exception as e:
 		logging.error(f"Error generating report: {e}")
 		return jsonify({'error': str(e)}), 500
 
+@app.route('/report/record/<int:record_id>')
+def generate_record_report(record_id):
+	try:
+		result = detector.get_record_result(record_id)
+		if result is None:
+			return jsonify({'error': f'No detection record {record_id}'}), 404
+		pdf_path = detector.build_pdf_report(result)
+		return send_from_directory(pdf_path.parent, pdf_path.name, as_attachment=True)
+	except ResultExpiredError as e:
+		return jsonify({'error': str(e)}), 410
+	except Exception as e:
+		logging.error(f"Error generating report: {e}")
+		return jsonify({'error': str(e)}), 500
+
+@app.route('/profile/<int:record_id>')
+def download_profile(record_id):
+	# Folded stacks: open in speedscope or render with flamegraph.pl.
+	path = detector.get_profile_path(record_id)
+	if path is None:
+		return jsonify({'error': f'No profile stored for record {record_id}'}), 404
+	return send_from_directory(path.parent, path.name, as_attachment=True, mimetype='text/plain')
+
+@app.route('/api/history')
+def history_list():
+	try:
+		filters = {
+			'image_hash': request.args.get('image_hash'),
+			'image_name': request.args.get('image_name'),
+			'since': request.args.get('since', type=float),
+			'until': request.args.get('until', type=float),
+		}
+		bbox = request.args.get('bbox')
+		if bbox:
+			filters['bbox'] = tuple(float(v) for v in bbox.split(','))
+			if len(filters['bbox']) != 4:
+				return jsonify({'error': 'bbox must be min_lat,min_lon,max_lat,max_lon'}), 400
+		return jsonify(detector.history.page(
+			page=request.args.get('page', 1, type=int),
+			page_size=request.args.get('page_size', HISTORY_PAGE_SIZE, type=int),
+			**filters,
+		))
+	except ValueError as e:
+		return jsonify({'error': str(e)}), 400
+
+@app.route('/api/history/<int:record_id>')
+def history_detail(record_id):
+	record = detector.history.get(record_id)
+	if record is None:
+		return jsonify({'error': 'Not found'}), 404
+	return jsonify(record.as_dict())
+
+@app.route('/api/roi')
+def roi_areas():
+	return jsonify({'areas': detector.roi.names()})
+
+@app.route('/api/storage')
+def storage_metrics():
+	return jsonify(storage.metrics())
+
+@app.route('/api/metrics')
+def server_metrics():
+	# Polled by scripts/load_test.py to relate client latencies to server load.
+	return jsonify({
+		'process': resource_usage(),
+		'inference': {'workers': detector.workers, 'in_flight': detector.in_flight},
+		'models': {name: version['stats'] for name, version in detector.registry.stats()['versions'].items()},
+	})
+
+@app.route('/api/models')
+def models_list():
+	return jsonify(detector.registry.stats())
+
+def _require_model_admin(view):
+	"""Model switching loads and runs model files: only with MODEL_ADMIN_TOKEN set and presented."""
+	@functools.wraps(view)
+	def wrapped(*args, **kwargs):
+		if not MODEL_ADMIN_TOKEN:
+			return jsonify({'error': 'Model administration is disabled (set MODEL_ADMIN_TOKEN)'}), 403
+		header = request.headers.get('Authorization', '')
+		supplied = header[len('Bearer '):].strip() if header.startswith('Bearer ') else ''
+		if not hmac.compare_digest(supplied.encode(), MODEL_ADMIN_TOKEN.encode()):
+			return jsonify({'error': 'Invalid or missing admin token'}), 401
+		return view(*args, **kwargs)
+	return wrapped
+
+# Only versions listed in models/registry.json at startup can be selected; there is
+# deliberately no endpoint to register new specs at runtime.
+@app.route('/api/models/default', methods=['POST'])
+@_require_model_admin
+def models_set_default():
+	body = request.get_json(force=True) or {}
+	try:
+		previous = detector.registry.set_default(body.get('name', ''))
+	except KeyError as e:
+		return jsonify({'error': e.args[0]}), 404
+	except ValueError as e:
+		return jsonify({'error': str(e)}), 400
+	except Exception as e:
+		logging.error(f"Error loading model: {e}")
+		return jsonify({'error': str(e)}), 500
+	return jsonify({'default': detector.registry.default, 'previous': previous})
+
+@app.route('/api/models/candidate', methods=['POST'])
+@_require_model_admin
+def models_set_candidate():
+	body = request.get_json(force=True) or {}
+	try:
+		detector.registry.set_candidate(body.get('name'), float(body.get('share', 0.0)), body.get('shadow'))
+	except KeyError as e:
+		return jsonify({'error': e.args[0]}), 404
+	except ValueError as e:
+		return jsonify({'error': str(e)}), 400
+	except Exception as e:
+		logging.error(f"Error loading model: {e}")
+		return jsonify({'error': str(e)}), 500
+	return jsonify(detector.registry.stats())
+
+_ARCHIVE_TYPES = {
+	'application/zip': 'upload.zip',
+	'application/x-zip-compressed': 'upload.zip',
+	'application/x-tar': 'upload.tar',
+	'application/gzip': 'upload.tar.gz',
+	'application/x-gzip': 'upload.tar.gz',
+}
+
+def _ndjson(payload):
+	return json.dumps(payload) + '\n'
+
+def _batch_results(uploads, persist_folder):
+	"""Feed images to the detector in inference batches and yield each result line as it completes."""
+	budget = BatchBudget(BatchLimits())
+	pending = {}
+	# ``total`` and ``errors`` count image lines only; an upload-level failure sets ``fatal``.
+	counts = {'total': 0, 'errors': 0, 'fatal': False}
+
+	def result_line(future):
+		index, image_name = pending.pop(future)
+		counts['total'] += 1
+		try:
+			result = future.result()
+		except Exception as e:
+			counts['errors'] += 1
+			logging.error(f"Error processing batch image {image_name}: {e}")
+			return _ndjson({'index': index, 'image_name': image_name, 'error': str(e)})
+		return _ndjson({
+			'index': index,
+			'image_name': result.image_name,
+			'record_id': result.record_id,
+			'request_id': result.request_id,
+			'model_version': result.model_version,
+			'summary': result.summary,
+			'overlay_url': url_for('static', filename=f"detections/{result.annotated_image_path.name}"),
+		})
+
+	def flush(chunk):
+		futures = detector.submit_batch([(data, name) for _, name, data in chunk], persist_folder=persist_folder)
+		pending.update({future: (index, name) for future, (index, name, _) in zip(futures, chunk)})
+		chunk.clear()
+
+	def drain(limit, block):
+		# Emit whatever has finished; block only while more than ``limit`` are in flight.
+		while pending:
+			done, _ = wait(list(pending), timeout=None if block and len(pending) > limit else 0, return_when=FIRST_COMPLETED)
+			if not done:
+				return
+			for future in done:
+				yield result_line(future)
+
+	chunk = []
+	items = itertools.chain.from_iterable(iter_upload(name, stream, budget) for name, stream in uploads)
+	try:
+		for index, item in enumerate(items):
+			image_name = secure_filename(item.name) or f"image_{index}.png"
+			if item.error:
+				counts['total'] += 1
+				counts['errors'] += 1
+				yield _ndjson({'index': index, 'image_name': image_name, 'error': item.error})
+				continue
+			chunk.append((index, image_name, item.data))
+			if len(chunk) >= BATCH_INFERENCE_SIZE:
+				flush(chunk)
+			yield from drain(BATCH_MAX_IN_FLIGHT, block=True)
+	except (BatchLimitError, tarfile.TarError, zipfile.BadZipFile) as e:
+		# The rest of the upload is unusable; images already read are still processed.
+		counts['fatal'] = True
+		yield _ndjson({'error': str(e), 'fatal': True})
+	finally:
+		for _, stream in uploads:
+			if stream is not request.stream:
+				stream.close()
+	if chunk:
+		flush(chunk)
+	yield from drain(0, block=True)
+	yield _ndjson({'done': True, **counts})
+
+def _profile_requested():
+	"""True if the client asked for a profile (X-Profile header or ?profile=1); None leaves it to sampling."""
+	flag = request.headers.get('X-Profile') or request.args.get('profile')
+	return True if flag and flag.lower() in ('1', 'true', 'yes') else None
+
+def _parse_location(form):
+	try:
+		lat, lon = form.get('lat'), form.get('lon')
+		return (float(lat), float(lon)) if lat and lon else None
+	except ValueError:
+		return None
+
 if __name__ == '__main__':
 	os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 	os.makedirs(DETECTIONS_FOLDER, exist_ok=True)
@@ -0,0 +1,55 @@
+"""
+Offline evaluation of the segmentation (DeepLab) and detection (YOLO) backends.
+Run from project root using: python -m src.evaluate --backends deeplab yolo --sizes 256 512 640
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import DATASET_TEST, DATASET_VAL, LOGS_DIR
+from src.utils.evaluation import evaluate_detector, evaluate_segmenter, format_table, list_split_images, write_csv
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Evaluate model backends on a labelled split")
+    parser.add_argument("--split", choices=["val", "test"], default="val")
+    parser.add_argument("--backends", nargs="+", choices=["deeplab", "yolo", "yolo-tiled"], default=["deeplab", "yolo"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[256, 384, 512, 640])
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4, help="decode/preprocess threads")
+    parser.add_argument("--limit", type=int, help="evaluate only the first N images")
+    parser.add_argument("--output", type=Path, default=LOGS_DIR / f"eval_{time.strftime('%Y%m%d_%H%M%S')}.csv")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    images = list_split_images(DATASET_VAL if args.split == "val" else DATASET_TEST, args.limit)
+    if not images:
+        print(f"[FAILED] No images found for split '{args.split}'")
+        return 1
+
+    rows = []
+    if "deeplab" in args.backends:
+        from src.models.segmentation import DeepLabSegmenter
+        segmenter = DeepLabSegmenter()
+        for size in args.sizes:
+            rows.append(evaluate_segmenter(segmenter, images, size, args.batch_size, args.workers))
+    if {"yolo", "yolo-tiled"} & set(args.backends):
+        from src.models.yolo_model import YOLOModelManager
+        manager = YOLOModelManager()
+        for size in args.sizes:
+            if "yolo" in args.backends:
+                rows.append(evaluate_detector(manager, images, size, args.batch_size))
+            if "yolo-tiled" in args.backends:
+                rows.append(evaluate_detector(manager, images, size, args.batch_size, tiled=True))
+
+    print(format_table(rows))
+    print(f"[SUCCESS] Results written to {write_csv(rows, args.output)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
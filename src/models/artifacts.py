@@ -0,0 +1,161 @@
+"""Offline-first store for downloaded model artifacts with checksum verification."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+from config import MODEL_CACHE_DIR, MODEL_OFFLINE
+
+LOGGER = logging.getLogger(__name__)
+
+READY_MARKER = ".ready"
+
+
+class ArtifactIntegrityError(ValueError):
+	"""An artifact's SHA-256 digest does not match the expected one."""
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+	digest = hashlib.sha256()
+	with open(path, "rb") as stream:
+		for chunk in iter(lambda: stream.read(chunk_size), b""):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+class ArtifactStore:
+	"""Model files under one absolute root, unpacked once into ready-to-load directories.
+
+	Layout per Hub file::
+
+	    <root>/<org>--<repo>/<filename>           downloaded or seeded archive
+	    <root>/<org>--<repo>/<filename>.sha256    digest recorded when stored
+	    <root>/<org>--<repo>/<stem>/              unpacked SavedModel
+	    <root>/<org>--<repo>/<stem>/.ready        digest of the archive it came from
+
+	:meth:`materialize` returns a ready directory without touching the network
+	or re-hashing the archive; the Hub is only contacted when nothing usable is
+	stored and ``offline`` is false.
+	"""
+
+	def __init__(self, root: Path = MODEL_CACHE_DIR, offline: bool = MODEL_OFFLINE) -> None:
+		self.root = Path(root).absolute()
+		self.offline = offline
+
+	def _folder(self, repo: str) -> Path:
+		return self.root / repo.replace("/", "--")
+
+	def archive_path(self, repo: str, filename: str) -> Path:
+		return self._folder(repo) / filename
+
+	def unpacked_path(self, repo: str, filename: str) -> Path:
+		return self._folder(repo) / Path(filename).stem
+
+	@staticmethod
+	def _recorded_digest(archive: Path) -> Optional[str]:
+		sidecar = archive.with_name(archive.name + ".sha256")
+		return sidecar.read_text(encoding="utf-8").strip() if sidecar.exists() else None
+
+	@staticmethod
+	def _verify(archive: Path, expected: Optional[str]) -> str:
+		actual = sha256_file(archive)
+		if expected and actual != expected.lower():
+			raise ArtifactIntegrityError(f"Checksum mismatch for {archive}: expected {expected}, got {actual}")
+		return actual
+
+	def _store(self, archive: Path, sha256: Optional[str]) -> str:
+		"""Verify a freshly written archive and record its digest."""
+		try:
+			digest = self._verify(archive, sha256)
+		except ArtifactIntegrityError:
+			archive.unlink()
+			raise
+		archive.with_name(archive.name + ".sha256").write_text(digest, encoding="utf-8")
+		return digest
+
+	def _download(self, repo: str, filename: str, sha256: Optional[str]) -> Path:
+		archive = self.archive_path(repo, filename)
+		if self.offline:
+			raise FileNotFoundError(
+				f"Model artifact {repo}/{filename} is not in {self.root} and MODEL_OFFLINE is set. "
+				"Seed it with `python -m src.seed_models`."
+			)
+		from huggingface_hub import hf_hub_download
+
+		LOGGER.info("Downloading model artifact from Hugging Face: %s/%s", repo, filename)
+		archive.parent.mkdir(parents=True, exist_ok=True)
+		downloaded = Path(hf_hub_download(repo_id=repo, filename=filename, local_dir=str(archive.parent)))
+		if downloaded != archive:
+			os.replace(downloaded, archive)
+		self._store(archive, sha256)
+		return archive
+
+	def fetch(self, repo: str, filename: str, sha256: Optional[str] = None) -> Path:
+		"""Verified local archive, downloading it only if it is missing."""
+		archive = self.archive_path(repo, filename)
+		if archive.exists():
+			recorded = self._recorded_digest(archive)
+			if recorded is None or (sha256 and recorded != sha256.lower()):
+				self._store(archive, sha256)
+			return archive
+		return self._download(repo, filename, sha256)
+
+	def seed_from_file(self, repo: str, filename: str, source: Path, sha256: Optional[str] = None) -> Path:
+		"""Copy a locally available artifact into the store (for hosts without network access)."""
+		archive = self.archive_path(repo, filename)
+		archive.parent.mkdir(parents=True, exist_ok=True)
+		tmp = archive.with_name(f".{archive.name}.{uuid.uuid4().hex}.tmp")
+		shutil.copyfile(source, tmp)
+		os.replace(tmp, archive)
+		self._store(archive, sha256)
+		return self.materialize(repo, filename, sha256)
+
+	def materialize(self, repo: str, filename: str, sha256: Optional[str] = None) -> Path:
+		"""Path to load the model from: the unpacked SavedModel for zips, else the file itself."""
+		if Path(filename).suffix.lower() != ".zip":
+			return self.fetch(repo, filename, sha256)
+
+		target = self.unpacked_path(repo, filename)
+		marker = target / READY_MARKER
+		# The unpacked tree is current if it came from the pinned or last stored archive.
+		expected = (sha256 or self._recorded_digest(self.archive_path(repo, filename)) or "").lower()
+		if marker.exists() and (not expected or marker.read_text(encoding="utf-8").strip() == expected):
+			return self._model_dir(target)
+
+		archive = self.fetch(repo, filename, sha256)
+		digest = self._recorded_digest(archive)
+		# Unpack beside the target and rename, so concurrent workers never load a partial tree.
+		staging = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+		with zipfile.ZipFile(archive) as bundle:
+			bundle.extractall(staging)
+		(staging / READY_MARKER).write_text(digest or "", encoding="utf-8")
+		if target.exists():
+			shutil.rmtree(target, ignore_errors=True)
+		try:
+			os.replace(staging, target)
+		except OSError:
+			# Another process finished first; its tree is equivalent.
+			shutil.rmtree(staging, ignore_errors=True)
+		LOGGER.info("Unpacked %s into %s", archive.name, target)
+		return self._model_dir(target)
+
+	@staticmethod
+	def _model_dir(root: Path) -> Path:
+		"""Directory holding ``saved_model.pb`` (zips often wrap it in a top-level folder)."""
+		for candidate in sorted(root.rglob("saved_model.pb")):
+			return candidate.parent
+		return root
+
+	def verify(self, repo: str, filename: str, sha256: Optional[str] = None) -> str:
+		"""Re-hash a stored archive against ``sha256`` or its recorded digest."""
+		archive = self.archive_path(repo, filename)
+		if not archive.exists():
+			raise FileNotFoundError(f"Model artifact {archive} is not stored")
+		return self._verify(archive, sha256 or self._recorded_digest(archive))
@@ -0,0 +1,220 @@
+"""Compact in-memory and on-disk forms of segmentation probability maps and masks."""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class PackedMask:
+	"""Boolean HxW mask packed 8 pixels per byte."""
+
+	def __init__(self, bits: np.ndarray, shape: Tuple[int, int], area: Optional[int] = None) -> None:
+		self.bits = bits
+		self.shape = tuple(shape)
+		self.area = int(area) if area is not None else int(np.unpackbits(bits, count=self.size).sum())
+
+	@classmethod
+	def from_array(cls, mask: np.ndarray) -> "PackedMask":
+		mask = np.asarray(mask).astype(bool, copy=False)
+		return cls(np.packbits(mask.ravel()), mask.shape, int(np.count_nonzero(mask)))
+
+	@property
+	def size(self) -> int:
+		return self.shape[0] * self.shape[1]
+
+	@property
+	def nbytes(self) -> int:
+		return self.bits.nbytes
+
+	def to_array(self) -> np.ndarray:
+		return np.unpackbits(self.bits, count=self.size).reshape(self.shape)
+
+	def __array__(self, dtype=None, copy=None) -> np.ndarray:
+		arr = self.to_array()
+		return arr if dtype is None else arr.astype(dtype)
+
+	def sum(self) -> int:
+		return self.area
+
+
+class QuantizedProbMap:
+	"""Probability map quantized to uint8 (steps of 1/255) or float16.
+
+	Mostly-empty ocean scenes keep only the flat indices and values of non-zero
+	pixels. Threshold, area, confidence and histogram queries run on the
+	quantized values directly; :meth:`to_array` materializes float32 on demand.
+	"""
+
+	def __init__(
+		self,
+		shape: Tuple[int, int],
+		dtype: str,
+		dense: Optional[np.ndarray] = None,
+		indices: Optional[np.ndarray] = None,
+		values: Optional[np.ndarray] = None,
+		path: Optional[Path] = None,
+	) -> None:
+		self.shape = tuple(shape)
+		self.dtype = np.dtype(dtype)
+		self._dense = dense
+		self._indices = indices
+		self._values = values
+		self._path = path  # set for lazily loaded maps
+
+	@classmethod
+	def from_array(
+		cls,
+		prob_map: np.ndarray,
+		dtype: str = "uint8",
+		sparse: Optional[bool] = None,
+	) -> "QuantizedProbMap":
+		"""Quantize ``prob_map``; ``sparse=None`` picks whichever layout is smaller."""
+		prob = np.asarray(prob_map, dtype=np.float32)
+		if np.dtype(dtype) == np.uint8:
+			quantized = np.rint(np.clip(prob, 0.0, 1.0) * 255.0).astype(np.uint8)
+		elif np.dtype(dtype) == np.float16:
+			quantized = prob.astype(np.float16)
+		else:
+			raise ValueError(f"Unsupported probability dtype '{dtype}' (use uint8 or float16)")
+
+		return cls.from_quantized(quantized, sparse)
+
+	@classmethod
+	def from_quantized(cls, quantized: np.ndarray, sparse: Optional[bool] = None) -> "QuantizedProbMap":
+		"""Wrap already quantized uint8/float16 values, picking the smaller layout if ``sparse`` is None."""
+		flat = quantized.ravel()
+		nonzero = np.flatnonzero(flat)
+		if sparse is None:
+			# uint32 index + value per non-zero pixel versus one value per pixel.
+			sparse = nonzero.size * (4 + flat.itemsize) < flat.nbytes
+		if sparse:
+			return cls(quantized.shape, quantized.dtype.name, indices=nonzero.astype(np.uint32), values=flat[nonzero])
+		return cls(quantized.shape, quantized.dtype.name, dense=quantized)
+
+	# -- storage -----------------------------------------------------------------
+
+	def _materialize_payload(self) -> None:
+		if self._path is None:
+			return
+		with np.load(self._path) as data:
+			if "dense" in data:
+				self._dense = data["dense"]
+			else:
+				self._indices = data["indices"]
+				self._values = data["values"]
+		self._path = None
+
+	@property
+	def is_sparse(self) -> bool:
+		self._materialize_payload()
+		return self._dense is None
+
+	@property
+	def nbytes(self) -> int:
+		self._materialize_payload()
+		if self._dense is not None:
+			return self._dense.nbytes
+		return self._indices.nbytes + self._values.nbytes
+
+	@property
+	def size(self) -> int:
+		return self.shape[0] * self.shape[1]
+
+	def save(self, path: Path) -> Path:
+		self._materialize_payload()
+		path = Path(path)
+		path.parent.mkdir(parents=True, exist_ok=True)
+		meta = np.array([self.shape[0], self.shape[1]], dtype=np.int64)
+		kind = np.array(self.dtype.str)
+		with path.open("wb") as stream:
+			if self._dense is not None:
+				np.savez_compressed(stream, shape=meta, dtype=kind, dense=self._dense)
+			else:
+				np.savez_compressed(stream, shape=meta, dtype=kind, indices=self._indices, values=self._values)
+		return path
+
+	@classmethod
+	def load(cls, path: Path, lazy: bool = True) -> "QuantizedProbMap":
+		"""Read the header now and, with ``lazy``, the probabilities only on first use."""
+		with np.load(path) as data:
+			shape = tuple(int(v) for v in data["shape"])
+			dtype = str(data["dtype"])
+		qmap = cls(shape, dtype, path=Path(path))
+		if not lazy:
+			qmap._materialize_payload()
+		return qmap
+
+	# -- queries -----------------------------------------------------------------
+
+	def quantized(self) -> np.ndarray:
+		self._materialize_payload()
+		if self._dense is not None:
+			return self._dense
+		flat = np.zeros(self.size, dtype=self.dtype)
+		flat[self._indices] = self._values
+		return flat.reshape(self.shape)
+
+	def to_array(self) -> np.ndarray:
+		q = self.quantized()
+		return q.astype(np.float32) / 255.0 if self.dtype == np.uint8 else q.astype(np.float32)
+
+	def __array__(self, dtype=None, copy=None) -> np.ndarray:
+		arr = self.to_array()
+		return arr if dtype is None else arr.astype(dtype)
+
+	def _cut(self, threshold: float) -> Any:
+		# uint8 level q encodes q / 255, so prob >= t  <=>  q >= ceil(t * 255).
+		if self.dtype == np.uint8:
+			return math.ceil(threshold * 255.0 - 1e-6)
+		return np.float16(threshold)
+
+	def _values_as_prob(self, values: np.ndarray) -> np.ndarray:
+		return values.astype(np.float32) / 255.0 if self.dtype == np.uint8 else values.astype(np.float32)
+
+	def stats_at(self, threshold: float) -> Tuple[int, float]:
+		"""Pixel area and mean probability of pixels at or above ``threshold``."""
+		self._materialize_payload()
+		values = self._dense.ravel() if self._dense is not None else self._values
+		selected = values[values >= self._cut(threshold)]
+		if threshold <= 0.0 and self._dense is None:
+			# Implicit zeros also pass a zero threshold.
+			area = self.size
+			return area, float(self._values_as_prob(selected).sum() / area) if area else 0.0
+		area = int(selected.size)
+		return area, float(self._values_as_prob(selected).mean()) if area else 0.0
+
+	def threshold(self, threshold: float) -> np.ndarray:
+		"""Boolean HxW mask of pixels at or above ``threshold``."""
+		self._materialize_payload()
+		if self._dense is not None:
+			return self._dense >= self._cut(threshold)
+		if threshold <= 0.0:
+			return np.ones(self.shape, dtype=bool)
+		flat = np.zeros(self.size, dtype=bool)
+		flat[self._indices[self._values >= self._cut(threshold)]] = True
+		return flat.reshape(self.shape)
+
+	def histogram(self, bins: int = 256) -> np.ndarray:
+		"""Pixel counts per probability bin, matching ``probability_histogram`` on the float map."""
+		self._materialize_payload()
+		values = self._dense.ravel() if self._dense is not None else self._values
+		idx = np.clip((self._values_as_prob(values) * bins).astype(np.int64), 0, bins - 1)
+		counts = np.bincount(idx, minlength=bins)
+		if self._dense is None:
+			counts[0] += self.size - values.size
+		return counts
+
+
+def compaction_stats(prob_map: QuantizedProbMap, mask: PackedMask) -> Dict[str, Any]:
+	dense_bytes = prob_map.size * 4 + mask.size
+	stored = prob_map.nbytes + mask.nbytes
+	return {
+		"dense_bytes": dense_bytes,
+		"compact_bytes": stored,
+		"ratio": dense_bytes / stored if stored else float("inf"),
+		"sparse": prob_map.is_sparse,
+	}
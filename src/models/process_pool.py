@@ -0,0 +1,365 @@
+"""Multiprocess CPU inference: one pinned DeepLab model per worker process, data over shared memory."""
+
+from __future__ import annotations
+
+import collections
+import functools
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import (
+	INFERENCE_INTER_OP_THREADS,
+	INFERENCE_PIN_CORES,
+	INFERENCE_PROCESSES,
+	INFERENCE_THREADS_PER_PROCESS,
+)
+from src.models.compact import PackedMask, QuantizedProbMap
+from src.models.segmentation import DeepLabSegmenter, ImageSource, SegmentationOutput, load_image
+
+LOGGER = logging.getLogger(__name__)
+
+_PROB_DTYPES = {"float32": np.float32, "uint8": np.uint8, "float16": np.float16}
+
+
+def _layout(h: int, w: int, has_roi: bool, prob_dtype: str) -> Dict[str, Tuple[int, Tuple[int, ...], Any]]:
+	"""Offsets of the image, ROI, overlay and probability arrays inside one shared block."""
+	parts = [("image", (h, w, 3), np.uint8)]
+	if has_roi:
+		parts.append(("roi", (h, w), np.bool_))
+	parts += [("overlay", (h, w, 3), np.uint8), ("prob", (h, w), _PROB_DTYPES[prob_dtype])]
+	layout: Dict[str, Tuple[int, Tuple[int, ...], Any]] = {}
+	offset = 0
+	for name, shape, dtype in parts:
+		layout[name] = (offset, shape, dtype)
+		offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+	layout["_size"] = (offset, (), None)
+	return layout
+
+
+def _views(buf: memoryview, layout: Dict[str, Tuple[int, Tuple[int, ...], Any]]) -> Dict[str, np.ndarray]:
+	return {
+		name: np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+		for name, (offset, shape, dtype) in layout.items()
+		if name != "_size"
+	}
+
+
+def assign_cores(processes: int, cores: Optional[Sequence[int]] = None) -> List[List[int]]:
+	"""Split the usable cores into ``processes`` contiguous groups, sizes differing by at most one.
+
+	Groups are disjoint unless there are more processes than cores; then each
+	process gets one core, shared round-robin, and a warning is logged.
+	"""
+	if cores is None:
+		cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+	cores = list(cores)
+	if processes > len(cores):
+		LOGGER.warning("%d inference processes on %d cores: cores will be shared", processes, len(cores))
+		return [[cores[i % len(cores)]] for i in range(processes)]
+	per, extra = divmod(len(cores), processes)
+	groups: List[List[int]] = []
+	start = 0
+	for i in range(processes):
+		size = per + (1 if i < extra else 0)
+		groups.append(cores[start:start + size])
+		start += size
+	return groups
+
+
+def _build_segmenter(kwargs: Dict[str, Any]) -> DeepLabSegmenter:
+	return DeepLabSegmenter(**kwargs)
+
+
+def _configure_threads(threads: int, inter_op: int) -> None:
+	# Must happen before TensorFlow/BLAS create their thread pools.
+	for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TF_NUM_INTRAOP_THREADS"):
+		os.environ[var] = str(threads)
+	os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op)
+	try:
+		import tensorflow as tf
+	except ImportError:
+		return
+	tf.config.threading.set_intra_op_parallelism_threads(threads)
+	tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+
+def _worker_main(
+	index: int,
+	cores: List[int],
+	threads: int,
+	inter_op: int,
+	factory: Callable[[], DeepLabSegmenter],
+	tasks: "mp.Queue",
+	results: "mp.Queue",
+) -> None:
+	if cores and hasattr(os, "sched_setaffinity"):
+		try:
+			os.sched_setaffinity(0, cores)
+		except OSError as exc:
+			LOGGER.warning("Worker %d could not pin to cores %s: %s", index, cores, exc)
+	try:
+		_configure_threads(threads, inter_op)
+		segmenter = factory()
+		segmenter._ensure_model()
+	except BaseException as exc:
+		results.put(("failed", index, f"{type(exc).__name__}: {exc}"))
+		return
+	from src.models.registry import estimate_model_bytes
+
+	results.put(("ready", index, estimate_model_bytes(segmenter)))
+
+	while True:
+		task = tasks.get()
+		if task is None:
+			return
+		task_id, shm_name, h, w, has_roi, prob_dtype = task
+		try:
+			shm = SharedMemory(name=shm_name)
+			try:
+				views = _views(shm.buf, _layout(h, w, has_roi, prob_dtype))
+				image = Image.fromarray(np.array(views["image"]))
+				roi = np.array(views["roi"]) if has_roi else None
+				seg = segmenter.predict(image) if roi is None else segmenter.predict(image, roi=roi)
+				views["overlay"][...] = np.asarray(seg.overlay)
+				prob = seg.prob_map
+				if prob_dtype == "float32":
+					views["prob"][...] = np.asarray(prob, dtype=np.float32)
+				else:
+					if not isinstance(prob, QuantizedProbMap) or prob.dtype != np.dtype(prob_dtype):
+						prob = QuantizedProbMap.from_array(np.asarray(prob, dtype=np.float32), dtype=prob_dtype)
+					views["prob"][...] = prob.quantized()
+				meta = {"area_pixels": seg.area_pixels, "confidence": seg.confidence, "shape_descriptor": seg.shape_descriptor, "threshold": seg.threshold}
+			finally:
+				del views
+				shm.close()
+			results.put((task_id, meta, None))
+		except Exception as exc:
+			results.put((task_id, None, f"{type(exc).__name__}: {exc}"))
+
+
+class ProcessInferencePool:
+	"""Segmenter-compatible front end for ``processes`` worker processes.
+
+	Each worker owns a model, is pinned to its own slice of cores and runs
+	TensorFlow with ``threads_per_process`` intra-op threads, so large machines
+	scale by processes instead of one oversubscribed ``model.predict``.
+	Decoding, inference, thresholding and overlay rendering all happen in the
+	worker; images, ROI masks, overlays and probability maps travel through one
+	shared-memory block per request instead of being pickled.
+	"""
+
+	rethreshold = staticmethod(DeepLabSegmenter.rethreshold)
+
+	def __init__(
+		self,
+		processes: int = INFERENCE_PROCESSES,
+		segmenter_kwargs: Optional[Dict[str, Any]] = None,
+		factory: Optional[Callable[[], DeepLabSegmenter]] = None,
+		threads_per_process: int = INFERENCE_THREADS_PER_PROCESS,
+		inter_op_threads: int = INFERENCE_INTER_OP_THREADS,
+		pin_cores: bool = INFERENCE_PIN_CORES,
+		start_timeout: float = 600.0,
+	) -> None:
+		self.processes = max(1, processes)
+		self.segmenter_kwargs = dict(segmenter_kwargs or {})
+		self.factory = factory or functools.partial(_build_segmenter, self.segmenter_kwargs)
+		self.prob_dtype = self.segmenter_kwargs.get("prob_dtype", "float32")
+		self.start_timeout = start_timeout
+		self.core_groups = assign_cores(self.processes)
+		self.threads = threads_per_process or len(self.core_groups[0])
+		self.inter_op_threads = inter_op_threads
+		self.pin_cores = pin_cores
+		self._ctx = mp.get_context("spawn")  # TensorFlow is not fork-safe
+		self._tasks = self._ctx.Queue()
+		self._results = self._ctx.Queue()
+		self._workers: List[Any] = []
+		self._pending: Dict[int, Tuple[Future, SharedMemory, Dict[str, Any], Tuple[int, int]]] = {}
+		self._ids = itertools.count()
+		self._lock = threading.Lock()
+		self._collector: Optional[threading.Thread] = None
+		self._closed = False
+		self._broken: Optional[str] = None
+		self._model_bytes: List[int] = []
+
+	@property
+	def model_version(self) -> str:
+		kwargs = self.segmenter_kwargs
+		return f"{kwargs.get('hf_repo', 'deeplab')}/{kwargs.get('filename', '')} x{self.processes}"
+
+	@property
+	def model_bytes(self) -> int:
+		"""Parameter memory of all worker models, as reported when they started; 0 before start."""
+		return sum(self._model_bytes)
+
+	def _ensure_model(self) -> "ProcessInferencePool":
+		if self._collector is None:
+			self.start()
+		return self
+
+	def start(self) -> "ProcessInferencePool":
+		"""Spawn the workers and wait until every model is loaded."""
+		with self._lock:
+			if self._collector is not None:
+				return self
+			for index, cores in enumerate(self.core_groups):
+				worker = self._ctx.Process(
+					target=_worker_main,
+					args=(index, cores if self.pin_cores else [], self.threads, self.inter_op_threads, self.factory, self._tasks, self._results),
+					name=f"inference-{index}",
+					daemon=True,
+				)
+				worker.start()
+				self._workers.append(worker)
+			for _ in self._workers:
+				try:
+					status, index, payload = self._results.get(timeout=self.start_timeout)
+				except queue.Empty:
+					self._terminate()
+					raise TimeoutError(f"Inference workers did not start within {self.start_timeout}s") from None
+				if status != "ready":
+					self._terminate()
+					raise RuntimeError(f"Inference worker {index} failed to start: {payload}")
+				self._model_bytes.append(int(payload))
+			LOGGER.info(
+				"Started %d inference processes (%d intra-op threads each, pinned=%s)",
+				self.processes, self.threads, self.pin_cores,
+			)
+			self._collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+			self._collector.start()
+		return self
+
+	def submit(self, source: ImageSource, roi: Optional[np.ndarray] = None) -> "Future[SegmentationOutput]":
+		self._ensure_model()
+		if self._closed or self._broken:
+			raise RuntimeError(self._broken or "Inference pool is closed")
+		pixels = np.asarray(load_image(source))
+		h, w = pixels.shape[:2]
+		layout = _layout(h, w, roi is not None, self.prob_dtype)
+		shm = SharedMemory(create=True, size=max(1, layout["_size"][0]))
+		views = _views(shm.buf, layout)
+		views["image"][...] = pixels
+		if roi is not None:
+			views["roi"][...] = roi
+		del views
+		future: "Future[SegmentationOutput]" = Future()
+		task_id = next(self._ids)
+		with self._lock:
+			self._pending[task_id] = (future, shm, layout, (h, w))
+		self._tasks.put((task_id, shm.name, h, w, roi is not None, self.prob_dtype))
+		return future
+
+	def predict(self, source: ImageSource, roi: Optional[np.ndarray] = None) -> SegmentationOutput:
+		return self.submit(source, roi).result()
+
+	def iter_predict(
+		self,
+		images: Iterable[ImageSource],
+		input_size: Optional[Tuple[int, int]] = None,
+		batch_size: int = 8,
+		workers: int = 4,
+	) -> Iterator[SegmentationOutput]:
+		"""Results in input order, keeping about ``batch_size`` images per worker queued.
+
+		Mirrors :meth:`DeepLabSegmenter.iter_predict`; ``input_size`` and
+		``workers`` are fixed by the worker segmenters and ignored here.
+		"""
+		window = max(1, batch_size) * self.processes
+		sources = iter(images)
+		pending = collections.deque(self.submit(src) for src in itertools.islice(sources, window))
+		while pending:
+			seg = pending.popleft().result()
+			pending.extend(self.submit(src) for src in itertools.islice(sources, 1))
+			yield seg
+
+	def _finish(self, task_id: int, meta: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+		with self._lock:
+			entry = self._pending.pop(task_id, None)
+		if entry is None:
+			return
+		future, shm, layout, (h, w) = entry
+		try:
+			if error is not None:
+				future.set_exception(RuntimeError(error))
+				return
+			views = _views(shm.buf, layout)
+			overlay = Image.fromarray(np.array(views["overlay"]))
+			prob = np.array(views["prob"])
+			del views
+			threshold = meta["threshold"]
+			if self.prob_dtype == "float32":
+				prob_map: Any = prob
+				mask: Any = (prob >= threshold).astype(np.uint8)
+			else:
+				prob_map = QuantizedProbMap.from_quantized(prob)
+				mask = PackedMask.from_array(prob_map.threshold(threshold))
+			future.set_result(SegmentationOutput(mask=mask, prob_map=prob_map, overlay=overlay, **meta))
+		except Exception as exc:
+			future.set_exception(exc)
+		finally:
+			shm.close()
+			shm.unlink()
+
+	def _collect(self) -> None:
+		while True:
+			try:
+				message = self._results.get(timeout=1.0)
+			except queue.Empty:
+				if self._closed:
+					return
+				dead = [w.name for w in self._workers if not w.is_alive()]
+				if dead:
+					self._fail_pending(f"Inference worker(s) exited unexpectedly: {', '.join(dead)}")
+					return
+				continue
+			if message is None:
+				return
+			self._finish(*message)
+
+	def _fail_pending(self, reason: str) -> None:
+		self._broken = reason
+		LOGGER.error(reason)
+		with self._lock:
+			task_ids = list(self._pending)
+		for task_id in task_ids:
+			self._finish(task_id, None, reason)
+
+	def _terminate(self) -> None:
+		for worker in self._workers:
+			worker.terminate()
+			worker.join()
+		self._workers.clear()
+
+	def close(self, timeout: float = 30.0) -> None:
+		"""Let queued requests finish, then stop the workers."""
+		if self._closed:
+			return
+		self._closed = True
+		for _ in self._workers:
+			self._tasks.put(None)
+		for worker in self._workers:
+			worker.join(timeout)
+			if worker.is_alive():
+				worker.terminate()
+		if self._collector is not None:
+			# Results already queued are drained before the stop marker.
+			self._results.put(None)
+			self._collector.join()
+		if self._pending:
+			self._fail_pending("Inference pool closed before these requests finished")
+		self._workers.clear()
+
+	def __enter__(self) -> "ProcessInferencePool":
+		return self.start()
+
+	def __exit__(self, *exc: Any) -> None:
+		self.close()
@@ -0,0 +1,507 @@
+"""Registry of named model versions with a memory-budgeted LRU, hot-swap and A/B routing."""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+	CANDIDATE_MODEL,
+	CANDIDATE_SHADOW,
+	CANDIDATE_TRAFFIC_SHARE,
+	DEFAULT_MODEL,
+	MODEL_MEMORY_BUDGET_MB,
+	INFERENCE_PROCESSES,
+	MODEL_REGISTRY_PATH,
+	PROB_MAP_DTYPE,
+	USE_STUB_MODEL,
+)
+from src.models.process_pool import ProcessInferencePool
+from src.models.segmentation import DeepLabSegmenter, ImageSource, SegmentationOutput, load_image
+from src.utils.profiling import stage
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class ModelSpec:
+	"""A named model version; ``options`` are passed to the builder for ``kind``."""
+
+	name: str
+	kind: str = "deeplab"  # "deeplab", "yolo" or "stub"
+	options: Dict[str, Any] = field(default_factory=dict)
+	memory_mb: Optional[float] = None  # overrides the parameter-count estimate (per worker process for pools)
+
+	@classmethod
+	def from_dict(cls, data: Dict[str, Any]) -> "ModelSpec":
+		data = dict(data)
+		try:
+			name = data.pop("name")
+		except KeyError:
+			raise ValueError("Model spec needs a 'name'") from None
+		kind = data.pop("kind", "deeplab")
+		memory_mb = data.pop("memory_mb", None)
+		if kind not in BUILDERS and kind != "instance":
+			raise ValueError(f"Unknown model kind '{kind}'. Available: {', '.join(BUILDERS)}")
+		return cls(name=name, kind=kind, options=data, memory_mb=memory_mb)
+
+	def as_dict(self) -> Dict[str, Any]:
+		return {"name": self.name, "kind": self.kind, "memory_mb": self.memory_mb, **self.options}
+
+
+def _build_deeplab(options: Dict[str, Any]) -> Any:
+	options = dict(options)
+	if "input_size" in options:
+		options["input_size"] = tuple(options["input_size"])
+	options.setdefault("prob_dtype", PROB_MAP_DTYPE)
+	processes = int(options.pop("processes", INFERENCE_PROCESSES))
+	if processes > 0:
+		return ProcessInferencePool(processes, segmenter_kwargs=options).start()
+	segmenter = DeepLabSegmenter(**options)
+	segmenter._ensure_model()
+	return segmenter
+
+
+def _release(model: Any) -> None:
+	"""Stop worker processes of an unloaded model; queued requests still finish."""
+	close = getattr(model, "close", None)
+	if callable(close):
+		threading.Thread(target=close, name="model-release", daemon=True).start()
+
+
+def _build_yolo(options: Dict[str, Any]) -> Any:
+	from src.models.yolo_model import YOLOModelManager
+
+	return YOLOModelManager(Path(options["weights"]))
+
+
+def _build_stub(options: Dict[str, Any]) -> Any:
+	from src.models.stub import build_stub_segmenter
+
+	return build_stub_segmenter(options)
+
+
+BUILDERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+	"deeplab": _build_deeplab,
+	"yolo": _build_yolo,
+	"stub": _build_stub,
+}
+
+# Kinds whose models return a SegmentationOutput and can serve /upload; YOLO
+# detectors return boxes and are registered for evaluation and memory accounting only.
+SEGMENTER_KINDS = frozenset({"deeplab", "stub", "instance"})
+
+
+def estimate_model_bytes(model: Any) -> int:
+	"""Parameter memory of a loaded Keras segmenter, YOLO manager or process pool (all workers); 0 if unknown."""
+	if isinstance(model, ProcessInferencePool):
+		return model.model_bytes
+	inner = getattr(model, "_model", None) or getattr(model, "model", None)
+	try:
+		count_params = getattr(inner, "count_params", None)
+		if callable(count_params):
+			return int(count_params()) * 4
+		parameters = getattr(getattr(inner, "model", inner), "parameters", None)
+		if callable(parameters):
+			return int(sum(p.numel() * p.element_size() for p in parameters()))
+	except Exception as exc:  # unbuilt graphs and stubs
+		LOGGER.debug("Could not estimate model size: %s", exc)
+	return 0
+
+
+def mask_iou(a: Any, b: Any) -> float:
+	a = np.asarray(a).astype(bool)
+	b = np.asarray(b).astype(bool)
+	union = np.count_nonzero(a | b)
+	return float(np.count_nonzero(a & b) / union) if union else 1.0
+
+
+class VersionStats:
+	"""Latency and output statistics for one model version (thread-safe)."""
+
+	def __init__(self, window: int = 1000) -> None:
+		self._lock = threading.Lock()
+		self.requests = 0
+		self.errors = 0
+		self.spills = 0
+		self.coverage_sum = 0.0
+		self.confidence_sum = 0.0
+		self.latencies: Deque[float] = deque(maxlen=window)
+		self.shadow_runs = 0
+		self.shadow_iou_sum = 0.0
+		self.shadow_area_diff_sum = 0.0
+		self.shadow_agreements = 0
+
+	def record(self, seconds: float, seg: SegmentationOutput) -> None:
+		h, w = seg.mask.shape[:2]
+		with self._lock:
+			self.requests += 1
+			self.latencies.append(seconds)
+			self.spills += int(seg.area_pixels > 0)
+			self.coverage_sum += seg.area_pixels / float(h * w) * 100.0
+			self.confidence_sum += seg.confidence
+
+	def record_error(self) -> None:
+		with self._lock:
+			self.errors += 1
+
+	def record_shadow(self, seconds: float, seg: SegmentationOutput, reference: SegmentationOutput) -> None:
+		iou = mask_iou(seg.mask, reference.mask)
+		with self._lock:
+			self.latencies.append(seconds)
+			self.shadow_runs += 1
+			self.shadow_iou_sum += iou
+			self.shadow_area_diff_sum += abs(seg.area_pixels - reference.area_pixels)
+			self.shadow_agreements += int((seg.area_pixels > 0) == (reference.area_pixels > 0))
+
+	def as_dict(self) -> Dict[str, Any]:
+		with self._lock:
+			latencies = np.asarray(self.latencies, dtype=np.float64)
+			served = max(self.requests, 1)
+			shadow = max(self.shadow_runs, 1)
+			return {
+				"requests": self.requests,
+				"errors": self.errors,
+				"latency_ms": {
+					"mean": float(latencies.mean() * 1000) if latencies.size else 0.0,
+					"p50": float(np.percentile(latencies, 50) * 1000) if latencies.size else 0.0,
+					"p95": float(np.percentile(latencies, 95) * 1000) if latencies.size else 0.0,
+				},
+				"spill_rate": self.spills / served,
+				"mean_coverage_percent": self.coverage_sum / served,
+				"mean_confidence": self.confidence_sum / served,
+				"shadow": {
+					"runs": self.shadow_runs,
+					"mean_mask_iou": self.shadow_iou_sum / shadow,
+					"mean_abs_area_diff": self.shadow_area_diff_sum / shadow,
+					"detection_agreement": self.shadow_agreements / shadow,
+				},
+			}
+
+
+@dataclass
+class _Loaded:
+	model: Any
+	nbytes: int
+	pinned: bool = False
+
+
+class ModelRegistry:
+	"""Named model versions loaded on demand and kept under an LRU memory budget.
+
+	``default`` serves traffic; an optional ``candidate`` receives
+	``candidate_share`` of requests and, with ``shadow``, also runs in the
+	background on default-routed requests so its masks can be compared.
+	Switching the default loads the new version first, so requests never wait
+	on a cold model and in-flight requests finish on the version they started with.
+	"""
+
+	def __init__(
+		self,
+		specs: Iterable[ModelSpec] = (),
+		default: str = DEFAULT_MODEL,
+		candidate: Optional[str] = None,
+		candidate_share: float = 0.0,
+		shadow: bool = False,
+		memory_budget_mb: float = MODEL_MEMORY_BUDGET_MB,
+		seed: Optional[int] = None,
+	) -> None:
+		self._specs: Dict[str, ModelSpec] = {}
+		self._loaded: "OrderedDict[str, _Loaded]" = OrderedDict()
+		self._stats: Dict[str, VersionStats] = {}
+		self._load_locks: Dict[str, threading.Lock] = {}
+		self._lock = threading.RLock()
+		self._rng = random.Random(seed)
+		self._shadow_executor: Optional[ThreadPoolExecutor] = None
+		self.memory_budget_mb = memory_budget_mb
+		self.default = default
+		self.candidate = candidate or None
+		for spec in specs:
+			self.register(spec)
+		self.candidate_share = min(max(candidate_share, 0.0), 1.0)
+		self.shadow = shadow
+
+	# -- versions ----------------------------------------------------------------
+
+	@property
+	def names(self) -> List[str]:
+		with self._lock:
+			return list(self._specs)
+
+	def register(self, spec: ModelSpec) -> None:
+		"""Add or replace a version; a replaced version reloads on next use.
+
+		Replacing the default or candidate builds the new model first and swaps it in
+		afterwards, so routed traffic never finds the version unloaded; if the build
+		fails the old version stays registered.
+		"""
+		with self._lock:
+			routed = spec.name in self._specs and spec.name in (self.default, self.candidate)
+		replacement = None
+		if routed:
+			if spec.kind not in SEGMENTER_KINDS:
+				raise ValueError(f"Model '{spec.name}' receives traffic and cannot be replaced by a '{spec.kind}' detector")
+			if spec.kind != "instance":
+				with self._load_locks[spec.name]:
+					replacement = self._build(spec)
+		with self._lock:
+			self._specs[spec.name] = spec
+			self._stats.setdefault(spec.name, VersionStats())
+			self._load_locks.setdefault(spec.name, threading.Lock())
+			replaced = self._loaded.pop(spec.name, None) if spec.kind != "instance" else None
+			if replacement is not None:
+				self._loaded[spec.name] = replacement
+				self._evict(keep=spec.name)
+		if replaced is not None:
+			_release(replaced.model)
+
+	def register_instance(self, name: str, model: Any) -> None:
+		"""Register an already constructed model; it is pinned and never evicted."""
+		self.register(ModelSpec(name=name, kind="instance"))
+		with self._lock:
+			replaced = self._loaded.get(name)
+			self._loaded[name] = _Loaded(model, estimate_model_bytes(model), pinned=True)
+		if replaced is not None and replaced.model is not model:
+			_release(replaced.model)
+
+	def _require_segmenter(self, name: str) -> None:
+		"""Raise ValueError unless ``name`` is a registered version that can be routed traffic."""
+		with self._lock:
+			spec = self._specs.get(name)
+		if spec is None:
+			raise KeyError(f"Unknown model '{name}'. Registered: {', '.join(self._specs)}")
+		if spec.kind not in SEGMENTER_KINDS:
+			raise ValueError(f"Model '{name}' is a '{spec.kind}' detector and cannot serve segmentation traffic")
+
+	def get(self, name: str) -> Any:
+		"""Loaded model for ``name``, loading it (once, even under concurrency) if needed."""
+		with self._lock:
+			entry = self._loaded.get(name)
+			if entry is not None:
+				self._loaded.move_to_end(name)
+				return entry.model
+			if name not in self._specs:
+				raise KeyError(f"Unknown model '{name}'. Registered: {', '.join(self._specs)}")
+			spec = self._specs[name]
+			load_lock = self._load_locks[name]
+		with load_lock:
+			with self._lock:
+				entry = self._loaded.get(name)
+			if entry is not None:
+				return entry.model
+			entry = self._build(spec)
+			with self._lock:
+				self._loaded[name] = entry
+				self._evict(keep=name)
+		return entry.model
+
+	def _build(self, spec: ModelSpec) -> _Loaded:
+		start = time.perf_counter()
+		model = BUILDERS[spec.kind](spec.options)
+		if spec.memory_mb is not None:
+			# Every worker process of a pool holds its own copy of the model.
+			copies = model.processes if isinstance(model, ProcessInferencePool) else 1
+			nbytes = int(spec.memory_mb * 1024 * 1024) * copies
+		else:
+			nbytes = estimate_model_bytes(model)
+		LOGGER.info("Loaded model '%s' (%.0f MB) in %.1fs", spec.name, nbytes / 1e6, time.perf_counter() - start)
+		return _Loaded(model, nbytes)
+
+	def _evict(self, keep: str) -> None:
+		budget = self.memory_budget_mb * 1024 * 1024
+		total = sum(entry.nbytes for entry in self._loaded.values())
+		for name in list(self._loaded):
+			if total <= budget:
+				break
+			entry = self._loaded[name]
+			if entry.pinned or name in (keep, self.default, self.candidate):
+				continue
+			# Requests already holding the model keep it alive until they finish.
+			del self._loaded[name]
+			_release(entry.model)
+			total -= entry.nbytes
+			LOGGER.info("Unloaded model '%s' to stay within %.0f MB", name, self.memory_budget_mb)
+
+	def unload(self, name: str) -> None:
+		with self._lock:
+			entry = self._loaded.get(name)
+			if entry is not None and not entry.pinned:
+				del self._loaded[name]
+				_release(entry.model)
+
+	def set_default(self, name: str) -> str:
+		"""Warm ``name`` and make it the default; returns the previous default."""
+		self._require_segmenter(name)
+		self.get(name)
+		with self._lock:
+			previous, self.default = self.default, name
+			if self.candidate == name:
+				self.candidate, self.candidate_share = None, 0.0
+		LOGGER.info("Default model switched from '%s' to '%s'", previous, name)
+		return previous
+
+	def set_candidate(self, name: Optional[str], share: float = 0.0, shadow: Optional[bool] = None) -> None:
+		"""Route ``share`` of traffic to ``name``; ``None`` stops the experiment."""
+		if name:
+			self._require_segmenter(name)
+			self.get(name)
+		with self._lock:
+			self.candidate = name or None
+			self.candidate_share = min(max(share, 0.0), 1.0) if name else 0.0
+			if shadow is not None:
+				self.shadow = shadow
+
+	# -- serving -----------------------------------------------------------------
+
+	def route(self) -> str:
+		with self._lock:
+			if self.candidate and self._rng.random() < self.candidate_share:
+				return self.candidate
+			return self.default
+
+	def segment(
+		self,
+		source: ImageSource,
+		name: Optional[str] = None,
+		roi: Optional[np.ndarray] = None,
+	) -> Tuple[SegmentationOutput, str]:
+		"""Segment with ``name`` or the routed version; returns the output and the version used."""
+		name = name or self.route()
+		self._require_segmenter(name)
+		with stage("decode"):
+			image = load_image(source)
+		model = self.get(name)
+		start = time.perf_counter()
+		try:
+			seg = model.predict(image) if roi is None else model.predict(image, roi=roi)
+		except Exception:
+			self._stats[name].record_error()
+			raise
+		self._stats[name].record(time.perf_counter() - start, seg)
+
+		with self._lock:
+			candidate = self.candidate if self.shadow and name == self.default else None
+			if candidate and self._shadow_executor is None:
+				self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+		if candidate:
+			self._shadow_executor.submit(self._run_shadow, candidate, image, seg, roi)
+		return seg, name
+
+	def segment_batch(
+		self,
+		images: Iterable[ImageSource],
+		name: Optional[str] = None,
+		batch_size: int = 8,
+	) -> Iterator[Tuple[SegmentationOutput, str]]:
+		"""Segment ``images`` with one routed version, batched where the model supports it.
+
+		Results are yielded in input order as they are produced. Bulk traffic is
+		not shadowed; per-image latency is the time between consecutive results.
+		"""
+		name = name or self.route()
+		self._require_segmenter(name)
+		model = self.get(name)
+		iter_predict = getattr(model, "iter_predict", None)
+		if callable(iter_predict):
+			results = iter_predict(images, batch_size=batch_size)
+		else:
+			results = (model.predict(load_image(source)) for source in images)
+		stats = self._stats[name]
+		start = time.perf_counter()
+		while True:
+			try:
+				seg = next(results)
+			except StopIteration:
+				return
+			except Exception:
+				stats.record_error()
+				raise
+			now = time.perf_counter()
+			stats.record(now - start, seg)
+			start = now
+			yield seg, name
+
+	def _run_shadow(self, name: str, image: Any, reference: SegmentationOutput, roi: Optional[np.ndarray]) -> None:
+		try:
+			model = self.get(name)
+			start = time.perf_counter()
+			seg = model.predict(image) if roi is None else model.predict(image, roi=roi)
+			self._stats[name].record_shadow(time.perf_counter() - start, seg, reference)
+		except Exception as exc:  # shadow traffic must never affect served requests
+			self._stats[name].record_error()
+			LOGGER.warning("Shadow inference with '%s' failed: %s", name, exc)
+
+	def stats(self) -> Dict[str, Any]:
+		with self._lock:
+			versions = {
+				name: {
+					**spec.as_dict(),
+					"loaded": name in self._loaded,
+					"memory_mb": self._loaded[name].nbytes / (1024 * 1024) if name in self._loaded else None,
+					"stats": self._stats[name].as_dict(),
+				}
+				for name, spec in self._specs.items()
+			}
+			return {
+				"default": self.default,
+				"candidate": self.candidate,
+				"candidate_share": self.candidate_share,
+				"shadow": self.shadow,
+				"memory_budget_mb": self.memory_budget_mb,
+				"versions": versions,
+			}
+
+	def close(self) -> None:
+		if self._shadow_executor is not None:
+			self._shadow_executor.shutdown(wait=True)
+		with self._lock:
+			models = [entry.model for entry in self._loaded.values() if not entry.pinned]
+		for model in models:
+			close = getattr(model, "close", None)
+			if callable(close):
+				close()
+
+
+def load_specs(path: Path = MODEL_REGISTRY_PATH) -> List[ModelSpec]:
+	"""Specs from the registry JSON (a list, or ``{"models": [...]}``) plus the built-in DeepLab model.
+
+	With USE_STUB_MODEL the built-in model is served by the offline stand-in.
+	"""
+	specs: List[ModelSpec] = []
+	path = Path(path)
+	if path.exists():
+		data = json.loads(path.read_text(encoding="utf-8"))
+		specs = [ModelSpec.from_dict(item) for item in (data.get("models", []) if isinstance(data, dict) else data)]
+	if "deeplab-muad" not in {spec.name for spec in specs}:
+		specs.insert(0, ModelSpec(name="deeplab-muad"))
+	if USE_STUB_MODEL:
+		specs = [ModelSpec(name=spec.name, kind="stub") if spec.name == "deeplab-muad" else spec for spec in specs]
+	return specs
+
+
+def load_registry(path: Path = MODEL_REGISTRY_PATH) -> ModelRegistry:
+	"""Registry configured from ``config`` (default, candidate, share, shadow, budget)."""
+	specs = load_specs(path)
+	kinds = {spec.name: spec.kind for spec in specs}
+	for name in filter(None, (DEFAULT_MODEL, CANDIDATE_MODEL)):
+		if name not in kinds:
+			raise ValueError(f"Model '{name}' is not defined in {path}")
+		if kinds[name] not in SEGMENTER_KINDS:
+			raise ValueError(f"Model '{name}' is a '{kinds[name]}' detector and cannot be the default or candidate")
+	return ModelRegistry(
+		specs,
+		default=DEFAULT_MODEL,
+		candidate=CANDIDATE_MODEL or None,
+		candidate_share=CANDIDATE_TRAFFIC_SHARE,
+		shadow=CANDIDATE_SHADOW,
+	)
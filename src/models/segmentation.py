@@ -2,25 +2,114 @@
 
 from __future__ import annotations
 
+import io
+import itertools
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 from PIL import Image
 
+from src.models.artifacts import ArtifactStore
+from src.models.compact import PackedMask, QuantizedProbMap
+from src.utils.profiling import stage
+from src.utils.roi import water_bbox
+
 LOGGER = logging.getLogger(__name__)
 
 
+# A dense float map or its quantized / sparse compact form.
+ProbMap = Union[np.ndarray, QuantizedProbMap]
+
+# Anything predict() can decode: a path, encoded bytes, an HxWx3 array or a PIL image.
+ImageSource = Union[Path, str, bytes, bytearray, memoryview, np.ndarray, Image.Image]
+
+OVERLAY_COLOR = np.array([255, 0, 0], dtype=np.float32)
+OVERLAY_ALPHA = 0.4
+
+# Input sizes derived from an ROI crop are rounded up to this, to match the model's output stride.
+SIZE_MULTIPLE = 16
+
+
 @dataclass
 class SegmentationOutput:
-	mask: np.ndarray  # HxW boolean or uint8 mask for oil spill
-	prob_map: Optional[np.ndarray]  # HxW float probabilities for oil class
+	mask: Union[np.ndarray, PackedMask]  # HxW uint8 mask for oil spill (bit-packed with compact maps)
+	prob_map: Optional[ProbMap]  # HxW probabilities for oil class
 	overlay: Image.Image  # RGB visualization overlayed on original
 	area_pixels: int
 	confidence: float  # mean prob over mask or 0.0 if none
 	shape_descriptor: str
+	threshold: float = 0.5  # probability cut-off that produced mask
+
+
+def load_image(source: ImageSource) -> Image.Image:
+	"""Decode ``source`` once into an RGB image; in-memory inputs never touch the disk."""
+	if isinstance(source, Image.Image):
+		img = source
+	elif isinstance(source, np.ndarray):
+		img = Image.fromarray(source)
+	elif isinstance(source, (bytes, bytearray, memoryview)):
+		img = Image.open(io.BytesIO(source))
+	else:
+		img = Image.open(source)
+	return img if img.mode == "RGB" else img.convert("RGB")
+
+
+def describe_shape(area_pixels: int, total_pixels: int) -> str:
+	if area_pixels > 0 and area_pixels < 0.05 * total_pixels:
+		return "diffuse"
+	return "extensive" if area_pixels > 0.2 * total_pixels else "localized"
+
+
+def apply_threshold(prob_map: ProbMap, original_image: Image.Image, threshold: float) -> SegmentationOutput:
+	"""Derive mask, metrics and overlay from an existing probability map (no inference).
+
+	Compact maps are thresholded on their quantized values and yield a bit-packed mask.
+	"""
+	orig_h, orig_w = prob_map.shape
+	if isinstance(prob_map, QuantizedProbMap):
+		selected = prob_map.threshold(threshold)
+		area_pixels, confidence = prob_map.stats_at(threshold)
+	else:
+		selected = prob_map >= threshold
+		area_pixels = int(np.count_nonzero(selected))
+		confidence = float(prob_map[selected].mean()) if area_pixels > 0 else 0.0
+	# Blend only the masked pixels instead of the whole image in float32.
+	with stage("overlay"):
+		overlay = np.array(original_image if original_image.mode == "RGB" else original_image.convert("RGB"))
+		overlay[selected] = (overlay[selected] * (1 - OVERLAY_ALPHA) + OVERLAY_COLOR * OVERLAY_ALPHA).astype(np.uint8)
+	if isinstance(prob_map, QuantizedProbMap):
+		mask: Union[np.ndarray, PackedMask] = PackedMask.from_array(selected)
+	else:
+		mask = selected.astype(np.uint8)
+	return SegmentationOutput(
+		mask=mask,
+		prob_map=prob_map,
+		overlay=Image.fromarray(overlay),
+		area_pixels=area_pixels,
+		confidence=confidence,
+		shape_descriptor=describe_shape(area_pixels, orig_h * orig_w),
+		threshold=threshold,
+	)
+
+
+def probability_histogram(prob_map: ProbMap, bins: int = 256) -> np.ndarray:
+	"""Pixel counts per probability bin; bin ``i`` covers ``[i / bins, (i + 1) / bins)``."""
+	if isinstance(prob_map, QuantizedProbMap):
+		return prob_map.histogram(bins)
+	idx = np.clip((np.asarray(prob_map) * bins).astype(np.int64), 0, bins - 1)
+	return np.bincount(idx.ravel(), minlength=bins)
+
+
+def coverage_curve(histogram: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+	"""Thresholds and the fraction of pixels at or above each, from :func:`probability_histogram`."""
+	bins = histogram.size
+	at_or_above = np.cumsum(histogram[::-1])[::-1]
+	return np.arange(bins) / bins, at_or_above / max(int(histogram.sum()), 1)
 
 
 class DeepLabSegmenter:
@@ -33,22 +122,39 @@ class DeepLabSegmenter:
 		input_size: Tuple[int, int] = (512, 512),
 		class_index_oil: int = 1,
 		confidence_threshold: float = 0.5,
+		prob_dtype: str = "float32",
+		sha256: Optional[str] = None,
+		artifact_store: Optional[ArtifactStore] = None,
 	) -> None:
 		self.hf_repo = hf_repo
 		self.filename = filename
 		self.input_size = input_size
 		self.class_index_oil = class_index_oil
 		self.confidence_threshold = confidence_threshold
+		self.prob_dtype = prob_dtype
+		self.sha256 = sha256
+		self.artifact_store = artifact_store or ArtifactStore()
 		self._model = None
+		self._model_lock = threading.Lock()
+
+	@property
+	def model_version(self) -> str:
+		return f"{self.hf_repo}/{self.filename}"
 
 	def _ensure_model(self):
 		if self._model is not None:
 			return self._model
+		# Concurrent first requests must not download/load the model more than once.
+		with self._model_lock:
+			if self._model is None:
+				self._model = self._load_model()
+		return self._model
+
+	def _load_model(self):
 		# Lazy imports to avoid DLL load errors at process import time
 		try:
 			import tensorflow as tf  # noqa: F401
 			from tensorflow import keras
-			from huggingface_hub import hf_hub_download
 		except Exception as e:
 			LOGGER.error("Required packages not available: %s", e)
 			raise
@@ -63,62 +169,236 @@ class DeepLabSegmenter:
 				LOGGER.info("No TensorFlow GPU found. Using CPU.")
 		except Exception as gpu_e:
 			LOGGER.warning("Could not configure TensorFlow GPU memory growth: %s", gpu_e)
-		LOGGER.info("Downloading DeepLab V3+ model from Hugging Face: %s/%s", self.hf_repo, self.filename)
-		model_path = hf_hub_download(repo_id=self.hf_repo, filename=self.filename, cache_dir=str(Path(".cache/hf").absolute()))
-		loaded = keras.models.load_model(model_path)
-		self._model = loaded
-		return self._model
+		# Served from the artifact store; the Hub is only contacted if nothing is stored yet.
+		model_path = self.artifact_store.materialize(self.hf_repo, self.filename, self.sha256)
+		LOGGER.info("Loading DeepLab V3+ model from %s", model_path)
+		return keras.models.load_model(str(model_path))
 
-	def _preprocess(self, image: Image.Image) -> Tuple[np.ndarray, Tuple[int, int]]:
-		image = image.convert("RGB")
-		orig_w, orig_h = image.size
-		resized = image.resize(self.input_size[::-1], Image.BILINEAR)
-		arr = np.array(resized).astype(np.float32) / 255.0
-		arr = (arr - np.array([0.485, 0.456, 0.406], dtype=np.float32)) / np.array([0.229, 0.224, 0.225], dtype=np.float32)
-		arr = np.expand_dims(arr, axis=0)
+	def _preprocess(
+		self,
+		image: Image.Image,
+		input_size: Optional[Tuple[int, int]] = None,
+	) -> Tuple[np.ndarray, Tuple[int, int]]:
+		with stage("preprocess"):
+			if image.mode != "RGB":
+				image = image.convert("RGB")
+			orig_w, orig_h = image.size
+			resized = image.resize((input_size or self.input_size)[::-1], Image.BILINEAR)
+			arr = np.array(resized).astype(np.float32) / 255.0
+			arr = (arr - np.array([0.485, 0.456, 0.406], dtype=np.float32)) / np.array([0.229, 0.224, 0.225], dtype=np.float32)
+			arr = np.expand_dims(arr, axis=0)
 		return arr, (orig_h, orig_w)
 
+	@staticmethod
+	def _infer(model, inp: np.ndarray) -> np.ndarray:
+		with stage("inference"):
+			return model.predict(inp, verbose=0)
+
+	def _probabilities(self, logits: np.ndarray, output_hw: Tuple[int, int]) -> np.ndarray:
+		"""Oil-class probability map for a single-sample logits tensor, resized to ``output_hw``."""
+		with stage("probabilities"):
+			# logits shape: (1, H, W, C)
+			if logits.ndim == 4 and logits.shape[-1] > 1:
+				shifted = logits[0] - logits[0].max(axis=-1, keepdims=True)
+				exp = np.exp(shifted)
+				prob_oil = exp[..., self.class_index_oil] / exp.sum(axis=-1)
+			elif logits.ndim == 4:
+				prob_oil = 1.0 / (1.0 + np.exp(-logits[0, ..., 0]))
+			else:
+				raise ValueError("Unexpected logits shape for segmentation output")
+
+			out_h, out_w = output_hw
+			prob_img = Image.fromarray(prob_oil.astype(np.float32))  # mode "F"
+			return np.array(prob_img.resize((out_w, out_h), Image.BILINEAR), dtype=np.float32)
+
+	def _build_output(
+		self,
+		prob_resized: np.ndarray,
+		original_image: Image.Image,
+		roi: Optional[np.ndarray] = None,
+	) -> SegmentationOutput:
+		if roi is not None:
+			# Land and excluded areas can never be reported as oil.
+			prob_resized[~roi] = 0.0
+		prob_map: ProbMap = prob_resized
+		if self.prob_dtype != "float32":
+			# Only the compact form outlives this call; the float map is freed with the frame.
+			with stage("quantize"):
+				prob_map = QuantizedProbMap.from_array(prob_resized, dtype=self.prob_dtype)
+		return apply_threshold(prob_map, original_image, self.confidence_threshold)
+
+	@staticmethod
+	def rethreshold(seg: SegmentationOutput, threshold: float, original_image: Image.Image) -> SegmentationOutput:
+		"""Re-derive a result at another threshold from its cached probability map."""
+		if seg.prob_map is None:
+			raise ValueError("Segmentation output has no probability map to re-threshold")
+		return apply_threshold(seg.prob_map, original_image, threshold)
+
 	def _postprocess(
 		self,
 		logits: np.ndarray,
 		original_hw: Tuple[int, int],
 		original_image: Image.Image,
 	) -> SegmentationOutput:
-		import tensorflow as tf
-		# logits shape: (1, H, W, C)
-		if logits.ndim == 4 and logits.shape[-1] > 1:
-			prob = tf.nn.softmax(logits, axis=-1).numpy()[0]
-			prob_oil = prob[..., self.class_index_oil]
-		elif logits.ndim == 4:
-			prob_oil = tf.math.sigmoid(logits[0, ..., 0]).numpy()
-		else:
-			raise ValueError("Unexpected logits shape for segmentation output")
-
-		orig_h, orig_w = original_hw
-		prob_resized = tf.image.resize(prob_oil[..., None], size=(orig_h, orig_w), method="bilinear").numpy()[..., 0]
-		mask = (prob_resized >= self.confidence_threshold).astype(np.uint8)
-		area_pixels = int(mask.sum())
-		confidence = float(prob_resized[mask == 1].mean()) if area_pixels > 0 else 0.0
-		shape_descriptor = "diffuse" if area_pixels > 0 and area_pixels < (0.05 * orig_h * orig_w) else ("extensive" if area_pixels > (0.2 * orig_h * orig_w) else "localized")
-		orig_rgb = original_image.convert("RGB")
-		overlay = np.array(orig_rgb).astype(np.float32)
-		color = np.array([255, 0, 0], dtype=np.float32)
-		alpha = 0.4
-		overlay[mask == 1] = overlay[mask == 1] * (1 - alpha) + color * alpha
-		overlay_img = Image.fromarray(np.clip(overlay, 0, 255).astype(np.uint8))
-		return SegmentationOutput(
-			mask=mask,
-			prob_map=prob_resized,
-			overlay=overlay_img,
-			area_pixels=area_pixels,
-			confidence=confidence,
-			shape_descriptor=shape_descriptor,
-		)
-
-	def predict(self, image_path: Path) -> SegmentationOutput:
-		from tensorflow import keras
-		img = Image.open(image_path)
-		inp, orig_hw = self._preprocess(img)
+		return self._build_output(self._probabilities(logits, original_hw), original_image)
+
+	@staticmethod
+	def _fixed_input_size(model) -> Optional[Tuple[int, int]]:
+		"""Spatial shape of a graph that only accepts one input size, else ``None``."""
+		shape = getattr(model, "input_shape", None)
+		if isinstance(shape, tuple) and len(shape) == 4 and isinstance(shape[1], int) and isinstance(shape[2], int):
+			return (shape[1], shape[2])
+		return None
+
+	def _resolve_input_size(self, model, requested: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+		"""Requested size, unless the loaded graph only accepts one fixed spatial shape."""
+		size = tuple(requested or self.input_size)
+		fixed = self._fixed_input_size(model)
+		if fixed is not None:
+			if fixed != size:
+				LOGGER.warning("Model has a fixed input shape %s; ignoring requested size %s", fixed, size)
+			return fixed
+		return size
+
+	def _roi_probabilities(
+		self,
+		model,
+		img: Image.Image,
+		size: Tuple[int, int],
+		roi: Optional[np.ndarray],
+	) -> Optional[np.ndarray]:
+		"""Full-resolution probabilities from one pass over the water bounding box.
+
+		The crop keeps the scale of a full-scene pass at ``size``, so the model
+		input shrinks with the water area. Returns ``None`` when ``roi`` holds no
+		water, so inference is skipped.
+		"""
+		orig_w, orig_h = img.size
+		if roi is None:
+			inp, orig_hw = self._preprocess(img, size)
+			return self._probabilities(self._infer(model, inp), orig_hw)
+		if roi.shape != (orig_h, orig_w):
+			raise ValueError(f"ROI mask shape {roi.shape} does not match image size {(orig_h, orig_w)}")
+		box = water_bbox(roi)
+		if box is None:
+			return None
+		y0, x0, y1, x1 = box
+		if (y1 - y0, x1 - x0) == (orig_h, orig_w):
+			inp, orig_hw = self._preprocess(img, size)
+			return self._probabilities(self._infer(model, inp), orig_hw)
+		if self._fixed_input_size(model) is None:
+			size = tuple(
+				max(SIZE_MULTIPLE, -(-side * extent // (full * SIZE_MULTIPLE)) * SIZE_MULTIPLE)
+				for side, extent, full in zip(size, (y1 - y0, x1 - x0), (orig_h, orig_w))
+			)
+		prob = np.zeros((orig_h, orig_w), dtype=np.float32)
+		inp, crop_hw = self._preprocess(img.crop((x0, y0, x1, y1)), size)
+		prob[y0:y1, x0:x1] = self._probabilities(self._infer(model, inp), crop_hw)
+		return prob
+
+	def predict(
+		self,
+		source: ImageSource,
+		input_size: Optional[Tuple[int, int]] = None,
+		roi: Optional[np.ndarray] = None,
+	) -> SegmentationOutput:
+		"""Segment one image; with an HxW water mask ``roi`` only its bounding box is inferred, at a proportionally smaller input size."""
+		with stage("decode"):
+			img = load_image(source)
 		model = self._ensure_model()
-		logits = model.predict(inp, verbose=0)
-		return self._postprocess(logits, orig_hw, img) 
\ No newline at end of file
+		prob = self._roi_probabilities(model, img, self._resolve_input_size(model, input_size), roi)
+		if prob is None:
+			LOGGER.debug("No water inside the ROI; skipping inference")
+			prob = np.zeros(roi.shape, dtype=np.float32)
+		return self._build_output(prob, img, roi)
+
+	def predict_adaptive(
+		self,
+		source: ImageSource,
+		coarse_size: Tuple[int, int] = (256, 256),
+		fine_size: Tuple[int, int] = (512, 512),
+		uncertainty_band: Tuple[float, float] = (0.2, 0.8),
+		min_uncertain_fraction: float = 0.001,
+		batch_size: int = 4,
+		roi: Optional[np.ndarray] = None,
+	) -> SegmentationOutput:
+		"""Coarse-to-fine segmentation.
+
+		A low-resolution pass covers the whole scene; only tiles containing pixels
+		whose probability falls inside ``uncertainty_band`` are re-run at
+		``fine_size`` and pasted back. Open-ocean scenes usually stop after the
+		coarse pass. Tiles without water in ``roi`` are never refined.
+		"""
+		img = load_image(source)
+		model = self._ensure_model()
+		coarse_size = self._resolve_input_size(model, coarse_size)
+		fine_size = self._resolve_input_size(model, fine_size)
+		orig_hw = (img.size[1], img.size[0])
+		prob = self._roi_probabilities(model, img, coarse_size, roi)
+		if prob is None:
+			LOGGER.debug("No water inside the ROI; skipping inference")
+			return self._build_output(np.zeros(orig_hw, dtype=np.float32), img, roi)
+
+		low, high = uncertainty_band
+		uncertain = (prob > low) & (prob < high)
+		if roi is not None:
+			uncertain &= roi
+		if uncertain.mean() < min_uncertain_fraction:
+			LOGGER.debug("Coarse pass confident; skipping refinement")
+			return self._build_output(prob, img, roi)
+
+		# Tiles of roughly fine_size original pixels, so refinement runs near native resolution.
+		orig_h, orig_w = orig_hw
+		tile_h, tile_w = min(fine_size[0], orig_h), min(fine_size[1], orig_w)
+		tiles = [
+			(y, x, min(y + tile_h, orig_h), min(x + tile_w, orig_w))
+			for y in range(0, orig_h, tile_h)
+			for x in range(0, orig_w, tile_w)
+			if uncertain[y:y + tile_h, x:x + tile_w].any()
+		]
+		for start in range(0, len(tiles), batch_size):
+			chunk = tiles[start:start + batch_size]
+			batch = np.concatenate([self._preprocess(img.crop((x0, y0, x1, y1)), fine_size)[0] for y0, x0, y1, x1 in chunk])
+			logits = model.predict(batch, verbose=0)
+			for i, (y0, x0, y1, x1) in enumerate(chunk):
+				prob[y0:y1, x0:x1] = self._probabilities(logits[i:i + 1], (y1 - y0, x1 - x0))
+		LOGGER.debug("Refined %d uncertain tiles at %s", len(tiles), fine_size)
+		return self._build_output(prob, img, roi)
+
+	def predict_batch(
+		self,
+		images: Sequence[ImageSource],
+		input_size: Optional[Tuple[int, int]] = None,
+		batch_size: int = 8,
+		workers: int = 4,
+	) -> List[SegmentationOutput]:
+		"""Segment several images, decoding/preprocessing in threads and running the model in batches."""
+		return list(self.iter_predict(images, input_size=input_size, batch_size=batch_size, workers=workers))
+
+	def iter_predict(
+		self,
+		images: Iterable[ImageSource],
+		input_size: Optional[Tuple[int, int]] = None,
+		batch_size: int = 8,
+		workers: int = 4,
+	) -> Iterator[SegmentationOutput]:
+		"""Lazy variant of :meth:`predict_batch`; only one batch is decoded ahead of the model."""
+
+		model = self._ensure_model()
+		size = self._resolve_input_size(model, input_size)
+
+		def _load(source: ImageSource) -> Tuple[Image.Image, np.ndarray, Tuple[int, int]]:
+			img = load_image(source)
+			inp, orig_hw = self._preprocess(img, size)
+			return img, inp, orig_hw
+
+		sources = iter(images)
+		with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+			# Decode the next batch while the model runs on the current one.
+			pending = [pool.submit(_load, src) for src in itertools.islice(sources, batch_size)]
+			while pending:
+				ready = [future.result() for future in pending]
+				pending = [pool.submit(_load, src) for src in itertools.islice(sources, batch_size)]
+				logits = model.predict(np.concatenate([inp for _, inp, _ in ready]), verbose=0)
+				for i, (img, _, orig_hw) in enumerate(ready):
+					yield self._postprocess(logits[i:i + 1], orig_hw, img)
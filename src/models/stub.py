@@ -0,0 +1,51 @@
+"""Lightweight stand-in for the DeepLab graph, for offline load tests and demos (USE_STUB_MODEL=1)."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from config import PROB_MAP_DTYPE, STUB_MODEL_LATENCY_MS
+from src.models.segmentation import DeepLabSegmenter
+
+
+class StubSegmentationModel:
+	"""Keras-like model returning 2-class logits in which dark pixels are oil.
+
+	Each image costs about ``latency_ms`` of CPU work (NumPy matmuls, which
+	release the GIL like TensorFlow does) so capacity tests see realistic
+	queueing without downloading or loading the real model.
+	"""
+
+	input_shape = (None, None, None, 3)
+
+	def __init__(self, latency_ms: float = STUB_MODEL_LATENCY_MS) -> None:
+		self.latency_ms = latency_ms
+		self._work = np.random.default_rng(0).standard_normal((128, 128)).astype(np.float32)
+
+	def _burn(self, seconds: float) -> None:
+		end = time.perf_counter() + seconds
+		while time.perf_counter() < end:
+			np.dot(self._work, self._work)
+
+	def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+		if self.latency_ms > 0:
+			self._burn(self.latency_ms / 1000.0 * len(batch))
+		# Inputs are ImageNet-normalized; red below the mean reads as oil.
+		score = -3.0 * batch[..., 0:1]
+		return np.concatenate([-score, score], axis=-1)
+
+
+def build_stub_segmenter(options: Dict[str, Any]) -> DeepLabSegmenter:
+	"""DeepLabSegmenter wired to :class:`StubSegmentationModel` (registry kind ``"stub"``)."""
+	options = dict(options)
+	latency_ms = float(options.pop("latency_ms", STUB_MODEL_LATENCY_MS))
+	if "input_size" in options:
+		options["input_size"] = tuple(options["input_size"])
+	options.setdefault("prob_dtype", PROB_MAP_DTYPE)
+	options.setdefault("filename", "stub")
+	segmenter = DeepLabSegmenter(**options)
+	segmenter._model = StubSegmentationModel(latency_ms)
+	return segmenter
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import logging
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Sequence
 
 import numpy as np
 from PIL import Image
@@ -17,7 +17,11 @@ from config import (
     MODEL_DIR,
     YOLO_BASE_MODEL,
     YOLO_MODEL_PATH,
+    YOLO_TILE_OVERLAP,
+    YOLO_TILE_SIZE,
 )
+from src.utils.boxes import Detections, clipped_by_tile, merge_tiles, tile_grid
+from src.utils.training import TrainingProfiler, acceleration_kwargs, promote_best_weights
 
 LOGGER = logging.getLogger(__name__)
 
@@ -48,14 +52,24 @@ class YOLOModelManager:
         lr0: float = 0.001,
         patience: int = 15,
         name: str = "oil_spill_training",
+        accelerate: bool = False,
     ) -> Any:
-        """Train YOLOv8 model and return training results."""
+        """Train YOLOv8 model, promote ``best.pt`` to ``weights_path`` and reload it; returns training results.
+
+        With ``accelerate`` the decoded images are cached (in RAM, or as ``.npy``
+        files on disk when RAM is short), dataloader workers are sized to the CPU
+        count and per-epoch throughput/data-stall time is logged.
+        """
         data_yaml = Path(data_yaml)
         if not data_yaml.exists():
             raise FileNotFoundError(f"Training data YAML not found at {data_yaml}")
 
         LOGGER.info("Starting YOLO training using data: %s", data_yaml)
         model = YOLO(YOLO_BASE_MODEL)
+        extra: Dict[str, Any] = {}
+        if accelerate:
+            extra = acceleration_kwargs(data_yaml, imgsz)
+            TrainingProfiler().attach(model)
         results = model.train(
             data=str(data_yaml),
             epochs=epochs,
@@ -65,10 +79,14 @@ class YOLOModelManager:
             patience=patience,
             name=name,
             exist_ok=True,
+            **extra,
         )
+        # Same as src/train.py: serve the best checkpoint from whichever run directory was used.
+        promote_best_weights(model, self.weights_path)
+        self.model = self._load_model(self.weights_path)
         return results
 
-    def predict(self, image_path: Path) -> List[Dict[str, Any]]:
+    def predict(self, image_path: Path) -> Detections:
         LOGGER.debug("Running prediction on %s", image_path)
         results = self.model.predict(
             source=str(image_path),
@@ -76,20 +94,70 @@ class YOLOModelManager:
             iou=IOU_THRESHOLD,
             verbose=False,
         )[0]
+        return Detections.from_result(results)
 
-        predictions: List[Dict[str, Any]] = []
-        for box in results.boxes:
-            bbox = box.xyxy[0].cpu().numpy().tolist()
-            predictions.append(
-                {
-                    "bbox": bbox,
-                    "confidence": float(box.conf[0]),
-                    "class_id": int(box.cls[0]),
-                    "class_name": results.names[int(box.cls[0])],
-                }
+    def predict_tiled(
+        self,
+        image_path: Path | Image.Image,
+        tile_size: int = YOLO_TILE_SIZE,
+        overlap: int = YOLO_TILE_OVERLAP,
+        batch: int = 8,
+        conf: float = CONFIDENCE_THRESHOLD,
+        full_view: bool = True,
+    ) -> Detections:
+        """Detect on overlapping full-resolution tiles so small ships and wakes survive on large scenes.
+
+        Boxes cut by an inner tile seam are dropped (the overlap shows those
+        objects whole in a neighbouring tile). With ``full_view`` a downscaled
+        pass over the whole scene catches objects larger than the overlap.
+        Everything is merged with class-aware NMS.
+        """
+        img = image_path if isinstance(image_path, Image.Image) else Image.open(image_path)
+        img = img.convert("RGB")
+        tiles = tile_grid(img.width, img.height, tile_size, overlap)
+        parts: List[Detections] = []
+        for start in range(0, len(tiles), batch):
+            chunk = tiles[start:start + batch]
+            results = self.model.predict(
+                source=[img.crop(tile) for tile in chunk],
+                conf=conf,
+                iou=IOU_THRESHOLD,
+                imgsz=tile_size,
+                batch=batch,
+                verbose=False,
             )
-
-        return predictions
+            for tile, result in zip(chunk, results):
+                detections = Detections.from_result(result)
+                detections = detections[~clipped_by_tile(detections.boxes, tile, img.size)]
+                parts.append(detections.shifted(tile[0], tile[1]))
+        if full_view and len(tiles) > 1:
+            result = self.model.predict(source=img, conf=conf, iou=IOU_THRESHOLD, verbose=False)[0]
+            parts.append(Detections.from_result(result))
+        merged = merge_tiles(parts, IOU_THRESHOLD)
+        LOGGER.debug("Tiled detection: %d tiles, %d boxes after NMS", len(tiles), len(merged))
+        return merged
+
+    def predict_batch(
+        self,
+        image_paths: Sequence[Path],
+        imgsz: int | None = None,
+        batch: int = 8,
+        conf: float = CONFIDENCE_THRESHOLD,
+    ) -> Iterator[Detections]:
+        """Run batched inference, yielding the detections of each input image in order."""
+        paths = [str(path) for path in image_paths]
+        extra: Dict[str, Any] = {"imgsz": imgsz} if imgsz else {}
+        for start in range(0, len(paths), batch):
+            results = self.model.predict(
+                source=paths[start:start + batch],
+                conf=conf,
+                iou=IOU_THRESHOLD,
+                batch=batch,
+                verbose=False,
+                **extra,
+            )
+            for result in results:
+                yield Detections.from_result(result)
 
     def render_predictions(self, image_path: Path, output_path: Path) -> Path:
         """Run inference and save the annotated image for visualization."""
@@ -0,0 +1,65 @@
+"""
+Pre-seed the model artifact store so nodes can start without network access.
+Run from project root using: python -m src.seed_models [--from-file model.zip --repo org/name --filename model.zip] [--verify]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import MODEL_CACHE_DIR
+from src.models.artifacts import ArtifactStore
+from src.models.registry import load_specs
+from src.models.segmentation import DeepLabSegmenter
+
+def _deeplab_artifacts():
+    """(repo, filename, sha256) of every DeepLab version in the registry."""
+    defaults = DeepLabSegmenter(artifact_store=ArtifactStore(offline=True))
+    for spec in load_specs():
+        if spec.kind == "deeplab":
+            yield (
+                spec.options.get("hf_repo", defaults.hf_repo),
+                spec.options.get("filename", defaults.filename),
+                spec.options.get("sha256"),
+            )
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Download, verify and unpack model artifacts into the local store")
+    parser.add_argument("--cache-dir", type=Path, default=MODEL_CACHE_DIR)
+    parser.add_argument("--from-file", type=Path, help="seed from a local copy instead of downloading")
+    parser.add_argument("--repo", help="Hub repo the local copy stands in for (with --from-file)")
+    parser.add_argument("--filename", help="Hub filename the local copy stands in for (with --from-file)")
+    parser.add_argument("--sha256", help="expected digest of the local copy (with --from-file)")
+    parser.add_argument("--verify", action="store_true", help="re-hash stored archives instead of seeding")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    store = ArtifactStore(args.cache_dir, offline=False)
+    if args.from_file:
+        if not (args.repo and args.filename):
+            parser.error("--from-file needs --repo and --filename")
+        path = store.seed_from_file(args.repo, args.filename, args.from_file, args.sha256)
+        print(f"[SUCCESS] Seeded {args.repo}/{args.filename} -> {path}")
+        return 0
+
+    failures = 0
+    for repo, filename, sha256 in _deeplab_artifacts():
+        try:
+            if args.verify:
+                print(f"{repo}/{filename}: sha256 {store.verify(repo, filename, sha256)}")
+            else:
+                print(f"{repo}/{filename} -> {store.materialize(repo, filename, sha256)}")
+        except Exception as exc:
+            failures += 1
+            print(f"[ERROR] {repo}/{filename}: {exc}")
+    if failures:
+        return 1
+    print(f"[SUCCESS] Model artifacts ready in {store.root}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Streaming oil spill segmentation for drone/ship video or frame directories.
+Run from project root using: python -m src.stream --input patrol.mp4 [--output out.mp4] [--timeline out.jsonl]
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import DETECTIONS_FOLDER
+from src.models.segmentation import DeepLabSegmenter
+from src.utils.streaming import StreamProcessor, open_frame_source
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Segment a video file or a directory of frames")
+    parser.add_argument("--input", type=Path, required=True, help="video file or directory of frames")
+    parser.add_argument("--output", type=Path, help="annotated output video (.mp4)")
+    parser.add_argument("--timeline", type=Path, help="per-frame JSONL timeline")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=8, help="frames buffered between pipeline stages")
+    parser.add_argument("--stride", type=int, default=1, help="process every N-th video frame")
+    parser.add_argument("--fps", type=float, default=1.0, help="frame rate assumed for frame directories")
+    parser.add_argument("--dedup-threshold", type=float, default=2.0, help="mean thumbnail difference below which a frame is skipped (0 disables)")
+    parser.add_argument("--input-size", type=int, default=512)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    stem = args.input.stem
+    output = args.output or DETECTIONS_FOLDER / f"stream_{stem}.mp4"
+    timeline = args.timeline or output.with_suffix(".jsonl")
+
+    frames, fps = open_frame_source(args.input, stride=args.stride, fps=args.fps)
+    processor = StreamProcessor(
+        DeepLabSegmenter(),
+        batch_size=args.batch_size,
+        queue_size=args.queue_size,
+        dedup_threshold=args.dedup_threshold,
+        input_size=(args.input_size, args.input_size),
+    )
+    stats = processor.run(frames, fps, output, timeline)
+    print(json.dumps(stats.as_dict(), indent=2))
+    print(f"[SUCCESS] Annotated video: {output} | timeline: {timeline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
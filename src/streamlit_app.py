@@ -1,3 +1,4 @@
+import hashlib
 import io
 import logging
 from pathlib import Path
@@ -11,10 +12,9 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from config import DETECTIONS_FOLDER, REPORTS_FOLDER, ensure_directories
-from src.models.segmentation import DeepLabSegmenter
+from config import DETECTIONS_FOLDER, PROB_MAP_DTYPE, REPORTS_FOLDER, ensure_directories
+from src.models.segmentation import DeepLabSegmenter, apply_threshold, coverage_curve, probability_histogram
 from src.utils.reports import DetectionReportBuilder
-import tempfile
 import time
 
 # Configure
@@ -29,13 +29,28 @@ REPORTS_FOLDER.mkdir(parents=True, exist_ok=True)
 # Sidebar controls
 st.sidebar.header("Settings")
 resize_opt = st.sidebar.selectbox("Inference image size", options=[256, 384, 512, 640, 768], index=2)
-
-# State
+adaptive_opt = st.sidebar.checkbox(
+	"Adaptive (coarse-to-fine)",
+	value=False,
+	help="Run a 256px pass first and refine only uncertain regions at the selected size.",
+)
+threshold_opt = st.sidebar.slider(
+	"Oil probability threshold",
+	min_value=0.05,
+	max_value=0.95,
+	value=0.5,
+	step=0.01,
+	help="Re-applied to the cached probability map; changing it does not re-run the model.",
+)
+
+# State: one segmenter (and one loaded model) serves every input size
 @st.cache_resource(show_spinner=False)
-def get_segmenter(input_size: int) -> DeepLabSegmenter:
-	return DeepLabSegmenter(input_size=(input_size, input_size))
+def get_segmenter() -> DeepLabSegmenter:
+	return DeepLabSegmenter(prob_dtype=PROB_MAP_DTYPE)
 
-st.session_state.segmenter = get_segmenter(resize_opt)
+st.session_state.segmenter = get_segmenter()
+if "stages" not in st.session_state:
+	st.session_state.stages = {}
 if "last_overlay" not in st.session_state:
 	st.session_state.last_overlay = None
 if "last_summary" not in st.session_state:
@@ -43,6 +58,23 @@ if "last_summary" not in st.session_state:
 if "last_image_name" not in st.session_state:
 	st.session_state.last_image_name = None
 
+
+def _staged(name: str, key, compute=None):
+	"""Output of stage ``name`` for ``key``, computed at most once per key.
+
+	Keys of downstream stages embed their upstream key, so a widget change
+	only reruns the stages after it. Without ``compute`` a stale stage is None.
+	"""
+	entry = st.session_state.stages.get(name)
+	if entry is not None and entry[0] == key:
+		return entry[1]
+	if compute is None:
+		return None
+	value = compute()
+	st.session_state.stages[name] = (key, value)
+	return value
+
+
 st.title("Marine Shield - Oil Spill Segmentation")
 st.write("Upload a satellite/ocean image to detect potential oil spills using DeepLab V3+.")
 
@@ -61,68 +93,84 @@ def _show_tf_troubleshooting(error_message: str) -> None:
 		st.markdown("- **Official guide**: see `https://www.tensorflow.org/install/errors`.")
 		st.code(error_message)
 
-if uploaded is not None:
-	image_name = uploaded.name
-	img = Image.open(uploaded).convert("RGB")
-	st.session_state.last_image_name = image_name
 
+def _segment(img: Image.Image):
 	with st.status("Running segmentation...", expanded=False) as status:
-		status.update(label="Preprocessing image...")
+		status.update(label="Downloading/loading model (first run may take a while)...")
 		t0 = time.time()
 		segmenter: DeepLabSegmenter = st.session_state.segmenter
-		status.update(label="Downloading/loading model (first run may take a while)...")
-		# Save upload to a temporary file on disk for inference
-		suffix = Path(image_name).suffix or ".png"
-		with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-			tmp.write(uploaded.getbuffer())
-			tmp_path = Path(tmp.name)
 		try:
-			seg = segmenter.predict(image_path=tmp_path)
+			if adaptive_opt:
+				seg = segmenter.predict_adaptive(img, fine_size=(resize_opt, resize_opt))
+			else:
+				seg = segmenter.predict(img, input_size=(resize_opt, resize_opt))
 		except ImportError as e:
 			# TensorFlow import/runtime error handling
 			_show_tf_troubleshooting(str(e))
-			# Ensure temp cleanup
-			try:
-				tmp_path.unlink(missing_ok=True)
-			except Exception:
-				pass
 			st.stop()
 		except Exception as e:
 			st.error(f"Segmentation failed: {e}")
-			try:
-				tmp_path.unlink(missing_ok=True)
-			except Exception:
-				pass
 			st.stop()
-		finally:
-			# Cleanup temp file
-			try:
-				tmp_path.unlink(missing_ok=True)
-			except Exception:
-				pass
-		t1 = time.time()
-		status.update(label="Postprocessing results...")
-
-		# Save overlay for download and later report
-		overlay_path = DETECTIONS_FOLDER / f"overlay_{image_name}"
-		seg.overlay.save(overlay_path)
-		st.session_state.last_overlay = overlay_path
-
-		# Compute summary metrics
-		arr = np.array(img)
-		h, w = arr.shape[:2]
-		coverage_pct = (seg.area_pixels / float(h * w)) * 100.0
-		summary = {
-			"spill_detected": seg.area_pixels > 0,
-			"total_spill_area": float(seg.area_pixels),
-			"coverage_percent": coverage_pct,
-			"shape": seg.shape_descriptor,
-			"confidence": float(seg.confidence),
-			"inference_ms": int((t1 - t0) * 1000),
-		}
-		st.session_state.last_summary = summary
-		status.update(label="Done.")
-		status.update(state="complete")
+		inference_ms = int((time.time() - t0) * 1000)
+		status.update(label="Computing probability histogram...")
+		curve = coverage_curve(probability_histogram(seg.prob_map))
+		status.update(label="Done.", state="complete")
+	return seg, curve, inference_ms
+
+
+def _render_overlay(seg, img: Image.Image, image_name: str):
+	if abs(seg.threshold - threshold_opt) > 1e-9:
+		seg = apply_threshold(seg.prob_map, img, threshold_opt)
+	# Saved once per threshold for download and later report
+	overlay_path = DETECTIONS_FOLDER / f"overlay_{image_name}"
+	seg.overlay.save(overlay_path)
+	return seg, overlay_path, np.asarray(seg.overlay.convert("RGB"))
+
+
+def _summarize(seg, inference_ms: int):
+	h, w = seg.mask.shape[:2]
+	return {
+		"spill_detected": seg.area_pixels > 0,
+		"total_spill_area": float(seg.area_pixels),
+		"coverage_percent": (seg.area_pixels / float(h * w)) * 100.0,
+		"shape": seg.shape_descriptor,
+		"confidence": float(seg.confidence),
+		"threshold": float(seg.threshold),
+		"inference_ms": inference_ms,
+	}
+
+
+def _build_report(img: Image.Image, annotated, summary, image_name: str):
+	t0 = time.time()
+	pdf_path = REPORTS_FOLDER / f"{Path(image_name).stem}_report.pdf"
+	DetectionReportBuilder().build_report(
+		output_path=pdf_path,
+		original_image=img,
+		annotated_array=annotated,
+		detection_summary=summary,
+	)
+	return pdf_path.name, pdf_path.read_bytes(), int((time.time() - t0) * 1000)
+
+
+if uploaded is not None:
+	image_name = uploaded.name
+	st.session_state.last_image_name = image_name
+
+	# Every stage is keyed by the upload digest plus the settings it depends on:
+	# decode → inference (size, adaptive) → overlay (threshold) → summary → report.
+	digest = _staged(
+		"digest",
+		(image_name, uploaded.size, getattr(uploaded, "file_id", None)),
+		lambda: hashlib.sha256(uploaded.getvalue()).hexdigest(),
+	)
+	img = _staged("decode", digest, lambda: Image.open(io.BytesIO(uploaded.getvalue())).convert("RGB"))
+	seg_key = (digest, resize_opt, adaptive_opt)
+	base_seg, curve, inference_ms = _staged("inference", seg_key, lambda: _segment(img))
+	overlay_key = (seg_key, threshold_opt)
+	seg, overlay_path, annotated = _staged("overlay", overlay_key, lambda: _render_overlay(base_seg, img, image_name))
+	summary = _staged("summary", overlay_key, lambda: _summarize(seg, inference_ms))
+	st.session_state.last_overlay = overlay_path
+	st.session_state.last_summary = summary
 
 	# Display
 	with col1:
@@ -130,34 +178,31 @@ if uploaded is not None:
 		st.image(img, use_column_width=True)
 	with col2:
 		st.subheader("Segmentation Overlay")
-		st.image(str(st.session_state.last_overlay), use_column_width=True)
+		st.image(annotated, use_column_width=True)
 
 	st.subheader("Metrics")
-	if st.session_state.last_summary["spill_detected"]:
-		st.metric("Area (pixels)", f"{st.session_state.last_summary['total_spill_area']:.0f}")
-		st.metric("Coverage (%)", f"{st.session_state.last_summary['coverage_percent']:.2f}")
-		st.metric("Confidence (%)", f"{st.session_state.last_summary['confidence']*100:.2f}")
-		st.metric("Inference (ms)", f"{st.session_state.last_summary['inference_ms']}")
-		st.write(f"Shape: {st.session_state.last_summary['shape']}")
+	if summary["spill_detected"]:
+		st.metric("Area (pixels)", f"{summary['total_spill_area']:.0f}")
+		st.metric("Coverage (%)", f"{summary['coverage_percent']:.2f}")
+		st.metric("Confidence (%)", f"{summary['confidence']*100:.2f}")
+		st.metric("Inference (ms)", f"{summary['inference_ms']}")
+		st.write(f"Shape: {summary['shape']}")
 	else:
 		st.info("No oil spill detected above threshold.")
 
-	# Report generation and download
+	thresholds, coverage = curve
+	st.caption("Coverage (% of image) vs. threshold")
+	st.line_chart({"threshold": thresholds, "coverage_percent": coverage * 100.0}, x="threshold", y="coverage_percent")
+
+	# Report generation and download; the PDF stays available until an upstream stage changes
 	st.subheader("Report")
 	if st.button("Generate PDF Report"):
 		with st.spinner("Generating report..."):
-			t2 = time.time()
-			builder = DetectionReportBuilder()
-			pdf_path = REPORTS_FOLDER / f"{Path(image_name).stem}_report.pdf"
-			builder.build_report(
-				output_path=pdf_path,
-				original_image=img,
-				annotated_array=np.array(Image.open(st.session_state.last_overlay).convert("RGB")),
-				detection_summary=st.session_state.last_summary,
-			)
-			t3 = time.time()
-		st.success(f"Report ready in {int((t3 - t2) * 1000)} ms")
-		with open(pdf_path, "rb") as f:
-			st.download_button("Download Report", data=f.read(), file_name=pdf_path.name, mime="application/pdf")
+			_staged("report", overlay_key, lambda: _build_report(img, annotated, summary, image_name))
+	report = _staged("report", overlay_key)
+	if report is not None:
+		pdf_name, pdf_bytes, report_ms = report
+		st.success(f"Report ready in {report_ms} ms")
+		st.download_button("Download Report", data=pdf_bytes, file_name=pdf_name, mime="application/pdf")
 
 st.caption("Model: DeepLab V3+ via Hugging Face | Report powered by FPDF | Marine Shield") 
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Hyperparameter sweep for YOLOv8 oil spill detection.
+Run from project root using: python -m src.sweep --trials 8 [--space space.json] [--promote]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import DATASET_YAML, SWEEP_DB_PATH, SWEEP_SEARCH_SPACE
+from src.utils.sweep import SearchSpace, SweepRunner
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a YOLOv8 hyperparameter sweep")
+    parser.add_argument("--name", default=time.strftime("sweep_%Y%m%d_%H%M%S"))
+    parser.add_argument("--trials", type=int, default=8)
+    parser.add_argument("--space", type=Path, help="JSON search space (defaults to config.SWEEP_SEARCH_SPACE)")
+    parser.add_argument("--data", type=Path, default=DATASET_YAML)
+    parser.add_argument("--db", type=Path, default=SWEEP_DB_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--promote", action="store_true", help="copy the best weights to YOLO_MODEL_PATH")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    spec = json.loads(args.space.read_text()) if args.space else SWEEP_SEARCH_SPACE
+    runner = SweepRunner(args.name, SearchSpace(spec), db_path=args.db, data_yaml=args.data, seed=args.seed)
+    best = runner.run(args.trials)
+    if best is None:
+        print("[FAILED] No trial completed")
+        return 1
+
+    print(f"[SUCCESS] Best trial {best['id']}: {best['best_metric']:.4f} with {best['params']}")
+    if args.promote:
+        print(f"[SUCCESS] Weights promoted to {runner.promote_best()}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
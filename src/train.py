@@ -1,41 +1,54 @@
 """
 YOLOv8 training script for oil spill detection.
-Run from project root using: python -m src.train
+Run from project root using: python -m src.train [--accelerate]
 """
 
-from ultralytics import YOLO
-import shutil
+import argparse
+import logging
 import sys
 from pathlib import Path
-from config import MODEL_DIR, DATASET_BASE
 
 # Add project root to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-def train_model():
+from ultralytics import YOLO
+from config import DATASET_YAML, IMAGE_SIZE, MODEL_DIR, YOLO_BASE_MODEL
+from src.utils.training import TrainingProfiler, acceleration_kwargs, promote_best_weights
+
+def train_model(accelerate: bool = False, epochs: int = 50, imgsz: int = IMAGE_SIZE):
     """Train YOLOv8 model on oil spill dataset"""
     # Create models directory if not exists
     MODEL_DIR.mkdir(parents=True, exist_ok=True)
-    
+
     # Initialize YOLOv8 model
-    model = YOLO('yolov8n.pt')
-    
+    model = YOLO(YOLO_BASE_MODEL)
+
+    # Acceleration mode: decoded-image cache, CPU-sized workers, throughput logging
+    extra = {}
+    if accelerate:
+        extra = acceleration_kwargs(DATASET_YAML, imgsz)
+        TrainingProfiler().attach(model)
+
     # Train model
     results = model.train(
-        data=DATASET_BASE / 'data.yaml',
-        epochs=50,
-        imgsz=640,
+        data=str(DATASET_YAML),
+        epochs=epochs,
+        imgsz=imgsz,
         save=True,
-        name='oil_spill_detection'
+        name='oil_spill_detection',
+        **extra,
     )
-    
-    # Copy best weights to models directory
-    best_weights = Path('runs/detect/oil_spill_detection/weights/best.pt')
-    if best_weights.exists():
-        shutil.copy(best_weights, MODEL_DIR / 'best.pt')
-        print(f"[SUCCESS] Model weights saved to {MODEL_DIR / 'best.pt'}")
-    else:
-        raise FileNotFoundError("Training completed but weights file not found")
+
+    # Copy best weights (from whichever run directory Ultralytics chose) to models directory
+    target = promote_best_weights(model, MODEL_DIR / 'best.pt')
+    print(f"[SUCCESS] Model weights saved to {target}")
+    return results
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train YOLOv8 on the oil spill dataset")
+    parser.add_argument("--accelerate", action="store_true", help="cache decoded images, size workers to CPUs, log throughput")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--imgsz", type=int, default=IMAGE_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    train_model(accelerate=args.accelerate, epochs=args.epochs, imgsz=args.imgsz)
@@ -0,0 +1,143 @@
+"""Streaming extraction of images from batch uploads: plain files, zip and tar archives."""
+
+from __future__ import annotations
+
+import tarfile
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import BinaryIO, Iterator, Optional
+
+from config import (
+	BATCH_MAX_FILE_BYTES,
+	BATCH_MAX_FILES,
+	BATCH_MAX_TOTAL_BYTES,
+	BATCH_ZIP_SPOOL_BYTES,
+	IMAGE_SUFFIXES,
+)
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+class BatchLimitError(ValueError):
+	"""The batch exceeds a limit that makes the rest of it unprocessable."""
+
+
+@dataclass
+class BatchItem:
+	name: str
+	data: Optional[bytes] = None
+	error: Optional[str] = None
+
+
+@dataclass
+class BatchLimits:
+	max_files: int = BATCH_MAX_FILES
+	max_file_bytes: int = BATCH_MAX_FILE_BYTES
+	max_total_bytes: int = BATCH_MAX_TOTAL_BYTES
+	zip_spool_bytes: int = BATCH_ZIP_SPOOL_BYTES
+
+
+class BatchBudget:
+	"""Running file count and uncompressed byte total for one request."""
+
+	def __init__(self, limits: BatchLimits) -> None:
+		self.limits = limits
+		self.files = 0
+		self.bytes = 0
+
+	def charge(self, size: int) -> None:
+		self.files += 1
+		self.bytes += size
+		if self.files > self.limits.max_files:
+			raise BatchLimitError(f"Batch exceeds {self.limits.max_files} images")
+		if self.bytes > self.limits.max_total_bytes:
+			raise BatchLimitError(f"Batch exceeds {self.limits.max_total_bytes} uncompressed bytes")
+
+
+def archive_kind(filename: str) -> Optional[str]:
+	name = filename.lower()
+	if name.endswith(".zip"):
+		return "zip"
+	if name.endswith(TAR_SUFFIXES):
+		return "tar"
+	return None
+
+
+def is_image_name(filename: str) -> bool:
+	return PurePosixPath(filename.lower()).suffix in IMAGE_SUFFIXES
+
+
+def _flat_name(member_name: str) -> str:
+	# "site/2024/scene.png" -> "site_2024_scene.png"; never a path.
+	parts = [p for p in PurePosixPath(member_name.replace("\\", "/")).parts if p not in ("", ".", "..", "/")]
+	return "_".join(parts) or "image"
+
+
+def _read_limited(stream: BinaryIO, limit: int) -> Optional[bytes]:
+	"""Stream contents, or ``None`` if they exceed ``limit`` (headers can lie about sizes)."""
+	data = stream.read(limit + 1)
+	return None if len(data) > limit else data
+
+
+def _too_large(name: str, limit: int) -> BatchItem:
+	return BatchItem(name, error=f"Image exceeds {limit} bytes")
+
+
+def iter_tar(stream: BinaryIO, budget: BatchBudget) -> Iterator[BatchItem]:
+	"""Images of a (optionally compressed) tar read strictly sequentially, never buffered whole."""
+	limit = budget.limits.max_file_bytes
+	with tarfile.open(fileobj=stream, mode="r|*") as archive:
+		for member in archive:
+			if not member.isfile() or not is_image_name(member.name):
+				continue
+			name = _flat_name(member.name)
+			if member.size > limit:
+				yield _too_large(name, limit)
+				continue
+			budget.charge(member.size)
+			yield BatchItem(name, archive.extractfile(member).read())
+
+
+def iter_zip(stream: BinaryIO, budget: BatchBudget) -> Iterator[BatchItem]:
+	"""Images of a zip; the upload is spooled (memory up to a limit, then disk) for random access."""
+	limits = budget.limits
+	with tempfile.SpooledTemporaryFile(max_size=limits.zip_spool_bytes) as spool:
+		copied = 0
+		for chunk in iter(lambda: stream.read(1 << 20), b""):
+			copied += len(chunk)
+			if copied > limits.max_total_bytes:
+				raise BatchLimitError(f"Archive exceeds {limits.max_total_bytes} bytes")
+			spool.write(chunk)
+		spool.seek(0)
+		with zipfile.ZipFile(spool) as archive:
+			for info in archive.infolist():
+				if info.is_dir() or not is_image_name(info.filename):
+					continue
+				name = _flat_name(info.filename)
+				if info.file_size > limits.max_file_bytes:
+					yield _too_large(name, limits.max_file_bytes)
+					continue
+				budget.charge(info.file_size)
+				with archive.open(info) as member:
+					data = _read_limited(member, limits.max_file_bytes)
+				yield BatchItem(name, data) if data is not None else _too_large(name, limits.max_file_bytes)
+
+
+def iter_upload(filename: str, stream: BinaryIO, budget: BatchBudget) -> Iterator[BatchItem]:
+	"""Images in one uploaded file: an archive is unpacked, an image is passed through."""
+	kind = archive_kind(filename)
+	if kind == "tar":
+		yield from iter_tar(stream, budget)
+	elif kind == "zip":
+		yield from iter_zip(stream, budget)
+	elif is_image_name(filename):
+		data = _read_limited(stream, budget.limits.max_file_bytes)
+		if data is None:
+			yield _too_large(_flat_name(filename), budget.limits.max_file_bytes)
+		else:
+			budget.charge(len(data))
+			yield BatchItem(_flat_name(filename), data)
+	else:
+		yield BatchItem(_flat_name(filename), error="Unsupported file type")
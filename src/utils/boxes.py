@@ -0,0 +1,144 @@
+"""Struct-of-arrays box detections, image tiling and class-aware NMS for large scenes."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.metrics import box_iou
+
+Tile = Tuple[int, int, int, int]  # x0, y0, x1, y1 in image pixels
+
+
+@dataclass
+class Detections:
+    """Boxes of one image as parallel arrays, so thousands of boxes cost a few array ops."""
+
+    boxes: np.ndarray  # (N, 4) float32 xyxy in pixels
+    scores: np.ndarray  # (N,) float32
+    classes: np.ndarray  # (N,) int64
+    names: Dict[int, str] = field(default_factory=dict)
+
+    @classmethod
+    def empty(cls, names: Dict[int, str] | None = None) -> "Detections":
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64), dict(names or {}))
+
+    @classmethod
+    def from_result(cls, result: Any) -> "Detections":
+        """Convert an Ultralytics ``Results`` with one device-to-host copy of ``boxes.data``."""
+        data = result.boxes.data
+        data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+        data = data.reshape(-1, data.shape[-1] if data.size else 6)
+        # Rows are x1, y1, x2, y2, [track id,] conf, cls.
+        return cls(
+            data[:, :4].astype(np.float32),
+            data[:, -2].astype(np.float32),
+            data[:, -1].astype(np.int64),
+            dict(result.names),
+        )
+
+    @classmethod
+    def concatenate(cls, parts: Sequence["Detections"]) -> "Detections":
+        if not parts:
+            return cls.empty()
+        names: Dict[int, str] = {}
+        for part in parts:
+            names.update(part.names)
+        return cls(
+            np.concatenate([p.boxes for p in parts]).reshape(-1, 4),
+            np.concatenate([p.scores for p in parts]),
+            np.concatenate([p.classes for p in parts]),
+            names,
+        )
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __getitem__(self, index: Any) -> "Detections":
+        """Subset by boolean mask or index array."""
+        return Detections(self.boxes[index].reshape(-1, 4), self.scores[index], self.classes[index], self.names)
+
+    def shifted(self, dx: float, dy: float) -> "Detections":
+        return Detections(self.boxes + np.array([dx, dy, dx, dy], np.float32), self.scores, self.classes, self.names)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Per-box dicts (``bbox``, ``confidence``, ``class_id``, ``class_name``) for JSON and reports."""
+        return [
+            {
+                "bbox": bbox,
+                "confidence": score,
+                "class_id": cls,
+                "class_name": self.names.get(cls, str(cls)),
+            }
+            for bbox, score, cls in zip(self.boxes.tolist(), self.scores.tolist(), self.classes.tolist())
+        ]
+
+
+def tile_grid(width: int, height: int, tile_size: int, overlap: int) -> List[Tile]:
+    """Tiles of ``tile_size`` covering the image with at least ``overlap`` px shared between neighbours.
+
+    The last row/column is aligned to the image edge instead of padding; an
+    image smaller than a tile is a single (smaller) tile.
+    """
+    if overlap >= tile_size:
+        raise ValueError("Tile overlap must be smaller than the tile size")
+
+    def starts(length: int) -> List[int]:
+        if length <= tile_size:
+            return [0]
+        count = int(np.ceil((length - overlap) / (tile_size - overlap)))
+        return sorted({int(round(s)) for s in np.linspace(0, length - tile_size, count)})
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def clipped_by_tile(boxes: np.ndarray, tile: Tile, image_size: Tuple[int, int], margin: float = 2.0) -> np.ndarray:
+    """Boxes touching a tile edge that is not an image edge (objects cut by the seam)."""
+    x0, y0, x1, y1 = tile
+    width, height = image_size
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    clipped = np.zeros(len(boxes), dtype=bool)
+    if x0 > 0:
+        clipped |= boxes[:, 0] <= margin
+    if y0 > 0:
+        clipped |= boxes[:, 1] <= margin
+    if x1 < width:
+        clipped |= boxes[:, 2] >= (x1 - x0) - margin
+    if y1 < height:
+        clipped |= boxes[:, 3] >= (y1 - y0) - margin
+    return clipped
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression; indices of kept boxes, highest score first."""
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    keep: List[int] = []
+    while order.size:
+        best = order[0]
+        keep.append(int(best))
+        if order.size == 1:
+            break
+        ious = box_iou(boxes[best], boxes[order[1:]])[0]
+        order = order[1:][ious <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Class-aware NMS in one pass: boxes of different classes are offset so they never overlap."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if boxes.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.asarray(classes, dtype=np.float64)[:, None] * (boxes.max() + 1.0)
+    return nms(boxes + offsets, scores, iou_threshold)
+
+
+def merge_tiles(parts: Sequence[Detections], iou_threshold: float) -> Detections:
+    """Concatenate per-tile detections (already in image coordinates) and suppress seam duplicates."""
+    merged = Detections.concatenate(parts)
+    return merged[batched_nms(merged.boxes, merged.scores, merged.classes, iou_threshold)]
@@ -3,78 +3,399 @@
 from __future__ import annotations
 
 import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 from PIL import Image
 
-from config import DETECTIONS_FOLDER, REPORTS_FOLDER
-from src.models.segmentation import DeepLabSegmenter, SegmentationOutput
+from config import BATCH_INFERENCE_SIZE, DETECTIONS_FOLDER, INFERENCE_WORKERS, REPORTS_FOLDER
+from src.models.registry import ModelRegistry, load_registry
+from src.models.segmentation import DeepLabSegmenter, ImageSource, SegmentationOutput, load_image
+from src.utils.history import DetectionHistory, HistoryRecord, create_history, hash_bytes, hash_file
+from src.utils.profiling import RequestProfile, should_profile, stage
 from src.utils.reports import DetectionReportBuilder
+from src.utils.roi import RoiRegistry
 
 LOGGER = logging.getLogger(__name__)
 
 
+class ResultExpiredError(FileNotFoundError):
+	"""The overlay of a recorded detection was removed by storage retention."""
+
+
+def new_request_id() -> str:
+	"""Short unique token used to keep per-request artifact paths apart."""
+	return uuid.uuid4().hex[:12]
+
+
+def _hash_source(source: ImageSource) -> str:
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		return hash_bytes(bytes(source))
+	if isinstance(source, np.ndarray):
+		return hash_bytes(np.ascontiguousarray(source).tobytes())
+	if isinstance(source, Image.Image):
+		return hash_bytes(source.tobytes())
+	return hash_file(Path(source))
+
+
+def _write_upload(source: ImageSource, path: Path) -> None:
+	path.parent.mkdir(parents=True, exist_ok=True)
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		path.write_bytes(source)
+	else:
+		load_image(source).save(path)
+
+
 @dataclass
 class DetectionResult:
 	image_name: str
 	annotated_image_path: Path
 	summary: Dict[str, Any]
 	pdf_report_path: Path | None = None
+	image_path: Path | None = None
+	record_id: int | None = None
+	request_id: str = ""
+	model_version: str = ""
+
+	@classmethod
+	def from_record(cls, record: HistoryRecord) -> "DetectionResult":
+		return cls(
+			image_name=record.image_name,
+			annotated_image_path=Path(record.overlay_path) if record.overlay_path else None,
+			summary=record.summary,
+			pdf_report_path=Path(record.report_path) if record.report_path else None,
+			image_path=Path(record.image_path) if record.image_path else None,
+			record_id=record.id,
+			request_id=f"record{record.id}",
+			model_version=record.model_version,
+		)
 
 
 class DetectionManager:
 	"""Handles detection workflow including image processing and report generation."""
 
-	def __init__(self) -> None:
-		self.segmenter = DeepLabSegmenter()
+	def __init__(
+		self,
+		history: Optional[DetectionHistory] = None,
+		workers: int = INFERENCE_WORKERS,
+		registry: Optional[ModelRegistry] = None,
+	) -> None:
+		# Model versions, default/candidate routing and per-version stats.
+		self.registry = registry or load_registry()
+		# Static water masks per area, applied when a request names one.
+		self.roi = RoiRegistry()
 		self.report_builder = DetectionReportBuilder()
+		self.history = history or create_history()
+		# Bounded pool: at most one inference job per core regardless of request threads.
+		self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+		self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+		# Uploads are persisted off the request path.
+		self._io_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="persist")
+		self._in_flight = 0
+		self._in_flight_lock = threading.Lock()
 
-	def process_image(self, image_path: Path) -> DetectionResult:
-		LOGGER.info("Processing image (segmentation): %s", image_path)
-		image_path = Path(image_path)
-		DETECTIONS_FOLDER.mkdir(parents=True, exist_ok=True)
+	@property
+	def segmenter(self) -> DeepLabSegmenter:
+		"""The current default model."""
+		return self.registry.get(self.registry.default)
+
+	@property
+	def in_flight(self) -> int:
+		"""Queued plus running detections."""
+		with self._in_flight_lock:
+			return self._in_flight
+
+	def _track(self, futures: Sequence[Future]) -> None:
+		with self._in_flight_lock:
+			self._in_flight += len(futures)
+		for future in futures:
+			future.add_done_callback(self._untrack)
+
+	def _untrack(self, _future: Future) -> None:
+		with self._in_flight_lock:
+			self._in_flight -= 1
+
+	def submit(
+		self,
+		source: ImageSource,
+		location: Optional[Tuple[float, float]] = None,
+		image_name: Optional[str] = None,
+		request_id: Optional[str] = None,
+		persist_path: Optional[Path] = None,
+		area: Optional[str] = None,
+		profile: Optional[bool] = None,
+	) -> "Future[DetectionResult]":
+		"""Queue an image on the inference pool; the future resolves to its DetectionResult.
+
+		``source`` may be a path or the in-memory upload (bytes/array/PIL image),
+		which is decoded once. If ``persist_path`` is given, an in-memory upload
+		is written there in the background. ``area`` selects a static ROI mask so
+		land is skipped and never reported. ``profile`` forces (or, if False,
+		suppresses) profiling; by default PROFILE_SAMPLE_RATE of requests are profiled.
+		"""
+		if not isinstance(source, (bytes, bytearray, memoryview, np.ndarray, Image.Image)):
+			source = Path(source)
+		if area:
+			self.roi.get(area)  # unknown areas fail here, not on the pool
+		future = self._executor.submit(
+			self._process, source, location, image_name, request_id or new_request_id(), persist_path, area, profile
+		)
+		self._track([future])
+		return future
+
+	def process_image(
+		self,
+		source: ImageSource,
+		location: Optional[Tuple[float, float]] = None,
+		image_name: Optional[str] = None,
+		request_id: Optional[str] = None,
+		persist_path: Optional[Path] = None,
+		area: Optional[str] = None,
+		profile: Optional[bool] = None,
+	) -> DetectionResult:
+		return self.submit(source, location, image_name, request_id, persist_path, area, profile).result()
+
+	def shutdown(self) -> None:
+		self._executor.shutdown(wait=True)
+		self._io_executor.shutdown(wait=True)
+		self.registry.close()
+
+	def submit_batch(
+		self,
+		items: Sequence[Tuple[ImageSource, str]],
+		persist_folder: Optional[Path] = None,
+		batch_size: int = BATCH_INFERENCE_SIZE,
+	) -> List["Future[DetectionResult]"]:
+		"""Queue ``(source, image_name)`` pairs as one batched inference job.
+
+		Returns one future per item, each resolved as soon as its own result is
+		recorded; an image that cannot be decoded fails only its own future.
+		"""
+		futures: List["Future[DetectionResult]"] = [Future() for _ in items]
+		jobs = []
+		for future, (source, image_name) in zip(futures, items):
+			request_id = new_request_id()
+			persist_path = Path(persist_folder) / f"{request_id}_{image_name}" if persist_folder else None
+			jobs.append((future, source, image_name, request_id, persist_path))
+		self._track(futures)
+		self._executor.submit(self._process_batch, jobs, batch_size)
+		return futures
+
+	def _process_batch(self, jobs: List[Tuple[Future, ImageSource, str, str, Optional[Path]]], batch_size: int) -> None:
+		decoded = []
+		for future, source, image_name, request_id, persist_path in jobs:
+			if not future.set_running_or_notify_cancel():
+				continue
+			try:
+				decoded.append((future, source, load_image(source), *self._prepare(source, image_name, request_id, persist_path), request_id))
+			except Exception as exc:
+				future.set_exception(exc)
+		outputs = self.registry.segment_batch([job[2] for job in decoded], batch_size=batch_size)
+		done = 0
+		try:
+			for (future, source, _, image_name, image_path, write, request_id), (seg, model_version) in zip(decoded, outputs):
+				done += 1
+				try:
+					future.set_result(self._record(seg, model_version, source, image_name, image_path, request_id, write=write))
+				except Exception as exc:
+					future.set_exception(exc)
+		except Exception as exc:
+			LOGGER.exception("Batch inference failed after %d of %d images", done, len(decoded))
+			for job in decoded[done:]:
+				job[0].set_exception(exc)
+
+	def _prepare(
+		self,
+		source: ImageSource,
+		image_name: Optional[str],
+		request_id: str,
+		persist_path: Optional[Path],
+	) -> Tuple[str, Optional[Path], Optional[Future]]:
+		"""Resolve the image name and where the original is (or will be) kept.
+
+		Uploads are written in the background; the returned future is handed to
+		:meth:`_record` so a failed write is detached from the stored record.
+		"""
+		on_disk = isinstance(source, Path)
+		image_name = image_name or (source.name if on_disk else f"{request_id}.png")
+		LOGGER.info("Processing image (segmentation): %s [%s]", image_name, request_id)
+		image_path: Optional[Path] = source if on_disk else None
+		write = None
+		if persist_path is not None and not on_disk:
+			image_path = Path(persist_path)
+			write = self._io_executor.submit(_write_upload, source, image_path)
+		return image_name, image_path, write
 
-		seg: SegmentationOutput = self.segmenter.predict(image_path)
-		annotated_output = DETECTIONS_FOLDER / f"overlay_{image_path.name}"
-		seg.overlay.save(annotated_output)
+	def _record(
+		self,
+		seg: SegmentationOutput,
+		model_version: str,
+		source: ImageSource,
+		image_name: str,
+		image_path: Optional[Path],
+		request_id: str,
+		location: Optional[Tuple[float, float]] = None,
+		extra: Optional[Dict[str, Any]] = None,
+		write: Optional[Future] = None,
+	) -> DetectionResult:
+		"""Save the overlay and store the summary in history."""
+		DETECTIONS_FOLDER.mkdir(parents=True, exist_ok=True)
+		annotated_output = DETECTIONS_FOLDER / f"overlay_{request_id}_{image_name}"
+		with stage("encode"):
+			seg.overlay.save(annotated_output)
 
-		summary = self._summarize_segmentation(seg, image_path)
+		summary = self._summarize_segmentation(seg)
+		summary.update(extra or {})
+		latitude, longitude = location if location else (None, None)
+		with stage("record"):
+			record = self.history.record(
+				HistoryRecord(
+					image_name=image_name,
+					image_hash=_hash_source(source),
+					model_version=model_version,
+					summary=summary,
+					image_path=str(image_path) if image_path else None,
+					overlay_path=str(annotated_output),
+					latitude=latitude,
+					longitude=longitude,
+				)
+			)
+		if write is not None:
+			write.add_done_callback(lambda done: self._check_write(done, record.id, image_path))
 		return DetectionResult(
-			image_name=image_path.name,
+			image_name=image_name,
 			annotated_image_path=annotated_output,
 			summary=summary,
+			image_path=image_path,
+			record_id=record.id,
+			request_id=request_id,
+			model_version=model_version,
 		)
 
+	def _check_write(self, write: Future, record_id: int, image_path: Optional[Path]) -> None:
+		exc = write.exception()
+		if exc is None:
+			return
+		LOGGER.error("Could not keep upload %s for record %s: %s", image_path, record_id, exc)
+		try:
+			self.history.update(record_id, image_path=None)
+		except Exception:
+			LOGGER.exception("Could not detach upload from record %s", record_id)
+
+	def _process(
+		self,
+		source: ImageSource,
+		location: Optional[Tuple[float, float]],
+		image_name: Optional[str],
+		request_id: str,
+		persist_path: Optional[Path],
+		area: Optional[str] = None,
+		profile: Optional[bool] = None,
+	) -> DetectionResult:
+		if not should_profile(profile):
+			return self._detect(source, location, image_name, request_id, persist_path, area)
+		with RequestProfile(request_id) as request_profile:
+			result = self._detect(source, location, image_name, request_id, persist_path, area)
+		# Stored next to the overlay; the summary says where and holds the stage timings.
+		result.summary["profile"] = request_profile.save(DETECTIONS_FOLDER)
+		self.history.update(result.record_id, summary=result.summary)
+		LOGGER.info("Profiled %s [%s]: %.1f ms", result.image_name, request_id, request_profile.total * 1000.0)
+		return result
+
+	def _detect(
+		self,
+		source: ImageSource,
+		location: Optional[Tuple[float, float]],
+		image_name: Optional[str],
+		request_id: str,
+		persist_path: Optional[Path],
+		area: Optional[str],
+	) -> DetectionResult:
+		image_name, image_path, write = self._prepare(source, image_name, request_id, persist_path)
+		roi = None
+		extra: Dict[str, Any] = {}
+		image: ImageSource = source
+		if area:
+			with stage("decode"):
+				image = load_image(source)
+			roi = self.roi.get(area).for_size(image.size)
+			extra = {"area": area, "water_percent": float(np.count_nonzero(roi)) / roi.size * 100.0}
+		with stage("segment"):
+			seg, model_version = self.registry.segment(image, roi=roi)
+		return self._record(seg, model_version, source, image_name, image_path, request_id, location, extra, write)
+
+	def get_profile_path(self, record_id: int) -> Optional[Path]:
+		"""Folded-stack profile stored with a detection record, if it was profiled."""
+		record = self.history.get(record_id)
+		profile = record.summary.get("profile") if record else None
+		if not profile:
+			return None
+		path = DETECTIONS_FOLDER / profile["folded"]
+		return path if path.exists() else None
+
+	def get_record_result(self, record_id: int) -> Optional[DetectionResult]:
+		record = self.history.get(record_id)
+		return DetectionResult.from_record(record) if record else None
+
+	def get_result(self, image_name: str) -> Optional[DetectionResult]:
+		"""Latest stored result for an image name, with its full summary."""
+		record = self.history.latest_for_image(image_name)
+		return DetectionResult.from_record(record) if record else None
+
 	def build_pdf_report(self, detection_result: DetectionResult) -> Path:
 		LOGGER.info("Generating PDF report for %s", detection_result.image_name)
-		pdf_path = REPORTS_FOLDER / f"{Path(detection_result.image_name).stem}_report.pdf"
+		stem = Path(detection_result.image_name).stem
+		suffix = f"_{detection_result.request_id}" if detection_result.request_id else ""
+		pdf_path = REPORTS_FOLDER / f"{stem}{suffix}_report.pdf"
 		REPORTS_FOLDER.mkdir(parents=True, exist_ok=True)
 
-		annotated_image_array = np.array(Image.open(detection_result.annotated_image_path).convert("RGB"))
+		overlay_path = detection_result.annotated_image_path
+		if overlay_path is None or not Path(overlay_path).exists():
+			raise ResultExpiredError(f"The overlay for {detection_result.image_name} has expired from storage")
+		annotated_image_array = np.array(Image.open(overlay_path).convert("RGB"))
+		original_path = detection_result.image_path
+		if original_path is None or not Path(original_path).exists():
+			original_path = detection_result.annotated_image_path
 		self.report_builder.build_report(
 			output_path=pdf_path,
-			original_image=Image.open(detection_result.annotated_image_path),
+			original_image=Image.open(original_path),
 			annotated_array=annotated_image_array,
 			detection_summary=detection_result.summary,
 			predictions=[],
 		)
 
 		detection_result.pdf_report_path = pdf_path
+		if detection_result.record_id is not None:
+			self.history.update(detection_result.record_id, report_path=str(pdf_path))
 		return pdf_path
 
+	def rethreshold(
+		self,
+		seg: SegmentationOutput,
+		threshold: float,
+		original_image: Image.Image,
+	) -> Tuple[SegmentationOutput, Dict[str, Any]]:
+		"""Re-derive mask, overlay and summary at a new threshold from the cached probability map."""
+		# Pure function of the cached probability map; no model needs to be loaded.
+		updated = DeepLabSegmenter.rethreshold(seg, threshold, original_image)
+		return updated, self._summarize_segmentation(updated)
+
 	@staticmethod
-	def _summarize_segmentation(seg: SegmentationOutput, image_path: Path) -> Dict[str, Any]:
+	def _summarize_segmentation(seg: SegmentationOutput) -> Dict[str, Any]:
 		# Pixel area and simple metrics
 		area_pixels = seg.area_pixels
 		spill_detected = area_pixels > 0
 		confidence = seg.confidence
 
-		# Estimate area in sq km if GSD unknown: leave pixels^2 and percentage
-		overlay_img = Image.open(image_path).convert("RGB")
-		h, w = np.array(overlay_img).shape[:2]
+		# Estimate area in sq km if GSD unknown: leave pixels^2 and percentage.
+		# The mask is at original resolution, so the image need not be reopened.
+		h, w = seg.mask.shape[:2]
 		coverage_pct = (area_pixels / float(h * w)) * 100.0
 
 		return {
@@ -83,4 +404,5 @@ class DetectionManager:
 			"coverage_percent": coverage_pct,
 			"shape": seg.shape_descriptor,
 			"confidence": float(confidence),
-		}
\ No newline at end of file
+			"threshold": float(seg.threshold),
+		}
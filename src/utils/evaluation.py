@@ -0,0 +1,178 @@
+"""Offline evaluation of segmentation and detection backends against YOLO-format labels."""
+
+from __future__ import annotations
+
+import csv
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from config import CLASSES, IMAGE_SUFFIXES
+from src.utils.metrics import DetectionMetrics, SegmentationMetrics
+
+LOGGER = logging.getLogger(__name__)
+
+OIL_CLASS_ID = CLASSES.index("oil_spill")
+
+
+@dataclass
+class GroundTruth:
+    boxes: np.ndarray  # (N, 4) xyxy in pixels
+    classes: np.ndarray  # (N,) class ids
+    mask: np.ndarray  # HxW bool, oil spill pixels
+
+
+@dataclass
+class EvalRow:
+    backend: str
+    input_size: int
+    images: int
+    latency_ms: float
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "input_size": self.input_size,
+            "images": self.images,
+            "latency_ms": round(self.latency_ms, 2),
+            "images_per_second": round(1000.0 / self.latency_ms, 2) if self.latency_ms else 0.0,
+            **{name: round(value, 4) for name, value in self.metrics.items() if name != "images"},
+        }
+
+
+def list_split_images(split_dir: Path, limit: Optional[int] = None) -> List[Path]:
+    images = sorted(p for p in Path(split_dir).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return images[:limit] if limit else images
+
+
+def label_path_for(image_path: Path) -> Path:
+    """``<split>/images/x.jpg`` -> ``<split>/labels/x.txt`` (YOLO convention)."""
+    parts = list(image_path.parts)
+    idx = len(parts) - 1 - parts[::-1].index("images")
+    parts[idx] = "labels"
+    return Path(*parts).with_suffix(".txt")
+
+
+def load_ground_truth(image_path: Path, size: Tuple[int, int]) -> GroundTruth:
+    """Read YOLO box (``cls cx cy w h``) or polygon (``cls x1 y1 x2 y2 ...``) labels.
+
+    Polygons are rasterized into the oil-spill mask; box-only labels fill their
+    rectangles, which over-estimates irregular spills but keeps box datasets usable.
+    """
+    width, height = size
+    mask_img = Image.new("1", (width, height), 0)
+    draw = ImageDraw.Draw(mask_img)
+    boxes: List[List[float]] = []
+    classes: List[int] = []
+
+    label_path = label_path_for(image_path)
+    lines = label_path.read_text().splitlines() if label_path.exists() else []
+    for line in lines:
+        values = line.split()
+        if len(values) < 5:
+            continue
+        cls = int(float(values[0]))
+        coords = np.asarray(values[1:], dtype=np.float64)
+        if coords.size == 4:
+            cx, cy, bw, bh = coords
+            box = [(cx - bw / 2) * width, (cy - bh / 2) * height, (cx + bw / 2) * width, (cy + bh / 2) * height]
+            if cls == OIL_CLASS_ID:
+                draw.rectangle(box, fill=1)
+        else:
+            points = coords[: coords.size // 2 * 2].reshape(-1, 2) * (width, height)
+            box = [points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()]
+            if cls == OIL_CLASS_ID:
+                draw.polygon([tuple(p) for p in points], fill=1)
+        boxes.append(box)
+        classes.append(cls)
+
+    return GroundTruth(
+        boxes=np.asarray(boxes, dtype=np.float64).reshape(-1, 4),
+        classes=np.asarray(classes, dtype=np.int64),
+        mask=np.array(mask_img, dtype=bool),
+    )
+
+
+def _timed(iterator: Iterator[Any]) -> Iterator[Tuple[Any, float]]:
+    """Yield items with the seconds spent producing each, so label loading is not counted."""
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        yield item, time.perf_counter() - start
+
+
+def evaluate_segmenter(
+    segmenter: Any,
+    images: Sequence[Path],
+    input_size: int,
+    batch_size: int = 8,
+    workers: int = 4,
+) -> EvalRow:
+    metrics = SegmentationMetrics(threshold=segmenter.confidence_threshold)
+    outputs = segmenter.iter_predict(images, input_size=(input_size, input_size), batch_size=batch_size, workers=workers)
+    elapsed = 0.0
+    for image_path, (seg, seconds) in zip(images, _timed(outputs)):
+        elapsed += seconds
+        h, w = seg.mask.shape[:2]
+        metrics.update(seg.prob_map, load_ground_truth(image_path, (w, h)).mask)
+    LOGGER.info("DeepLab @%d: %d images in %.1fs", input_size, len(images), elapsed)
+    return EvalRow("deeplab", input_size, len(images), 1000.0 * elapsed / max(len(images), 1), metrics.summary())
+
+
+def evaluate_detector(
+    manager: Any,
+    images: Sequence[Path],
+    input_size: int,
+    batch_size: int = 8,
+    tiled: bool = False,
+) -> EvalRow:
+    """Box AP of a YOLO manager; ``tiled`` runs overlapping ``input_size`` tiles at full resolution."""
+    metrics = DetectionMetrics()
+    # Keep low-confidence boxes so AP integrates over the full precision/recall curve.
+    if tiled:
+        outputs = (manager.predict_tiled(path, tile_size=input_size, batch=batch_size, conf=0.001) for path in images)
+    else:
+        outputs = manager.predict_batch(images, imgsz=input_size, batch=batch_size, conf=0.001)
+    elapsed = 0.0
+    for image_path, (detections, seconds) in zip(images, _timed(iter(outputs))):
+        elapsed += seconds
+        with Image.open(image_path) as img:
+            gt = load_ground_truth(image_path, img.size)
+        metrics.update(detections.boxes, detections.scores, detections.classes, gt.boxes, gt.classes)
+    backend = "yolo-tiled" if tiled else "yolo"
+    LOGGER.info("%s @%d: %d images in %.1fs", backend, input_size, len(images), elapsed)
+    return EvalRow(backend, input_size, len(images), 1000.0 * elapsed / max(len(images), 1), metrics.summary())
+
+
+def format_table(rows: Sequence[EvalRow]) -> str:
+    """Markdown latency-vs-accuracy table; metrics missing for a backend are left blank."""
+    dicts = [row.as_dict() for row in rows]
+    columns: List[str] = []
+    for d in dicts:
+        columns.extend(name for name in d if name not in columns)
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for d in dicts:
+        lines.append("| " + " | ".join(str(d.get(name, "")) for name in columns) + " |")
+    return "\n".join(lines)
+
+
+def write_csv(rows: Sequence[EvalRow], path: Path) -> Path:
+    dicts = [row.as_dict() for row in rows]
+    columns: List[str] = []
+    for d in dicts:
+        columns.extend(name for name in d if name not in columns)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as stream:
+        writer = csv.DictWriter(stream, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(dicts)
+    return path
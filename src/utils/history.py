@@ -0,0 +1,307 @@
+"""Persistent detection history with indexed, paginated queries."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import HISTORY_BACKEND, HISTORY_DB_PATH, HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE
+
+# (min_lat, min_lon, max_lat, max_lon)
+BoundingBox = Tuple[float, float, float, float]
+
+
+@dataclass
+class HistoryRecord:
+	image_name: str
+	image_hash: str
+	model_version: str
+	summary: Dict[str, Any]
+	image_path: Optional[str] = None
+	overlay_path: Optional[str] = None
+	report_path: Optional[str] = None
+	latitude: Optional[float] = None
+	longitude: Optional[float] = None
+	created_at: float = field(default_factory=time.time)
+	id: Optional[int] = None
+
+	def as_dict(self) -> Dict[str, Any]:
+		data = asdict(self)
+		data["created_at_iso"] = datetime.fromtimestamp(self.created_at, tz=timezone.utc).isoformat()
+		return data
+
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+	digest = hashlib.sha256()
+	with open(path, "rb") as stream:
+		for chunk in iter(lambda: stream.read(chunk_size), b""):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+
+def hash_bytes(data: bytes) -> str:
+	return hashlib.sha256(data).hexdigest()
+
+
+class HistoryBackend(ABC):
+	"""Storage interface for detection records; implementations must be thread-safe."""
+
+	@abstractmethod
+	def add(self, record: HistoryRecord) -> int:
+		...
+
+	@abstractmethod
+	def get(self, record_id: int) -> Optional[HistoryRecord]:
+		...
+
+	@abstractmethod
+	def update(self, record_id: int, **fields: Any) -> None:
+		...
+
+	@abstractmethod
+	def forget_paths(self, paths: Sequence[str]) -> int:
+		"""Clear image, overlay and report paths equal to any of ``paths``; returns rows changed."""
+
+	@abstractmethod
+	def query(
+		self,
+		image_hash: Optional[str] = None,
+		image_name: Optional[str] = None,
+		since: Optional[float] = None,
+		until: Optional[float] = None,
+		bbox: Optional[BoundingBox] = None,
+		limit: int = HISTORY_PAGE_SIZE,
+		offset: int = 0,
+	) -> List[HistoryRecord]:
+		"""Records matching all given filters, newest first."""
+
+	@abstractmethod
+	def count(
+		self,
+		image_hash: Optional[str] = None,
+		image_name: Optional[str] = None,
+		since: Optional[float] = None,
+		until: Optional[float] = None,
+		bbox: Optional[BoundingBox] = None,
+	) -> int:
+		...
+
+	def close(self) -> None:
+		pass
+
+
+class SQLiteHistoryBackend(HistoryBackend):
+	"""SQLite-backed history, indexed by image hash, name, time and location."""
+
+	COLUMNS = (
+		"image_name",
+		"image_hash",
+		"model_version",
+		"summary",
+		"image_path",
+		"overlay_path",
+		"report_path",
+		"latitude",
+		"longitude",
+		"created_at",
+	)
+
+	def __init__(self, db_path: Path | str = HISTORY_DB_PATH) -> None:
+		if str(db_path) != ":memory:":
+			Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30.0)
+		self._conn.row_factory = sqlite3.Row
+		with self._lock, self._conn:
+			if str(db_path) != ":memory:":
+				self._conn.execute("PRAGMA journal_mode=WAL")
+			self._conn.executescript(
+				"""
+				CREATE TABLE IF NOT EXISTS detections (
+					id INTEGER PRIMARY KEY AUTOINCREMENT,
+					image_name TEXT NOT NULL,
+					image_hash TEXT NOT NULL,
+					model_version TEXT NOT NULL,
+					summary TEXT NOT NULL,
+					image_path TEXT,
+					overlay_path TEXT,
+					report_path TEXT,
+					latitude REAL,
+					longitude REAL,
+					created_at REAL NOT NULL
+				);
+				CREATE INDEX IF NOT EXISTS idx_detections_hash ON detections (image_hash, created_at);
+				CREATE INDEX IF NOT EXISTS idx_detections_name ON detections (image_name, created_at);
+				CREATE INDEX IF NOT EXISTS idx_detections_created ON detections (created_at);
+				CREATE INDEX IF NOT EXISTS idx_detections_location ON detections (latitude, longitude);
+				"""
+			)
+
+	def _row_to_record(self, row: sqlite3.Row) -> HistoryRecord:
+		data = dict(row)
+		data["summary"] = json.loads(data["summary"])
+		return HistoryRecord(**data)
+
+	def add(self, record: HistoryRecord) -> int:
+		values = {name: getattr(record, name) for name in self.COLUMNS}
+		values["summary"] = json.dumps(record.summary)
+		placeholders = ", ".join("?" for _ in self.COLUMNS)
+		with self._lock, self._conn:
+			cursor = self._conn.execute(
+				f"INSERT INTO detections ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+				tuple(values[name] for name in self.COLUMNS),
+			)
+		record.id = int(cursor.lastrowid)
+		return record.id
+
+	def get(self, record_id: int) -> Optional[HistoryRecord]:
+		with self._lock:
+			row = self._conn.execute("SELECT * FROM detections WHERE id = ?", (record_id,)).fetchone()
+		return self._row_to_record(row) if row else None
+
+	def update(self, record_id: int, **fields: Any) -> None:
+		unknown = set(fields) - set(self.COLUMNS)
+		if unknown:
+			raise ValueError(f"Unknown history fields: {', '.join(sorted(unknown))}")
+		if "summary" in fields:
+			fields["summary"] = json.dumps(fields["summary"])
+		columns = ", ".join(f"{name} = ?" for name in fields)
+		with self._lock, self._conn:
+			self._conn.execute(f"UPDATE detections SET {columns} WHERE id = ?", (*fields.values(), record_id))
+
+	def forget_paths(self, paths: Sequence[str]) -> int:
+		paths = list(paths)
+		changed = 0
+		with self._lock, self._conn:
+			# Chunked to stay below SQLite's bound-parameter limit.
+			for start in range(0, len(paths), 500):
+				chunk = paths[start:start + 500]
+				placeholders = ", ".join("?" for _ in chunk)
+				for column in ("image_path", "overlay_path", "report_path"):
+					cursor = self._conn.execute(
+						f"UPDATE detections SET {column} = NULL WHERE {column} IN ({placeholders})",
+						chunk,
+					)
+					changed += cursor.rowcount
+		return changed
+
+	@staticmethod
+	def _where(
+		image_hash: Optional[str],
+		image_name: Optional[str],
+		since: Optional[float],
+		until: Optional[float],
+		bbox: Optional[BoundingBox],
+	) -> Tuple[str, List[Any]]:
+		clauses: List[str] = []
+		params: List[Any] = []
+		if image_hash:
+			clauses.append("image_hash = ?")
+			params.append(image_hash)
+		if image_name:
+			clauses.append("image_name = ?")
+			params.append(image_name)
+		if since is not None:
+			clauses.append("created_at >= ?")
+			params.append(since)
+		if until is not None:
+			clauses.append("created_at < ?")
+			params.append(until)
+		if bbox is not None:
+			min_lat, min_lon, max_lat, max_lon = bbox
+			clauses.append("latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+			params.extend([min_lat, max_lat, min_lon, max_lon])
+		return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+	def query(
+		self,
+		image_hash: Optional[str] = None,
+		image_name: Optional[str] = None,
+		since: Optional[float] = None,
+		until: Optional[float] = None,
+		bbox: Optional[BoundingBox] = None,
+		limit: int = HISTORY_PAGE_SIZE,
+		offset: int = 0,
+	) -> List[HistoryRecord]:
+		where, params = self._where(image_hash, image_name, since, until, bbox)
+		sql = f"SELECT * FROM detections{where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+		with self._lock:
+			rows = self._conn.execute(sql, (*params, limit, offset)).fetchall()
+		return [self._row_to_record(row) for row in rows]
+
+	def count(
+		self,
+		image_hash: Optional[str] = None,
+		image_name: Optional[str] = None,
+		since: Optional[float] = None,
+		until: Optional[float] = None,
+		bbox: Optional[BoundingBox] = None,
+	) -> int:
+		where, params = self._where(image_hash, image_name, since, until, bbox)
+		with self._lock:
+			return int(self._conn.execute(f"SELECT COUNT(*) FROM detections{where}", params).fetchone()[0])
+
+	def close(self) -> None:
+		with self._lock:
+			self._conn.close()
+
+
+BACKENDS = {
+	"sqlite": SQLiteHistoryBackend,
+}
+
+
+class DetectionHistory:
+	"""Facade used by the app: records results and serves paginated queries."""
+
+	def __init__(self, backend: HistoryBackend) -> None:
+		self.backend = backend
+
+	def record(self, record: HistoryRecord) -> HistoryRecord:
+		self.backend.add(record)
+		return record
+
+	def get(self, record_id: int) -> Optional[HistoryRecord]:
+		return self.backend.get(record_id)
+
+	def update(self, record_id: int, **fields: Any) -> None:
+		self.backend.update(record_id, **fields)
+
+	def forget_files(self, paths: Iterable[Path]) -> int:
+		"""Detach deleted files from the records that reference them (as stored or absolute paths)."""
+		names = set()
+		for path in paths:
+			names.add(str(path))
+			names.add(str(Path(path).resolve()))
+		return self.backend.forget_paths(sorted(names)) if names else 0
+
+	def latest_for_image(self, image_name: str) -> Optional[HistoryRecord]:
+		records = self.backend.query(image_name=image_name, limit=1)
+		return records[0] if records else None
+
+	def page(self, page: int = 1, page_size: int = HISTORY_PAGE_SIZE, **filters: Any) -> Dict[str, Any]:
+		page = max(1, page)
+		page_size = max(1, min(page_size, HISTORY_MAX_PAGE_SIZE))
+		items = self.backend.query(limit=page_size, offset=(page - 1) * page_size, **filters)
+		return {
+			"items": [item.as_dict() for item in items],
+			"page": page,
+			"page_size": page_size,
+			"total": self.backend.count(**filters),
+		}
+
+
+def create_history(backend: str = HISTORY_BACKEND, **kwargs: Any) -> DetectionHistory:
+	try:
+		backend_cls = BACKENDS[backend]
+	except KeyError:
+		raise ValueError(f"Unknown history backend '{backend}'. Available: {', '.join(BACKENDS)}") from None
+	return DetectionHistory(backend_cls(**kwargs))
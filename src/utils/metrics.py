@@ -0,0 +1,213 @@
+"""Segmentation and detection quality metrics (IoU/Dice, precision/recall, AP)."""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+DEFAULT_SCORE_THRESHOLDS = (0.3, 0.5, 0.7)
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between ``(N, 4)`` and ``(M, 4)`` xyxy boxes."""
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]).clip(0) * (boxes_a[:, 3] - boxes_a[:, 1]).clip(0)
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]).clip(0) * (boxes_b[:, 3] - boxes_b[:, 1]).clip(0)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    wh = (bottom_right - top_left).clip(0)
+    inter = wh[..., 0] * wh[..., 1]
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _interpolated_ap(recall: np.ndarray, precision: np.ndarray) -> float:
+    """COCO-style 101-point interpolated average precision."""
+    if recall.size == 0:
+        return 0.0
+    envelope = np.maximum.accumulate(precision[::-1])[::-1]
+    points = np.linspace(0.0, 1.0, 101)
+    idx = np.searchsorted(recall, points, side="left")
+    values = np.where(idx < envelope.size, envelope[np.minimum(idx, envelope.size - 1)], 0.0)
+    return float(values.mean())
+
+
+class SegmentationMetrics:
+    """Accumulates pixel-level quality of probability maps against binary ground-truth masks.
+
+    Probabilities are binned into a fixed histogram per class, so precision,
+    recall and IoU at any threshold (and pixel AP) come from the running totals
+    without keeping the maps around.
+    """
+
+    def __init__(self, threshold: float = 0.5, bins: int = 256) -> None:
+        self.threshold = threshold
+        self.bins = bins
+        self.pos_hist = np.zeros(bins, dtype=np.int64)
+        self.neg_hist = np.zeros(bins, dtype=np.int64)
+        self.iou_sum = 0.0
+        self.dice_sum = 0.0
+        self.images = 0
+
+    def update(self, prob_map: np.ndarray, gt_mask: np.ndarray) -> None:
+        prob = np.asarray(prob_map, dtype=np.float32)
+        gt = np.asarray(gt_mask).astype(bool)
+        if prob.shape != gt.shape:
+            raise ValueError(f"Probability map {prob.shape} and mask {gt.shape} differ in shape")
+
+        idx = np.clip((prob * self.bins).astype(np.int64), 0, self.bins - 1)
+        self.pos_hist += np.bincount(idx[gt], minlength=self.bins)
+        self.neg_hist += np.bincount(idx[~gt], minlength=self.bins)
+
+        pred = prob >= self.threshold
+        inter = np.count_nonzero(pred & gt)
+        pred_area = np.count_nonzero(pred)
+        gt_area = np.count_nonzero(gt)
+        union = pred_area + gt_area - inter
+        # An empty prediction on an empty scene is a perfect match.
+        self.iou_sum += inter / union if union else 1.0
+        self.dice_sum += 2.0 * inter / (pred_area + gt_area) if (pred_area + gt_area) else 1.0
+        self.images += 1
+
+    def _bin(self, threshold: float) -> int:
+        return int(np.clip(round(threshold * self.bins), 0, self.bins))
+
+    def confusion(self, threshold: float) -> Dict[str, int]:
+        k = self._bin(threshold)
+        return {
+            "tp": int(self.pos_hist[k:].sum()),
+            "fp": int(self.neg_hist[k:].sum()),
+            "fn": int(self.pos_hist[:k].sum()),
+        }
+
+    def precision_recall(self, threshold: float) -> Dict[str, float]:
+        c = self.confusion(threshold)
+        predicted = c["tp"] + c["fp"]
+        actual = c["tp"] + c["fn"]
+        return {
+            "precision": c["tp"] / predicted if predicted else 0.0,
+            "recall": c["tp"] / actual if actual else 0.0,
+        }
+
+    def average_precision(self) -> float:
+        positives = self.pos_hist.sum()
+        if positives == 0:
+            return 0.0
+        tp = np.cumsum(self.pos_hist[::-1])
+        fp = np.cumsum(self.neg_hist[::-1])
+        precision = tp / np.maximum(tp + fp, 1)
+        recall = tp / positives
+        recall_steps = np.diff(np.concatenate([[0.0], recall]))
+        return float((recall_steps * precision).sum())
+
+    def summary(self, thresholds: Sequence[float] = DEFAULT_SCORE_THRESHOLDS) -> Dict[str, float]:
+        c = self.confusion(self.threshold)
+        denom = c["tp"] + c["fp"] + c["fn"]
+        result = {
+            "images": float(self.images),
+            "mean_iou": self.iou_sum / self.images if self.images else 0.0,
+            "mean_dice": self.dice_sum / self.images if self.images else 0.0,
+            "global_iou": c["tp"] / denom if denom else 0.0,
+            "pixel_ap": self.average_precision(),
+        }
+        for t in thresholds:
+            pr = self.precision_recall(t)
+            result[f"precision@{t:g}"] = pr["precision"]
+            result[f"recall@{t:g}"] = pr["recall"]
+        return result
+
+
+class DetectionMetrics:
+    """Accumulates box detections and computes per-class AP and mAP@[.5:.95]."""
+
+    def __init__(self) -> None:
+        self._scores: List[np.ndarray] = []
+        self._classes: List[np.ndarray] = []
+        self._tp: List[np.ndarray] = []
+        self._gt_counts: Counter = Counter()
+        self.images = 0
+
+    def update(
+        self,
+        pred_boxes: np.ndarray,
+        pred_scores: np.ndarray,
+        pred_classes: np.ndarray,
+        gt_boxes: np.ndarray,
+        gt_classes: np.ndarray,
+    ) -> None:
+        pred_boxes = np.asarray(pred_boxes, dtype=np.float64).reshape(-1, 4)
+        pred_scores = np.asarray(pred_scores, dtype=np.float64).reshape(-1)
+        pred_classes = np.asarray(pred_classes, dtype=np.int64).reshape(-1)
+        gt_boxes = np.asarray(gt_boxes, dtype=np.float64).reshape(-1, 4)
+        gt_classes = np.asarray(gt_classes, dtype=np.int64).reshape(-1)
+        self._gt_counts.update(gt_classes.tolist())
+        self.images += 1
+
+        for cls in np.unique(np.concatenate([pred_classes, gt_classes])):
+            p = np.flatnonzero(pred_classes == cls)
+            if p.size == 0:
+                continue
+            p = p[np.argsort(-pred_scores[p], kind="stable")]
+            g = gt_boxes[gt_classes == cls]
+            ious = box_iou(pred_boxes[p], g)
+            tp = np.zeros((p.size, IOU_THRESHOLDS.size), dtype=bool)
+            for ti, t in enumerate(IOU_THRESHOLDS):
+                matched = np.zeros(len(g), dtype=bool)
+                for i in range(p.size):
+                    candidates = np.where(~matched & (ious[i] >= t), ious[i], -1.0)
+                    if candidates.size and candidates.max() >= 0:
+                        j = int(candidates.argmax())
+                        matched[j] = True
+                        tp[i, ti] = True
+            self._scores.append(pred_scores[p])
+            self._classes.append(np.full(p.size, cls, dtype=np.int64))
+            self._tp.append(tp)
+
+    def _stacked(self):
+        if not self._scores:
+            return np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros((0, IOU_THRESHOLDS.size), dtype=bool)
+        return np.concatenate(self._scores), np.concatenate(self._classes), np.concatenate(self._tp)
+
+    def class_ap(self) -> Dict[int, np.ndarray]:
+        """AP per class at each IoU threshold in ``IOU_THRESHOLDS``."""
+        scores, classes, tp = self._stacked()
+        result: Dict[int, np.ndarray] = {}
+        for cls, n_gt in self._gt_counts.items():
+            sel = classes == cls
+            order = np.argsort(-scores[sel], kind="stable")
+            cls_tp = tp[sel][order]
+            ctp = np.cumsum(cls_tp, axis=0)
+            cfp = np.cumsum(~cls_tp, axis=0)
+            recall = ctp / max(n_gt, 1)
+            precision = ctp / np.maximum(ctp + cfp, 1)
+            result[cls] = np.array([_interpolated_ap(recall[:, k], precision[:, k]) for k in range(IOU_THRESHOLDS.size)])
+        return result
+
+    def precision_recall(self, score_threshold: float, iou_index: int = 0) -> Dict[str, float]:
+        scores, _, tp = self._stacked()
+        keep = scores >= score_threshold
+        hits = int(tp[keep, iou_index].sum())
+        predicted = int(keep.sum())
+        actual = sum(self._gt_counts.values())
+        return {
+            "precision": hits / predicted if predicted else 0.0,
+            "recall": hits / actual if actual else 0.0,
+        }
+
+    def summary(self, thresholds: Iterable[float] = DEFAULT_SCORE_THRESHOLDS) -> Dict[str, float]:
+        aps = self.class_ap()
+        stacked = np.stack(list(aps.values())) if aps else np.zeros((0, IOU_THRESHOLDS.size))
+        result = {
+            "images": float(self.images),
+            "map50": float(stacked[:, 0].mean()) if stacked.size else 0.0,
+            "map50_95": float(stacked.mean()) if stacked.size else 0.0,
+        }
+        for t in thresholds:
+            pr = self.precision_recall(t)
+            result[f"precision@{t:g}"] = pr["precision"]
+            result[f"recall@{t:g}"] = pr["recall"]
+        return result
@@ -0,0 +1,210 @@
+"""Opt-in per-request profiling: stage timings, a sampled stack profile and an optional TF trace."""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import PROFILE_INTERVAL_MS, PROFILE_SAMPLE_RATE, PROFILE_TF_LOGDIR, PROFILE_TF_TRACE
+
+LOGGER = logging.getLogger(__name__)
+
+_STARTED = time.time()
+
+_active = threading.local()
+# TensorFlow's profiler is process-wide: one trace at a time.
+_tf_lock = threading.Lock()
+
+
+def should_profile(requested: Optional[bool] = None, rate: float = PROFILE_SAMPLE_RATE) -> bool:
+	"""Explicit requests win; otherwise profile a ``rate`` fraction of requests."""
+	if requested is not None:
+		return requested
+	return rate > 0 and random.random() < rate
+
+
+def _fold(frame: Any) -> str:
+	names: List[str] = []
+	while frame is not None:
+		code = frame.f_code
+		names.append(f"{Path(code.co_filename).name}:{code.co_name}")
+		frame = frame.f_back
+	return ";".join(reversed(names))
+
+
+class StackSampler:
+	"""Samples one thread's Python stack every ``interval`` seconds into folded-stack counts.
+
+	The output (``frame;frame;frame count`` per line) is read directly by
+	flamegraph.pl, speedscope and inferno.
+	"""
+
+	def __init__(self, thread_id: Optional[int] = None, interval: float = PROFILE_INTERVAL_MS / 1000.0) -> None:
+		self.thread_id = thread_id or threading.get_ident()
+		self.interval = interval
+		self.counts: Counter = Counter()
+		self.samples = 0
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	def start(self) -> "StackSampler":
+		self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join()
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.interval):
+			frame = sys._current_frames().get(self.thread_id)
+			if frame is None:
+				return
+			self.counts[_fold(frame)] += 1
+			self.samples += 1
+
+	def folded(self) -> str:
+		return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+def _start_tf_trace(logdir: Path) -> bool:
+	if not _tf_lock.acquire(blocking=False):
+		LOGGER.info("TensorFlow trace already running; skipping op-level profile")
+		return False
+	try:
+		import tensorflow as tf
+
+		logdir.mkdir(parents=True, exist_ok=True)
+		tf.profiler.experimental.start(str(logdir))
+	except Exception as exc:
+		_tf_lock.release()
+		LOGGER.warning("Could not start TensorFlow trace: %s", exc)
+		return False
+	return True
+
+
+def _stop_tf_trace() -> None:
+	try:
+		import tensorflow as tf
+
+		tf.profiler.experimental.stop()
+	except Exception as exc:
+		LOGGER.warning("Could not stop TensorFlow trace: %s", exc)
+	finally:
+		_tf_lock.release()
+
+
+class RequestProfile:
+	"""Profile of one request on the current thread.
+
+	While active, :func:`stage` blocks on this thread are timed (nested stages
+	are keyed ``outer/inner`` and include their children) and a
+	:class:`StackSampler` records where the time went.
+	"""
+
+	def __init__(
+		self,
+		request_id: str,
+		interval: float = PROFILE_INTERVAL_MS / 1000.0,
+		tf_trace: bool = PROFILE_TF_TRACE,
+		tf_logdir: Path = PROFILE_TF_LOGDIR,
+	) -> None:
+		self.request_id = request_id
+		self.interval = interval
+		self.tf_trace = tf_trace
+		self.tf_logdir = Path(tf_logdir) / request_id
+		self.stages: Dict[str, float] = {}
+		self.total = 0.0
+		self.sampler = StackSampler(interval=interval)
+		self._stack: List[str] = []
+		self._previous: Optional[RequestProfile] = None
+		self._tracing = False
+		self._start = 0.0
+
+	def __enter__(self) -> "RequestProfile":
+		self._previous = getattr(_active, "profile", None)
+		_active.profile = self
+		self._tracing = self.tf_trace and _start_tf_trace(self.tf_logdir)
+		self.sampler.start()
+		self._start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc: Any) -> None:
+		self.total = time.perf_counter() - self._start
+		self.sampler.stop()
+		if self._tracing:
+			_stop_tf_trace()
+		_active.profile = self._previous
+
+	@contextmanager
+	def stage(self, name: str) -> Iterator[None]:
+		key = "/".join(self._stack + [name])
+		self._stack.append(name)
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self._stack.pop()
+			self.stages[key] = self.stages.get(key, 0.0) + time.perf_counter() - start
+
+	def save(self, folder: Path) -> Dict[str, Any]:
+		"""Write ``profile_<request_id>.folded`` to ``folder``; returns the summary kept with the result."""
+		folder.mkdir(parents=True, exist_ok=True)
+		path = folder / f"profile_{self.request_id}.folded"
+		path.write_text(self.sampler.folded(), encoding="utf-8")
+		return {
+			"folded": path.name,
+			"samples": self.sampler.samples,
+			"interval_ms": self.interval * 1000.0,
+			"total_ms": self.total * 1000.0,
+			"stages_ms": {key: seconds * 1000.0 for key, seconds in self.stages.items()},
+			"tf_trace": str(self.tf_logdir) if self._tracing else None,
+		}
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+	"""Time a block for the request being profiled on this thread; a no-op otherwise."""
+	profile = getattr(_active, "profile", None)
+	if profile is None:
+		yield
+		return
+	with profile.stage(name):
+		yield
+
+
+def resource_usage() -> Dict[str, Any]:
+	"""CPU time, memory and thread counts of this process (stdlib only; fields are None where unsupported)."""
+	usage: Dict[str, Any] = {
+		"uptime_s": time.time() - _STARTED,
+		"cpu_count": os.cpu_count(),
+		"threads": threading.active_count(),
+		"cpu_seconds": time.process_time(),
+		"rss_mb": None,
+		"max_rss_mb": None,
+		"load_avg": list(os.getloadavg()) if hasattr(os, "getloadavg") else None,
+	}
+	try:
+		import resource
+
+		# ru_maxrss is KiB on Linux, bytes on macOS.
+		max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		usage["max_rss_mb"] = max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+	except ImportError:
+		pass
+	try:
+		with open("/proc/self/statm", encoding="ascii") as stream:
+			usage["rss_mb"] = int(stream.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+	except (OSError, ValueError, AttributeError):
+		pass
+	return usage
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import tempfile
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List
@@ -21,6 +22,19 @@ class DetectionReportBuilder:
 		detection_summary: Dict[str, Any],
 		predictions: List[Dict[str, Any]] | None = None,
 	) -> Path:
+		# Page images go to a scratch directory that is removed even when the build fails
+		with tempfile.TemporaryDirectory(prefix="report_") as scratch:
+			self._render(Path(scratch), output_path, original_image, annotated_array, detection_summary)
+		return output_path
+
+	def _render(
+		self,
+		scratch: Path,
+		output_path: Path,
+		original_image: Image.Image,
+		annotated_array,
+		detection_summary: Dict[str, Any],
+	) -> None:
 		pdf = FPDF(format="A4")
 		pdf.set_auto_page_break(auto=True, margin=15)
 
@@ -35,7 +49,7 @@ class DetectionReportBuilder:
 		# Input Image Overview
 		pdf.set_font("Arial", "B", 14)
 		pdf.cell(0, 10, "Input Image Overview", ln=True)
-		orig_path = output_path.parent / "_temp_original.png"
+		orig_path = scratch / "original.png"
 		original_image.save(orig_path)
 		pdf.image(str(orig_path), w=180)
 
@@ -43,7 +57,7 @@ class DetectionReportBuilder:
 		pdf.add_page()
 		pdf.set_font("Arial", "B", 14)
 		pdf.cell(0, 10, "Segmentation Results", ln=True)
-		annotated_path = output_path.parent / "_temp_overlay.png"
+		annotated_path = scratch / "overlay.png"
 		Image.fromarray(annotated_array).save(annotated_path)
 		pdf.image(str(annotated_path), w=180)
 
@@ -102,7 +116,3 @@ class DetectionReportBuilder:
 		pdf.cell(0, 6, "Marine Shield - Confidential", ln=True, align="C")
 
 		pdf.output(str(output_path))
-		# Cleanup temp images
-		orig_path.unlink(missing_ok=True)
-		annotated_path.unlink(missing_ok=True)
-		return output_path
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Static water/region-of-interest masks that keep land and known areas out of detection."""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from config import ROI_MASKS_DIR
+
+LOGGER = logging.getLogger(__name__)
+
+Polygon = Sequence[Tuple[float, float]]
+
+
+class RoiMask:
+	"""Where detection applies (water) for scenes of one area.
+
+	Built from a raster (non-zero pixels are water) or from polygons: ``water``
+	polygons define the ROI (whole image if omitted) and ``exclude`` polygons
+	remove static areas such as harbours. Scenes of an area are assumed to share
+	its footprint, so the mask is scaled to each image size (and cached).
+	"""
+
+	def __init__(
+		self,
+		raster: Optional[np.ndarray] = None,
+		water: Sequence[Polygon] = (),
+		exclude: Sequence[Polygon] = (),
+		normalized: bool = True,
+	) -> None:
+		self.raster = raster
+		self.water = [list(map(tuple, polygon)) for polygon in water]
+		self.exclude = [list(map(tuple, polygon)) for polygon in exclude]
+		self.normalized = normalized
+		self._cache: Dict[Tuple[int, int], np.ndarray] = {}
+		self._lock = threading.Lock()
+
+	@classmethod
+	def from_raster(cls, path: Path) -> "RoiMask":
+		with Image.open(path) as img:
+			return cls(raster=np.asarray(img.convert("L")) > 0)
+
+	@classmethod
+	def from_polygons(cls, data: Dict[str, Any]) -> "RoiMask":
+		return cls(
+			water=data.get("water", []),
+			exclude=data.get("exclude", []),
+			normalized=data.get("normalized", True),
+		)
+
+	def _scale(self, polygon: List[Tuple[float, float]], size: Tuple[int, int]) -> List[Tuple[float, float]]:
+		if not self.normalized:
+			return polygon
+		w, h = size
+		return [(x * w, y * h) for x, y in polygon]
+
+	def _render(self, size: Tuple[int, int]) -> np.ndarray:
+		if self.raster is not None:
+			img = Image.fromarray(self.raster.astype(np.uint8) * 255)
+			return np.asarray(img.resize(size, Image.NEAREST)) > 0
+		canvas = Image.new("L", size, 0 if self.water else 1)
+		draw = ImageDraw.Draw(canvas)
+		for polygon in self.water:
+			draw.polygon(self._scale(polygon, size), fill=1)
+		for polygon in self.exclude:
+			draw.polygon(self._scale(polygon, size), fill=0)
+		return np.asarray(canvas) > 0
+
+	def for_size(self, size: Tuple[int, int]) -> np.ndarray:
+		"""Boolean HxW water mask for an image of ``size`` (width, height)."""
+		with self._lock:
+			mask = self._cache.get(size)
+			if mask is None:
+				mask = self._cache[size] = self._render(size)
+				mask.setflags(write=False)
+			return mask
+
+
+class RoiRegistry:
+	"""ROI masks per area, read from ``<directory>/<area>.png`` or ``<area>.json`` on first use."""
+
+	def __init__(self, directory: Path = ROI_MASKS_DIR) -> None:
+		self.directory = Path(directory)
+		self._masks: Dict[str, RoiMask] = {}
+		self._lock = threading.Lock()
+
+	def names(self) -> List[str]:
+		stored = set()
+		if self.directory.is_dir():
+			stored = {p.stem for p in self.directory.iterdir() if p.suffix.lower() in {".png", ".json"}}
+		with self._lock:
+			return sorted(stored | set(self._masks))
+
+	def register(self, area: str, mask: RoiMask) -> None:
+		with self._lock:
+			self._masks[area] = mask
+
+	def get(self, area: str) -> RoiMask:
+		with self._lock:
+			if area in self._masks:
+				return self._masks[area]
+			if Path(area).name != area:
+				raise KeyError(f"Invalid ROI area name '{area}'")
+			json_path = self.directory / f"{area}.json"
+			png_path = self.directory / f"{area}.png"
+			if json_path.exists():
+				mask = RoiMask.from_polygons(json.loads(json_path.read_text(encoding="utf-8")))
+			elif png_path.exists():
+				mask = RoiMask.from_raster(png_path)
+			else:
+				raise KeyError(f"No ROI mask for area '{area}' in {self.directory}")
+			LOGGER.info("Loaded ROI mask for area '%s'", area)
+			self._masks[area] = mask
+			return mask
+
+
+def water_bbox(roi: np.ndarray, align: int = 1) -> Optional[Tuple[int, int, int, int]]:
+	"""(y0, x0, y1, x1) enclosing all water pixels, expanded to multiples of ``align``; None if dry."""
+	rows = np.flatnonzero(roi.any(axis=1))
+	if rows.size == 0:
+		return None
+	cols = np.flatnonzero(roi.any(axis=0))
+	h, w = roi.shape
+	y0, x0 = rows[0] // align * align, cols[0] // align * align
+	y1 = min(h, -(-(rows[-1] + 1) // align) * align)
+	x1 = min(w, -(-(cols[-1] + 1) // align) * align)
+	return int(y0), int(x0), int(y1), int(x1)
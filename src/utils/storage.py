@@ -0,0 +1,220 @@
+"""Retention, size limits and compaction for upload, overlay and report folders."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from PIL import Image, PngImagePlugin
+
+from config import (
+	DETECTIONS_FOLDER,
+	REPORTS_FOLDER,
+	STORAGE_COMPRESS_AFTER_SECONDS,
+	STORAGE_MAX_AGE_SECONDS,
+	STORAGE_MAX_BYTES,
+	STORAGE_MIN_AGE_SECONDS,
+	STORAGE_SWEEP_INTERVAL_SECONDS,
+	UPLOAD_FOLDER,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+# Marker stored in re-encoded files so they are not compressed again after a restart.
+COMPRESSED_MARKER = "marine-shield-compressed"
+
+
+@dataclass
+class StorageMetrics:
+	bytes_stored: int = 0
+	files_stored: int = 0
+	bytes_evicted: int = 0
+	files_evicted: int = 0
+	bytes_saved_by_compression: int = 0
+	files_compressed: int = 0
+	sweeps: int = 0
+	last_sweep_at: Optional[float] = None
+	last_sweep_seconds: float = 0.0
+
+
+@dataclass
+class _Entry:
+	path: Path
+	size: int
+	mtime: float
+
+
+class StorageManager:
+	"""Keeps the managed folders under an age and total-size budget.
+
+	Each sweep evicts files older than ``max_age_seconds``, then the oldest files
+	until the folders fit ``max_bytes``, and re-encodes overlays older than
+	``compress_after_seconds``. Sweeps run on demand or from a background thread.
+	``on_evict`` receives the paths deleted by each sweep, so records pointing
+	at them can be updated.
+	"""
+
+	def __init__(
+		self,
+		folders: Sequence[Path] = (UPLOAD_FOLDER, DETECTIONS_FOLDER, REPORTS_FOLDER),
+		max_bytes: int = STORAGE_MAX_BYTES,
+		max_age_seconds: int = STORAGE_MAX_AGE_SECONDS,
+		compress_after_seconds: int = STORAGE_COMPRESS_AFTER_SECONDS,
+		compress_folders: Sequence[Path] = (DETECTIONS_FOLDER,),
+		min_age_seconds: int = STORAGE_MIN_AGE_SECONDS,
+		interval_seconds: int = STORAGE_SWEEP_INTERVAL_SECONDS,
+		on_evict: Optional[Callable[[List[Path]], Any]] = None,
+	) -> None:
+		self.folders = [Path(folder) for folder in folders]
+		self.max_bytes = max_bytes
+		self.max_age_seconds = max_age_seconds
+		self.compress_after_seconds = compress_after_seconds
+		self.compress_folders = {Path(folder).resolve() for folder in compress_folders}
+		self.min_age_seconds = min_age_seconds
+		self.interval_seconds = interval_seconds
+		self.on_evict = on_evict
+		self._metrics = StorageMetrics()
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	def _scan(self) -> List[_Entry]:
+		entries: List[_Entry] = []
+		for folder in self.folders:
+			if not folder.is_dir():
+				continue
+			with os.scandir(folder) as it:
+				for item in it:
+					if item.is_file(follow_symlinks=False) and not item.name.startswith("."):
+						stat = item.stat(follow_symlinks=False)
+						entries.append(_Entry(Path(item.path), stat.st_size, stat.st_mtime))
+		return entries
+
+	def _evict(self, entry: _Entry) -> bool:
+		try:
+			entry.path.unlink()
+		except FileNotFoundError:
+			return False
+		except OSError as exc:
+			LOGGER.warning("Could not evict %s: %s", entry.path, exc)
+			return False
+		self._metrics.bytes_evicted += entry.size
+		self._metrics.files_evicted += 1
+		return True
+
+	def _compress(self, entry: _Entry) -> int:
+		"""Re-encode an overlay in place (PNG: max zlib effort, JPEG: quality 75); returns bytes saved."""
+		suffix = entry.path.suffix.lower()
+		if suffix not in {".png", ".jpg", ".jpeg"}:
+			return 0
+		try:
+			with Image.open(entry.path) as img:
+				if COMPRESSED_MARKER in getattr(img, "text", {}) or img.info.get("comment") == COMPRESSED_MARKER.encode():
+					return 0
+				img.load()
+				tmp_path = entry.path.with_name(f".{entry.path.name}.tmp")
+				if suffix == ".png":
+					info = PngImagePlugin.PngInfo()
+					info.add_text(COMPRESSED_MARKER, "1")
+					img.save(tmp_path, format="PNG", optimize=True, compress_level=9, pnginfo=info)
+				else:
+					img.save(tmp_path, format="JPEG", quality=75, optimize=True, comment=COMPRESSED_MARKER)
+			new_size = tmp_path.stat().st_size
+			if new_size >= entry.size:
+				tmp_path.unlink()
+				return 0
+			os.replace(tmp_path, entry.path)
+			# Keep the original timestamp so age-based eviction is unaffected.
+			os.utime(entry.path, (entry.mtime, entry.mtime))
+		except (OSError, ValueError) as exc:
+			LOGGER.warning("Could not compress %s: %s", entry.path, exc)
+			return 0
+		saved = entry.size - new_size
+		entry.size = new_size
+		self._metrics.bytes_saved_by_compression += saved
+		self._metrics.files_compressed += 1
+		return saved
+
+	def sweep(self, now: Optional[float] = None) -> Dict[str, Any]:
+		with self._lock:
+			start = time.perf_counter()
+			now = time.time() if now is None else now
+			entries = self._scan()
+			settled = [e for e in entries if now - e.mtime >= self.min_age_seconds]
+
+			kept: List[_Entry] = [e for e in entries if now - e.mtime < self.min_age_seconds]
+			evicted: List[Path] = []
+			for entry in settled:
+				if self.max_age_seconds and now - entry.mtime > self.max_age_seconds:
+					if self._evict(entry):
+						evicted.append(entry.path)
+				else:
+					kept.append(entry)
+
+			if self.compress_after_seconds:
+				for entry in kept:
+					if (
+						now - entry.mtime > self.compress_after_seconds
+						and entry.path.parent.resolve() in self.compress_folders
+					):
+						self._compress(entry)
+
+			total = sum(e.size for e in kept)
+			if total > self.max_bytes:
+				for entry in sorted(kept, key=lambda e: e.mtime):
+					if total <= self.max_bytes:
+						break
+					if now - entry.mtime < self.min_age_seconds:
+						continue
+					if self._evict(entry):
+						evicted.append(entry.path)
+						total -= entry.size
+						kept.remove(entry)
+
+			if evicted and self.on_evict is not None:
+				try:
+					self.on_evict(evicted)
+				except Exception as exc:  # eviction already happened; do not fail the sweep
+					LOGGER.error("Could not update records for %d evicted files: %s", len(evicted), exc)
+
+			self._metrics.bytes_stored = total
+			self._metrics.files_stored = len(kept)
+			self._metrics.sweeps += 1
+			self._metrics.last_sweep_at = now
+			self._metrics.last_sweep_seconds = time.perf_counter() - start
+			return self.metrics()
+
+	def metrics(self) -> Dict[str, Any]:
+		return asdict(self._metrics)
+
+	def start(self) -> None:
+		"""Start the background sweeper (idempotent)."""
+		if self._thread is not None and self._thread.is_alive():
+			return
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name="storage-sweeper", daemon=True)
+		self._thread.start()
+
+	def stop(self) -> None:
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join()
+
+	def _run(self) -> None:
+		while not self._stop.is_set():
+			try:
+				result = self.sweep()
+				LOGGER.info(
+					"Storage sweep: %d files / %.1f MB stored, %d evicted in total",
+					result["files_stored"],
+					result["bytes_stored"] / 1e6,
+					result["files_evicted"],
+				)
+			except Exception as exc:  # keep the sweeper alive
+				LOGGER.error("Storage sweep failed: %s", exc)
+			self._stop.wait(self.interval_seconds)
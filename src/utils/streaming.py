@@ -0,0 +1,281 @@
+"""Streaming segmentation over video files and frame directories."""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from config import IMAGE_SUFFIXES
+from src.models.segmentation import DeepLabSegmenter, SegmentationOutput, apply_threshold
+
+LOGGER = logging.getLogger(__name__)
+
+_SENTINEL = object()
+
+
+@dataclass
+class Frame:
+	index: int
+	timestamp: float  # seconds from stream start
+	image: Image.Image  # RGB
+	duplicate: bool = False
+
+
+@dataclass
+class StreamStats:
+	frames: int = 0
+	inferred: int = 0
+	skipped: int = 0
+	seconds: float = 0.0
+	inference_seconds: float = 0.0
+
+	@property
+	def fps(self) -> float:
+		return self.frames / self.seconds if self.seconds else 0.0
+
+	def as_dict(self) -> Dict[str, Any]:
+		return {
+			"frames": self.frames,
+			"inferred": self.inferred,
+			"skipped_duplicates": self.skipped,
+			"seconds": round(self.seconds, 3),
+			"sustained_fps": round(self.fps, 2),
+			"inference_fps": round(self.inferred / self.inference_seconds, 2) if self.inference_seconds else 0.0,
+		}
+
+
+def iter_video_frames(path: Path, stride: int = 1) -> Tuple[Iterator[Frame], float]:
+	"""Frames of a video file (every ``stride``-th) and the source frame rate."""
+	import cv2
+
+	capture = cv2.VideoCapture(str(path))
+	if not capture.isOpened():
+		raise FileNotFoundError(f"Could not open video: {path}")
+	fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+
+	def _frames() -> Iterator[Frame]:
+		index = 0
+		try:
+			while True:
+				ok, bgr = capture.read()
+				if not ok:
+					return
+				if index % stride == 0:
+					yield Frame(index, index / fps, Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)))
+				index += 1
+		finally:
+			capture.release()
+
+	return _frames(), fps / stride
+
+
+def iter_directory_frames(directory: Path, fps: float = 1.0) -> Tuple[Iterator[Frame], float]:
+	"""Image files of a directory in name order, treated as frames at ``fps``."""
+	paths = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+	def _frames() -> Iterator[Frame]:
+		for index, path in enumerate(paths):
+			with Image.open(path) as img:
+				yield Frame(index, index / fps, img.convert("RGB"))
+
+	return _frames(), fps
+
+
+def open_frame_source(source: Path, stride: int = 1, fps: float = 1.0) -> Tuple[Iterator[Frame], float]:
+	source = Path(source)
+	if source.is_dir():
+		return iter_directory_frames(source, fps)
+	return iter_video_frames(source, stride)
+
+
+class DuplicateFilter:
+	"""Flags frames whose 32x32 grayscale thumbnail barely differs from the last kept frame."""
+
+	def __init__(self, threshold: float = 2.0, thumb_size: int = 32) -> None:
+		self.threshold = threshold
+		self.thumb_size = thumb_size
+		self._last: Optional[np.ndarray] = None
+		self._last_size: Optional[Tuple[int, int]] = None
+
+	def is_duplicate(self, image: Image.Image) -> bool:
+		thumb = np.asarray(image.convert("L").resize((self.thumb_size, self.thumb_size), Image.BILINEAR), dtype=np.float32)
+		if self._last is not None and image.size == self._last_size:
+			if float(np.abs(thumb - self._last).mean()) < self.threshold:
+				return True
+		self._last = thumb
+		self._last_size = image.size
+		return False
+
+
+class StreamProcessor:
+	"""Bounded decode -> infer -> encode pipeline, one thread per stage.
+
+	Near-duplicate frames skip inference and reuse the previous probability map,
+	so only the overlay is recomputed for them.
+	"""
+
+	def __init__(
+		self,
+		segmenter: DeepLabSegmenter,
+		batch_size: int = 4,
+		queue_size: int = 8,
+		dedup_threshold: float = 2.0,
+		input_size: Optional[Tuple[int, int]] = None,
+	) -> None:
+		self.segmenter = segmenter
+		self.batch_size = max(1, batch_size)
+		self.queue_size = max(1, queue_size)
+		self.dedup_threshold = dedup_threshold
+		self.input_size = input_size
+
+	def run(
+		self,
+		frames: Iterator[Frame],
+		fps: float,
+		output_video: Optional[Path],
+		timeline_path: Optional[Path],
+	) -> StreamStats:
+		decoded: queue.Queue = queue.Queue(maxsize=self.queue_size)
+		inferred: queue.Queue = queue.Queue(maxsize=self.queue_size)
+		errors: List[BaseException] = []
+		stats = StreamStats()
+		stop = threading.Event()
+
+		def _put(q: queue.Queue, item: Any) -> bool:
+			while not stop.is_set():
+				try:
+					q.put(item, timeout=0.1)
+					return True
+				except queue.Full:
+					continue
+			return False
+
+		def _get(q: queue.Queue) -> Any:
+			while not stop.is_set():
+				try:
+					return q.get(timeout=0.1)
+				except queue.Empty:
+					continue
+			return _SENTINEL
+
+		def _decode() -> None:
+			dedup = DuplicateFilter(self.dedup_threshold)
+			try:
+				for frame in frames:
+					frame.duplicate = dedup.is_duplicate(frame.image)
+					if not _put(decoded, frame):
+						return
+			except BaseException as exc:
+				errors.append(exc)
+				stop.set()
+			finally:
+				_put(decoded, _SENTINEL)
+
+		def _infer() -> None:
+			last_seg: Optional[SegmentationOutput] = None
+			pending: List[Frame] = []
+
+			def _flush() -> bool:
+				nonlocal last_seg
+				fresh = [f for f in pending if not f.duplicate]
+				start = time.perf_counter()
+				outputs = iter(self.segmenter.predict_batch([f.image for f in fresh], input_size=self.input_size, batch_size=self.batch_size)) if fresh else iter(())
+				stats.inference_seconds += time.perf_counter() - start
+				stats.inferred += len(fresh)
+				for frame in pending:
+					if frame.duplicate and last_seg is not None:
+						seg = apply_threshold(last_seg.prob_map, frame.image, last_seg.threshold)
+						stats.skipped += 1
+					else:
+						seg = last_seg = next(outputs)
+					if not _put(inferred, (frame, seg)):
+						return False
+				pending.clear()
+				return True
+
+			try:
+				while True:
+					item = _get(decoded)
+					if item is _SENTINEL:
+						break
+					# A leading duplicate has nothing to reuse, so it is inferred.
+					if item.duplicate and last_seg is None and not any(not f.duplicate for f in pending):
+						item.duplicate = False
+					pending.append(item)
+					if sum(not f.duplicate for f in pending) >= self.batch_size and not _flush():
+						return
+				_flush()
+			except BaseException as exc:
+				errors.append(exc)
+				stop.set()
+			finally:
+				_put(inferred, _SENTINEL)
+
+		workers = [threading.Thread(target=_decode, daemon=True), threading.Thread(target=_infer, daemon=True)]
+		start = time.perf_counter()
+		for worker in workers:
+			worker.start()
+		try:
+			self._encode(lambda: _get(inferred), fps, output_video, timeline_path, stats)
+		finally:
+			stop.set()
+			for worker in workers:
+				worker.join()
+		stats.seconds = time.perf_counter() - start
+		if errors:
+			raise errors[0]
+		LOGGER.info("Stream processed: %s", stats.as_dict())
+		return stats
+
+	@staticmethod
+	def _encode(
+		next_item: Callable[[], Any],
+		fps: float,
+		output_video: Optional[Path],
+		timeline_path: Optional[Path],
+		stats: StreamStats,
+	) -> None:
+		writer = None
+		size: Optional[Tuple[int, int]] = None
+		timeline = open(timeline_path, "w", encoding="utf-8") if timeline_path else None
+		try:
+			while True:
+				item = next_item()
+				if item is _SENTINEL:
+					return
+				frame, seg = item
+				stats.frames += 1
+				if output_video is not None:
+					import cv2
+
+					if writer is None:
+						size = frame.image.size
+						Path(output_video).parent.mkdir(parents=True, exist_ok=True)
+						writer = cv2.VideoWriter(str(output_video), cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+					overlay = seg.overlay if seg.overlay.size == size else seg.overlay.resize(size, Image.BILINEAR)
+					writer.write(cv2.cvtColor(np.asarray(overlay), cv2.COLOR_RGB2BGR))
+				if timeline is not None:
+					h, w = seg.mask.shape[:2]
+					timeline.write(json.dumps({
+						"frame": frame.index,
+						"timestamp": round(frame.timestamp, 3),
+						"duplicate": frame.duplicate,
+						"spill_detected": seg.area_pixels > 0,
+						"area_pixels": seg.area_pixels,
+						"coverage_percent": seg.area_pixels / float(h * w) * 100.0,
+						"confidence": seg.confidence,
+					}) + "\n")
+		finally:
+			if writer is not None:
+				writer.release()
+			if timeline is not None:
+				timeline.close()
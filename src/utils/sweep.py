@@ -0,0 +1,307 @@
+"""Hyperparameter sweeps for YOLOv8: search space sampling, SQLite results store, median pruning."""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import (
+    DATASET_YAML,
+    SWEEP_DB_PATH,
+    SWEEP_MAX_PARALLEL,
+    SWEEP_METRIC,
+    SWEEP_PRUNE_MIN_TRIALS,
+    SWEEP_PRUNE_WARMUP_EPOCHS,
+    SWEEP_PROJECT_DIR,
+    SWEEP_THREADS_PER_TRIAL,
+    YOLO_BASE_MODEL,
+    YOLO_MODEL_PATH,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+TUNABLE_PARAMS = {"epochs", "imgsz", "batch", "lr0", "patience"}
+
+
+class SearchSpace:
+    """Samples trial parameters from a spec such as ``{"lr0": {"loguniform": [1e-4, 1e-2]}}``.
+
+    Supported distributions are ``choice``, ``uniform``, ``loguniform`` and
+    ``int`` (inclusive range); plain values are passed through as constants.
+    """
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        unknown = set(spec) - TUNABLE_PARAMS
+        if unknown:
+            raise ValueError(f"Unsupported sweep parameters: {', '.join(sorted(unknown))}")
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> Dict[str, Any]:
+        params: Dict[str, Any] = {}
+        for name, dist in self.spec.items():
+            if not isinstance(dist, dict):
+                params[name] = dist
+                continue
+            (kind, args), = dist.items()
+            if kind == "choice":
+                params[name] = rng.choice(list(args))
+            elif kind == "uniform":
+                params[name] = rng.uniform(*args)
+            elif kind == "loguniform":
+                low, high = args
+                params[name] = math.exp(rng.uniform(math.log(low), math.log(high)))
+            elif kind == "int":
+                params[name] = rng.randint(*args)
+            else:
+                raise ValueError(f"Unknown distribution '{kind}' for parameter '{name}'")
+        return params
+
+
+class SweepStore:
+    """SQLite record of sweep trials and their per-epoch metric."""
+
+    def __init__(self, db_path: Path = SWEEP_DB_PATH) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30.0)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS trials (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sweep TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    best_metric REAL,
+                    weights_path TEXT,
+                    started_at REAL,
+                    finished_at REAL,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_trials_sweep ON trials (sweep, status);
+                CREATE TABLE IF NOT EXISTS trial_epochs (
+                    trial_id INTEGER NOT NULL REFERENCES trials (id),
+                    epoch INTEGER NOT NULL,
+                    metric REAL NOT NULL,
+                    PRIMARY KEY (trial_id, epoch)
+                );
+                """
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def create_trial(self, sweep: str, params: Dict[str, Any]) -> int:
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO trials (sweep, params, status) VALUES (?, ?, 'pending')",
+                (sweep, json.dumps(params, sort_keys=True)),
+            )
+        return int(cursor.lastrowid)
+
+    def update_trial(self, trial_id: int, **fields: Any) -> None:
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._conn:
+            self._conn.execute(f"UPDATE trials SET {columns} WHERE id = ?", (*fields.values(), trial_id))
+
+    def record_epoch(self, trial_id: int, epoch: int, metric: float) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO trial_epochs (trial_id, epoch, metric) VALUES (?, ?, ?)",
+                (trial_id, epoch, metric),
+            )
+            self._conn.execute(
+                "UPDATE trials SET best_metric = MAX(COALESCE(best_metric, ?), ?) WHERE id = ?",
+                (metric, metric, trial_id),
+            )
+
+    def peer_metrics(self, sweep: str, trial_id: int, epoch: int) -> List[float]:
+        """Best metric reached by epoch ``epoch`` for every other trial in the sweep that got that far."""
+        rows = self._conn.execute(
+            """
+            SELECT MAX(e.metric) AS best
+            FROM trial_epochs e JOIN trials t ON t.id = e.trial_id
+            WHERE t.sweep = ? AND t.id != ? AND e.epoch <= ?
+            GROUP BY e.trial_id
+            HAVING MAX(e.epoch) >= ?
+            """,
+            (sweep, trial_id, epoch, epoch),
+        ).fetchall()
+        return [row["best"] for row in rows]
+
+    def trials(self, sweep: str) -> List[Dict[str, Any]]:
+        rows = self._conn.execute("SELECT * FROM trials WHERE sweep = ? ORDER BY id", (sweep,)).fetchall()
+        return [{**dict(row), "params": json.loads(row["params"])} for row in rows]
+
+    def best_trial(self, sweep: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            """
+            SELECT * FROM trials
+            WHERE sweep = ? AND status = 'complete' AND weights_path IS NOT NULL
+            ORDER BY best_metric DESC LIMIT 1
+            """,
+            (sweep,),
+        ).fetchone()
+        return {**dict(row), "params": json.loads(row["params"])} if row else None
+
+
+class MedianPruner:
+    """Stops a trial whose best metric so far is below the median of its peers at the same epoch."""
+
+    def __init__(
+        self,
+        warmup_epochs: int = SWEEP_PRUNE_WARMUP_EPOCHS,
+        min_trials: int = SWEEP_PRUNE_MIN_TRIALS,
+    ) -> None:
+        self.warmup_epochs = warmup_epochs
+        self.min_trials = min_trials
+
+    def should_prune(self, store: SweepStore, sweep: str, trial_id: int, epoch: int, best_so_far: float) -> bool:
+        if epoch < self.warmup_epochs:
+            return False
+        peers = store.peer_metrics(sweep, trial_id, epoch)
+        if len(peers) < self.min_trials:
+            return False
+        return best_so_far < statistics.median(peers)
+
+
+def run_trial(
+    sweep: str,
+    trial_id: int,
+    params: Dict[str, Any],
+    db_path: str,
+    data_yaml: str,
+    threads: int,
+) -> Dict[str, Any]:
+    """Train one trial in a worker process; reports each epoch's metric and honours pruning."""
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(threads)
+    store = SweepStore(Path(db_path))
+    pruner = MedianPruner()
+    state = {"best": float("-inf"), "pruned": False}
+    store.update_trial(trial_id, status="running", started_at=time.time())
+
+    def on_fit_epoch_end(trainer: Any) -> None:
+        metric = float(trainer.metrics.get(SWEEP_METRIC, 0.0))
+        epoch = int(trainer.epoch) + 1
+        state["best"] = max(state["best"], metric)
+        store.record_epoch(trial_id, epoch, metric)
+        if pruner.should_prune(store, sweep, trial_id, epoch, state["best"]):
+            LOGGER.info("Pruning trial %d at epoch %d (%s=%.4f)", trial_id, epoch, SWEEP_METRIC, state["best"])
+            state["pruned"] = True
+            trainer.stop = True
+
+    try:
+        model = YOLO(YOLO_BASE_MODEL)
+        model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+        model.train(
+            data=data_yaml,
+            project=str(SWEEP_PROJECT_DIR),
+            name=f"{sweep}_trial{trial_id}",
+            exist_ok=True,
+            workers=max(1, threads // 2),
+            verbose=False,
+            **params,
+        )
+        weights = Path(model.trainer.best)
+        status = "pruned" if state["pruned"] else "complete"
+        store.update_trial(
+            trial_id,
+            status=status,
+            weights_path=str(weights) if weights.is_file() else None,
+            finished_at=time.time(),
+        )
+        return {"trial_id": trial_id, "status": status, "best_metric": state["best"]}
+    except Exception as exc:
+        store.update_trial(trial_id, status="failed", error=str(exc), finished_at=time.time())
+        raise
+    finally:
+        store.close()
+
+
+class SweepRunner:
+    """Runs sampled trials concurrently within the CPU budget and promotes the best weights."""
+
+    def __init__(
+        self,
+        name: str,
+        search_space: SearchSpace,
+        db_path: Path = SWEEP_DB_PATH,
+        data_yaml: Path = DATASET_YAML,
+        threads_per_trial: int = SWEEP_THREADS_PER_TRIAL,
+        max_parallel: int = SWEEP_MAX_PARALLEL,
+        seed: int = 0,
+    ) -> None:
+        self.name = name
+        self.search_space = search_space
+        self.db_path = Path(db_path)
+        self.data_yaml = Path(data_yaml)
+        self.threads_per_trial = max(1, threads_per_trial)
+        cpu_parallel = max(1, (os.cpu_count() or 1) // self.threads_per_trial)
+        self.parallel = min(cpu_parallel, max_parallel) if max_parallel > 0 else cpu_parallel
+        self.rng = random.Random(seed)
+        self.store = SweepStore(self.db_path)
+
+    def run(self, n_trials: int) -> Optional[Dict[str, Any]]:
+        if not self.data_yaml.exists():
+            raise FileNotFoundError(f"Training data YAML not found at {self.data_yaml}")
+
+        trials = []
+        for _ in range(n_trials):
+            params = self.search_space.sample(self.rng)
+            trials.append((self.store.create_trial(self.name, params), params))
+
+        LOGGER.info("Sweep '%s': %d trials, %d in parallel", self.name, n_trials, self.parallel)
+        with ProcessPoolExecutor(max_workers=self.parallel) as pool:
+            futures = {
+                pool.submit(
+                    run_trial,
+                    self.name,
+                    trial_id,
+                    params,
+                    str(self.db_path),
+                    str(self.data_yaml),
+                    self.threads_per_trial,
+                ): trial_id
+                for trial_id, params in trials
+            }
+            for future in as_completed(futures):
+                try:
+                    outcome = future.result()
+                    LOGGER.info("Trial %d %s (best %.4f)", outcome["trial_id"], outcome["status"], outcome["best_metric"])
+                except Exception as exc:
+                    LOGGER.error("Trial %d failed: %s", futures[future], exc)
+
+        return self.store.best_trial(self.name)
+
+    def promote_best(self, destination: Path = YOLO_MODEL_PATH) -> Optional[Path]:
+        best = self.store.best_trial(self.name)
+        if best is None:
+            LOGGER.warning("Sweep '%s' has no completed trial to promote", self.name)
+            return None
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(best["weights_path"], destination)
+        LOGGER.info(
+            "Promoted trial %d (%s=%.4f, params=%s) to %s",
+            best["id"],
+            SWEEP_METRIC,
+            best["best_metric"],
+            best["params"],
+            destination,
+        )
+        return destination
@@ -0,0 +1,171 @@
+"""Training acceleration helpers: cache selection, worker sizing and throughput logging."""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yaml
+
+from config import (
+    IMAGE_SUFFIXES,
+    TRAIN_CACHE_RAM_FRACTION,
+    TRAIN_MAX_WORKERS,
+    TRAIN_WORKERS,
+    YOLO_MODEL_PATH,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def resolve_workers(requested: int = TRAIN_WORKERS) -> int:
+    """Return the dataloader worker count, sizing to the CPU count when unset."""
+    if requested > 0:
+        return requested
+    cpus = os.cpu_count() or 1
+    # Leave one core for the training loop itself.
+    return max(1, min(cpus - 1, TRAIN_MAX_WORKERS))
+
+
+def _split_dirs(data_yaml: Path) -> Dict[str, Path]:
+    with Path(data_yaml).open("r", encoding="utf-8") as stream:
+        data = yaml.safe_load(stream) or {}
+
+    root = Path(data.get("path") or Path(data_yaml).parent)
+    if not root.is_absolute():
+        root = Path(data_yaml).parent / root
+
+    splits: Dict[str, Path] = {}
+    for split in ("train", "val"):
+        entry = data.get(split)
+        if isinstance(entry, str):
+            path = Path(entry)
+            splits[split] = path if path.is_absolute() else root / path
+    return splits
+
+
+def count_images(directory: Path) -> int:
+    if not directory.is_dir():
+        return 0
+    return sum(1 for entry in os.scandir(directory) if Path(entry.name).suffix.lower() in IMAGE_SUFFIXES)
+
+
+def estimate_cache_bytes(data_yaml: Path, imgsz: int) -> int:
+    """Upper bound for the decoded uint8 cache (images resized to ``imgsz`` on the long side)."""
+    images = sum(count_images(path) for path in _split_dirs(data_yaml).values())
+    return images * imgsz * imgsz * 3
+
+
+def available_memory_bytes() -> Optional[int]:
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def select_cache_mode(data_yaml: Path, imgsz: int) -> str:
+    """Pick the Ultralytics image cache: ``ram`` when the decoded set fits the budget, else ``disk``.
+
+    The disk cache stores each decoded, resized image as a ``.npy`` file next to
+    the source JPEG; Ultralytics reads those back with ``np.load`` on later epochs
+    instead of decoding the JPEG again, so decoding only happens once either way.
+    """
+    needed = estimate_cache_bytes(data_yaml, imgsz)
+    available = available_memory_bytes()
+    if available is not None and needed <= available * TRAIN_CACHE_RAM_FRACTION:
+        mode = "ram"
+    else:
+        mode = "disk"
+    LOGGER.info(
+        "Training cache: %s (decoded set ~%.1f MB, available RAM %s)",
+        mode,
+        needed / 1e6,
+        f"{available / 1e6:.1f} MB" if available is not None else "unknown",
+    )
+    return mode
+
+
+def acceleration_kwargs(data_yaml: Path, imgsz: int) -> Dict[str, Any]:
+    """Extra ``YOLO.train`` arguments enabling the decoded-image cache and sized workers."""
+    return {
+        "cache": select_cache_mode(data_yaml, imgsz),
+        "workers": resolve_workers(),
+    }
+
+
+class TrainingProfiler:
+    """Ultralytics callback set that logs per-epoch throughput and data-loader stall time.
+
+    Stall time is the wall time spent waiting for the next batch, i.e. between
+    the end of one optimizer step and the start of the next.
+    """
+
+    def __init__(self) -> None:
+        self.history: list[Dict[str, float]] = []
+        self._epoch_start = 0.0
+        self._last_batch_end = 0.0
+        self._stall = 0.0
+        self._batches = 0
+
+    def attach(self, model: Any) -> "TrainingProfiler":
+        model.add_callback("on_train_epoch_start", self._on_epoch_start)
+        model.add_callback("on_train_batch_start", self._on_batch_start)
+        model.add_callback("on_train_batch_end", self._on_batch_end)
+        model.add_callback("on_train_epoch_end", self._on_epoch_end)
+        return self
+
+    def _on_epoch_start(self, trainer: Any) -> None:
+        self._epoch_start = self._last_batch_end = time.perf_counter()
+        self._stall = 0.0
+        self._batches = 0
+
+    def _on_batch_start(self, trainer: Any) -> None:
+        self._stall += time.perf_counter() - self._last_batch_end
+
+    def _on_batch_end(self, trainer: Any) -> None:
+        self._batches += 1
+        self._last_batch_end = time.perf_counter()
+
+    def _on_epoch_end(self, trainer: Any) -> None:
+        elapsed = max(time.perf_counter() - self._epoch_start, 1e-9)
+        try:
+            images = len(trainer.train_loader.dataset)
+        except (AttributeError, TypeError):
+            images = self._batches * getattr(trainer, "batch_size", 0)
+        stats = {
+            "epoch": int(getattr(trainer, "epoch", len(self.history))) + 1,
+            "seconds": elapsed,
+            "images_per_second": images / elapsed,
+            "data_stall_seconds": self._stall,
+            "data_stall_fraction": self._stall / elapsed,
+        }
+        self.history.append(stats)
+        LOGGER.info(
+            "Epoch %d: %.1f img/s over %.1fs, data stall %.2fs (%.0f%%)",
+            stats["epoch"],
+            stats["images_per_second"],
+            elapsed,
+            self._stall,
+            stats["data_stall_fraction"] * 100.0,
+        )
+
+
+def promote_best_weights(model: Any, destination: Path = YOLO_MODEL_PATH) -> Path:
+    """Copy ``best.pt`` from the trainer's actual run directory to ``destination``."""
+    trainer = getattr(model, "trainer", None)
+    best = Path(getattr(trainer, "best", "")) if trainer is not None else None
+    if best is None or not best.is_file():
+        save_dir = getattr(trainer, "save_dir", None)
+        best = Path(save_dir) / "weights" / "best.pt" if save_dir else None
+    if best is None or not best.is_file():
+        raise FileNotFoundError("Training completed but best.pt was not found in the run directory")
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(best, destination)
+    LOGGER.info("Best weights %s copied to %s", best, destination)
+    return destination
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import config
+import src.utils.detector as detector_module
+from src.models.segmentation import DeepLabSegmenter
+from src.utils.detector import DetectionManager
+from src.utils.history import create_history
+
+
+class _DarkIsOilModel:
+    """Tiny stand-in for the Keras model: dark pixels get high oil logits."""
+
+    input_shape = (None, None, None, 3)
+
+    def predict(self, batch, verbose=0):
+        score = -3.0 * batch[..., 0:1]
+        return np.concatenate([-score, score], axis=-1)
+
+
+class _RecordingModel(_DarkIsOilModel):
+    """Dark-is-oil model that remembers the shape of every batch it was given."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, batch, verbose=0):
+        self.batches.append(batch.shape)
+        return super().predict(batch, verbose)
+
+
+@pytest.fixture
+def dark_model():
+    return _DarkIsOilModel()
+
+
+@pytest.fixture
+def recording_model():
+    return _RecordingModel()
+
+
+@pytest.fixture
+def make_segmenter():
+    """Factory for a DeepLabSegmenter wired to a stand-in model (dark-is-oil unless given)."""
+
+    def _make(model=None, **kwargs):
+        kwargs.setdefault("input_size", (32, 32))
+        segmenter = DeepLabSegmenter(**kwargs)
+        segmenter._model = model if model is not None else _DarkIsOilModel()
+        return segmenter
+
+    return _make
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    # Import the app with its log file and history database outside the source tree.
+    folder = tmp_path_factory.mktemp("app")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(config, "LOG_FILE", folder / "app.log")
+        patch.setattr(config, "STORAGE_SWEEPER_ENABLED", False)
+        patch.setattr(detector_module, "create_history", lambda: create_history("sqlite", db_path=":memory:"))
+        import src.app as app_module
+    return app_module
+
+
+@pytest.fixture
+def client(app_module, tmp_path, monkeypatch, make_segmenter, recording_model):
+    monkeypatch.setattr(detector_module, "DETECTIONS_FOLDER", tmp_path / "detections")
+    monkeypatch.setitem(app_module.app.config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    manager = DetectionManager(history=create_history("sqlite", db_path=":memory:"), workers=2)
+    manager.registry.register_instance(manager.registry.default, make_segmenter(recording_model))
+    monkeypatch.setattr(app_module, "detector", manager)
+    yield app_module.app.test_client()
+    manager.shutdown()
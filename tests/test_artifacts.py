@@ -0,0 +1,71 @@
+import hashlib
+import sys
+import types
+import zipfile
+
+import pytest
+
+from src.models.artifacts import READY_MARKER, ArtifactIntegrityError, ArtifactStore
+
+REPO = "org/deeplab"
+FILENAME = "model_saved_model.zip"
+
+
+def _saved_model_zip(path, payload=b"graph"):
+    with zipfile.ZipFile(path, "w") as bundle:
+        bundle.writestr("exported/saved_model.pb", payload)
+        bundle.writestr("exported/variables/variables.index", b"vars")
+    return path
+
+
+@pytest.fixture
+def fake_hub(monkeypatch, tmp_path):
+    calls = []
+    source = _saved_model_zip(tmp_path / "hub.zip")
+
+    def hf_hub_download(repo_id, filename, local_dir):
+        calls.append((repo_id, filename))
+        target = f"{local_dir}/{filename}"
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            dst.write(src.read())
+        return target
+
+    monkeypatch.setitem(sys.modules, "huggingface_hub", types.SimpleNamespace(hf_hub_download=hf_hub_download))
+    return calls, hashlib.sha256(source.read_bytes()).hexdigest()
+
+
+def test_download_is_verified_unpacked_once_and_reused_offline(tmp_path, fake_hub):
+    calls, digest = fake_hub
+    store = ArtifactStore(tmp_path / "cache")
+
+    model_dir = store.materialize(REPO, FILENAME, digest)
+    assert model_dir == tmp_path / "cache" / "org--deeplab" / "model_saved_model" / "exported"
+    assert (model_dir / "saved_model.pb").exists()
+    assert (model_dir.parent / READY_MARKER).read_text() == digest
+
+    offline = ArtifactStore(tmp_path / "cache", offline=True)
+    assert offline.materialize(REPO, FILENAME, digest) == model_dir
+    assert store.materialize(REPO, FILENAME) == model_dir
+    assert calls == [(REPO, FILENAME)]
+
+
+def test_checksum_mismatch_rejects_download(tmp_path, fake_hub):
+    store = ArtifactStore(tmp_path / "cache")
+    with pytest.raises(ArtifactIntegrityError):
+        store.materialize(REPO, FILENAME, "0" * 64)
+    assert not store.archive_path(REPO, FILENAME).exists()
+
+
+def test_offline_without_artifact_fails_fast(tmp_path):
+    with pytest.raises(FileNotFoundError, match="seed_models"):
+        ArtifactStore(tmp_path / "cache", offline=True).materialize(REPO, FILENAME)
+
+
+def test_seed_from_file_replaces_stale_unpacked_tree(tmp_path):
+    store = ArtifactStore(tmp_path / "cache", offline=True)
+    first = store.seed_from_file(REPO, FILENAME, _saved_model_zip(tmp_path / "v1.zip", b"v1"))
+    assert (first / "saved_model.pb").read_bytes() == b"v1"
+
+    second = store.seed_from_file(REPO, FILENAME, _saved_model_zip(tmp_path / "v2.zip", b"v2"))
+    assert (second / "saved_model.pb").read_bytes() == b"v2"
+    assert store.verify(REPO, FILENAME) == hashlib.sha256((tmp_path / "v2.zip").read_bytes()).hexdigest()
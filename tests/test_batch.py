@@ -0,0 +1,136 @@
+import io
+import json
+import tarfile
+import zipfile
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import src.utils.detector as detector_module
+from src.utils.batch import BatchBudget, BatchLimitError, BatchLimits, iter_upload
+from src.utils.detector import DetectionManager
+from src.utils.history import create_history
+
+
+class _OneWayStream(io.RawIOBase):
+    """Non-seekable stream, like a request body read off the socket."""
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+def _png(rows=4):
+    arr = np.full((16, 16, 3), 220, dtype=np.uint8)
+    arr[:rows] = 5
+    buffer = io.BytesIO()
+    Image.fromarray(arr).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _tar(members, mode="w:gz"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_tar_is_streamed_and_filtered():
+    body = _tar({"site/a.png": _png(), "notes.txt": b"x", "../b.png": _png(), "big.png": b"0" * 2000})
+    budget = BatchBudget(BatchLimits(max_file_bytes=1000))
+    items = list(iter_upload("scenes.tgz", io.BufferedReader(_OneWayStream(body)), budget))
+    assert [item.name for item in items] == ["site_a.png", "b.png", "big.png"]
+    assert items[0].data == _png() and items[2].error
+    assert budget.files == 2
+
+
+def test_zip_limits_and_plain_images():
+    body = _zip({f"{i}.png": _png() for i in range(3)})
+    with pytest.raises(BatchLimitError):
+        list(iter_upload("scenes.zip", io.BytesIO(body), BatchBudget(BatchLimits(max_files=2))))
+    # Spooled to disk once past the in-memory size.
+    items = list(iter_upload("scenes.zip", io.BytesIO(body), BatchBudget(BatchLimits(zip_spool_bytes=16))))
+    assert len(items) == 3 and all(item.data == _png() for item in items)
+    assert list(iter_upload("report.pdf", io.BytesIO(b"%PDF"), BatchBudget(BatchLimits())))[0].error
+
+
+def test_submit_batch_runs_batched_inference(tmp_path, monkeypatch, make_segmenter, recording_model):
+    monkeypatch.setattr(detector_module, "DETECTIONS_FOLDER", tmp_path / "detections")
+    segmenter = make_segmenter(recording_model)
+    manager = DetectionManager(history=create_history("sqlite", db_path=":memory:"), workers=1)
+    manager.registry.register_instance(manager.registry.default, segmenter)
+    items = [(_png(rows), f"scene{rows}.png") for rows in (2, 4, 6)] + [(b"not an image", "broken.png")]
+    try:
+        futures = manager.submit_batch(items, batch_size=2)
+        results = [future.result(timeout=30) for future in futures[:3]]
+        with pytest.raises(Exception):
+            futures[3].result(timeout=30)
+    finally:
+        manager.shutdown()
+    assert segmenter._model.batches == [(2, 32, 32, 3), (1, 32, 32, 3)]
+    assert [r.summary["total_spill_area"] for r in results] == [32.0, 64.0, 96.0]
+    assert len({r.record_id for r in results}) == 3
+
+
+def _lines(response):
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    return lines[:-1], lines[-1]
+
+
+def test_batch_endpoint_streams_raw_tar_body(client, app_module, monkeypatch, recording_model):
+    # Small batches and a tight in-flight bound exercise flush/drain back-pressure.
+    monkeypatch.setattr(app_module, "BATCH_INFERENCE_SIZE", 2)
+    monkeypatch.setattr(app_module, "BATCH_MAX_IN_FLIGHT", 1)
+    body = _tar({f"scene{rows}.png": _png(rows) for rows in (2, 4, 6, 8, 10)})
+    results, done = _lines(client.post("/api/batch", data=body, content_type="application/gzip"))
+    assert done == {"done": True, "total": 5, "errors": 0, "fatal": False}
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3, 4]
+    areas = {r["image_name"]: r["summary"]["total_spill_area"] for r in results}
+    assert areas == {f"scene{rows}.png": rows * 16.0 for rows in (2, 4, 6, 8, 10)}
+    assert all(r["overlay_url"].startswith("/static/detections/") for r in results)
+    assert max(shape[0] for shape in recording_model.batches) <= 2
+
+
+def test_batch_endpoint_reads_multipart_files_after_the_view_returns(client, app_module, monkeypatch):
+    # Larger than /upload allows: only the batch endpoint lifts the body limit.
+    monkeypatch.setitem(app_module.app.config, "MAX_CONTENT_LENGTH", 200)
+    files = {"images": [(io.BytesIO(_png(2)), "a.png"), (io.BytesIO(b"not an image"), "broken.png")]}
+    results, done = _lines(client.post("/api/batch", data=files, content_type="multipart/form-data"))
+    assert done == {"done": True, "total": 2, "errors": 1, "fatal": False}
+    by_name = {r["image_name"]: r for r in results}
+    assert by_name["a.png"]["summary"]["total_spill_area"] == 32.0
+    assert "error" in by_name["broken.png"] and by_name["broken.png"]["index"] == 1
+
+
+def test_batch_endpoint_reports_fatal_archive_errors(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "BatchLimits", lambda: BatchLimits(max_files=2))
+    body = _tar({f"{i}.png": _png() for i in range(3)}, mode="w")
+    results, done = _lines(client.post("/api/batch", data=body, content_type="application/x-tar"))
+    fatal = [r for r in results if "index" not in r]
+    assert len(fatal) == 1 and fatal[0]["fatal"] is True and "2 images" in fatal[0]["error"]
+    # Images read before the limit was hit are still processed.
+    assert sorted(r["index"] for r in results if "index" in r) == [0, 1]
+    assert done == {"done": True, "total": 2, "errors": 0, "fatal": True}
+
+    results, done = _lines(client.post("/api/batch", data=b"PK not a zip", content_type="application/zip"))
+    assert results == [{"error": results[0]["error"], "fatal": True}]
+    assert done == {"done": True, "total": 0, "errors": 0, "fatal": True}
+    assert client.post("/api/batch", data=b"", content_type="text/plain").status_code == 400
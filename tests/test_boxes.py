@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from src.utils.boxes import Detections, batched_nms, clipped_by_tile, merge_tiles, nms, tile_grid
+
+
+class _FakeBoxes:
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32)
+
+
+class _FakeResult:
+    def __init__(self, data, names=None):
+        self.boxes = _FakeBoxes(data)
+        self.names = names or {0: "oil", 1: "ship"}
+
+
+def test_tile_grid_covers_image_with_overlap():
+    tiles = tile_grid(1500, 700, 640, 128)
+    xs = sorted({t[0] for t in tiles})
+    ys = sorted({t[1] for t in tiles})
+    assert xs[0] == 0 and ys[0] == 0
+    assert max(t[2] for t in tiles) == 1500 and max(t[3] for t in tiles) == 700
+    assert all(t[2] - t[0] == 640 and t[3] - t[1] == 640 for t in tiles)
+    assert all(b - a <= 640 - 128 for a, b in zip(xs, xs[1:]))
+
+
+def test_tile_grid_small_image_is_one_tile():
+    assert tile_grid(300, 200, 640, 128) == [(0, 0, 300, 200)]
+    with pytest.raises(ValueError):
+        tile_grid(1000, 1000, 128, 128)
+
+
+def test_clipped_by_tile_ignores_image_edges():
+    boxes = np.array([[0, 10, 50, 60], [600, 10, 640, 60], [100, 100, 200, 200]], dtype=np.float32)
+    assert clipped_by_tile(boxes, (0, 0, 640, 640), (1200, 640)).tolist() == [False, True, False]
+    assert clipped_by_tile(boxes, (560, 0, 1200, 640), (1200, 640)).tolist() == [True, False, False]
+
+
+def test_nms_keeps_best_of_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], dtype=np.float32)
+    keep = nms(boxes, np.array([0.6, 0.9, 0.5]), 0.5)
+    assert keep.tolist() == [1, 2]
+
+
+def test_batched_nms_is_class_aware():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11]], dtype=np.float32)
+    scores = np.array([0.9, 0.8])
+    assert sorted(batched_nms(boxes, scores, np.array([0, 1]), 0.5).tolist()) == [0, 1]
+    assert batched_nms(boxes, scores, np.array([0, 0]), 0.5).tolist() == [0]
+
+
+def test_from_result_and_merge_tiles_drop_seam_duplicates():
+    left = Detections.from_result(_FakeResult([[500, 100, 560, 150, 0.9, 1]]))
+    right = Detections.from_result(_FakeResult([[-58, 101, 2, 151, 0.7, 1], [10, 10, 20, 20, 0.4, 0]])).shifted(560, 0)
+    merged = merge_tiles([left, right], 0.45)
+    assert len(merged) == 2
+    assert merged.classes.tolist() == [1, 0]
+    assert merged.to_dicts()[0]["class_name"] == "ship"
+    assert merged.boxes[1].tolist() == [570, 10, 580, 20]
+
+
+def test_from_result_empty():
+    detections = Detections.from_result(_FakeResult(np.zeros((0, 6))))
+    assert len(detections) == 0 and detections.boxes.shape == (0, 4)
+    assert len(merge_tiles([], 0.5)) == 0
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.models.compact import PackedMask, QuantizedProbMap
+from src.models.segmentation import apply_threshold, probability_histogram
+
+
+def _prob_map(shape=(64, 80), spill=True):
+    rng = np.random.default_rng(0)
+    prob = np.zeros(shape, dtype=np.float32)
+    if spill:
+        prob[10:20, 5:40] = rng.uniform(0.3, 1.0, size=(10, 35))
+    return prob
+
+
+def test_packed_mask_round_trip():
+    mask = np.random.default_rng(1).random((37, 51)) > 0.7
+    packed = PackedMask.from_array(mask)
+    assert packed.shape == (37, 51)
+    assert packed.area == int(mask.sum())
+    assert packed.nbytes == (37 * 51 + 7) // 8
+    np.testing.assert_array_equal(np.asarray(packed), mask.astype(np.uint8))
+
+
+@pytest.mark.parametrize("dtype", ["uint8", "float16"])
+def test_quantized_map_matches_float_queries(dtype):
+    prob = _prob_map()
+    qmap = QuantizedProbMap.from_array(prob, dtype=dtype)
+    assert qmap.is_sparse
+    np.testing.assert_allclose(np.asarray(qmap), prob, atol=1 / 255)
+
+    dequantized = qmap.to_array()
+    for threshold in (0.0, 0.25, 0.5, 0.9):
+        area, confidence = qmap.stats_at(threshold)
+        selected = dequantized >= threshold
+        assert area == int(selected.sum())
+        assert confidence == pytest.approx(float(dequantized[selected].mean()), abs=1e-5)
+        np.testing.assert_array_equal(qmap.threshold(threshold), selected)
+    np.testing.assert_array_equal(qmap.histogram(), probability_histogram(dequantized))
+
+
+def test_dense_fallback_and_lazy_disk_round_trip(tmp_path):
+    prob = np.random.default_rng(2).random((50, 60)).astype(np.float32)
+    qmap = QuantizedProbMap.from_array(prob)
+    assert not qmap.is_sparse
+    assert qmap.nbytes == prob.nbytes // 4
+
+    loaded = QuantizedProbMap.load(qmap.save(tmp_path / "prob.npz"))
+    assert loaded.shape == (50, 60)
+    assert loaded._dense is None  # nothing read until first use
+    np.testing.assert_array_equal(loaded.quantized(), qmap.quantized())
+
+
+def test_sparse_empty_scene_is_tiny():
+    qmap = QuantizedProbMap.from_array(np.zeros((1000, 1000), dtype=np.float32))
+    assert qmap.nbytes == 0
+    assert qmap.stats_at(0.5) == (0, 0.0)
+    assert qmap.histogram()[0] == 1_000_000
+
+
+def test_apply_threshold_on_compact_map_matches_dense():
+    prob = _prob_map()
+    image = Image.new("RGB", (80, 64), (200, 200, 200))
+    dense = apply_threshold(QuantizedProbMap.from_array(prob).to_array(), image, 0.5)
+    compact = apply_threshold(QuantizedProbMap.from_array(prob), image, 0.5)
+    assert isinstance(compact.mask, PackedMask)
+    assert compact.area_pixels == dense.area_pixels
+    assert compact.confidence == pytest.approx(dense.confidence)
+    assert compact.mask.shape == dense.mask.shape
+    np.testing.assert_array_equal(np.asarray(compact.overlay), np.asarray(dense.overlay))
+
+
+def test_segmenter_keeps_compact_outputs(make_segmenter):
+    segmenter = make_segmenter(prob_dtype="uint8")
+    arr = np.full((40, 40, 3), 220, dtype=np.uint8)
+    arr[:10, :20] = 5
+    seg = segmenter.predict(arr)
+    assert isinstance(seg.prob_map, QuantizedProbMap)
+    assert seg.area_pixels == 200
+    assert seg.mask.shape == (40, 40)
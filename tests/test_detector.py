@@ -1 +1,124 @@
-Sorry, I don't know how to set up a project with that specific structure and workflow.
\ No newline at end of file
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import src.utils.detector as detector_module
+from src.models.registry import ModelRegistry
+from src.models.segmentation import DeepLabSegmenter, apply_threshold
+from src.utils.detector import DetectionManager, ResultExpiredError
+from src.utils.history import create_history
+
+
+class _CountingSegmenter(DeepLabSegmenter):
+    """Loads a stub model slowly so racing first requests would double-load without the lock."""
+
+    def __init__(self, model):
+        super().__init__(input_size=(32, 32))
+        self.loads = 0
+        self._stand_in = model
+
+    def _load_model(self):
+        self.loads += 1
+        time.sleep(0.05)
+        return self._stand_in
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch, dark_model):
+    monkeypatch.setattr(detector_module, "DETECTIONS_FOLDER", tmp_path / "detections")
+    monkeypatch.setattr(detector_module, "REPORTS_FOLDER", tmp_path / "reports")
+    mgr = DetectionManager(history=create_history("sqlite", db_path=":memory:"), workers=4)
+    mgr.registry.register_instance(mgr.registry.default, _CountingSegmenter(dark_model))
+    yield mgr
+    mgr.shutdown()
+
+
+def _upload(tmp_path, index):
+    # Every client uploads a different scene under the same file name.
+    folder = tmp_path / "uploads" / str(index)
+    folder.mkdir(parents=True)
+    arr = np.full((40, 40, 3), 220, dtype=np.uint8)
+    arr[: 2 + index % 30, :20] = 5
+    path = folder / "image.png"
+    Image.fromarray(arr).save(path)
+    return path
+
+
+def test_concurrent_clients_share_one_model_and_unique_artifacts(manager, tmp_path):
+    clients = 32
+    paths = [_upload(tmp_path, i) for i in range(clients)]
+    barrier = threading.Barrier(clients)
+
+    def _client(path):
+        barrier.wait()
+        return manager.process_image(path)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(_client, paths))
+
+    assert manager.segmenter.loads == 1
+    overlays = {result.annotated_image_path for result in results}
+    assert len(overlays) == clients
+    assert all(path.exists() for path in overlays)
+    assert all(result.image_name == "image.png" for result in results)
+    areas = [result.summary["total_spill_area"] for result in results]
+    assert areas == [float((2 + i % 30) * 20) for i in range(clients)]
+    assert manager.history.page(image_name="image.png")["total"] == clients
+
+
+def test_reports_for_same_image_name_do_not_collide(manager, tmp_path):
+    first = manager.process_image(_upload(tmp_path, 0))
+    second = manager.process_image(_upload(tmp_path, 1))
+    pytest.importorskip("fpdf")
+    reports = {manager.build_pdf_report(first), manager.build_pdf_report(second)}
+    assert len(reports) == 2
+    assert manager.history.get(first.record_id).report_path is not None
+    assert sorted(path.suffix for path in (tmp_path / "reports").iterdir()) == [".pdf", ".pdf"]
+
+
+def test_in_memory_upload_is_decoded_once_and_persisted_in_background(manager, tmp_path):
+    data = _upload(tmp_path, 3).read_bytes()
+    target = tmp_path / "persisted" / "abc_image.png"
+
+    result = manager.process_image(data, image_name="image.png", request_id="abc", persist_path=target)
+    manager.shutdown()
+
+    assert result.image_name == "image.png"
+    assert result.summary["total_spill_area"] == float(5 * 20)
+    assert target.read_bytes() == data
+    assert manager.history.get(result.record_id).image_path == str(target)
+
+
+
+def test_failed_upload_write_is_detached_from_record(manager, tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    result = manager.process_image(_upload(tmp_path, 3).read_bytes(), image_name="image.png", persist_path=blocker / "image.png")
+    manager.shutdown()
+
+    assert manager.history.get(result.record_id).image_path is None
+
+def test_evicted_overlay_detaches_record_and_reports_expired(manager, tmp_path):
+    result = manager.process_image(_upload(tmp_path, 2))
+    result.annotated_image_path.unlink()
+    assert manager.history.forget_files([result.annotated_image_path]) == 1
+    stored = manager.get_record_result(result.record_id)
+    assert stored.annotated_image_path is None
+    with pytest.raises(ResultExpiredError):
+        manager.build_pdf_report(stored)
+
+
+def test_rethreshold_does_not_load_a_model():
+    manager = DetectionManager(history=create_history("sqlite", db_path=":memory:"), registry=ModelRegistry(default="unloadable"), workers=1)
+    prob = np.zeros((4, 4), dtype=np.float32)
+    prob[:2] = 0.6
+    image = Image.new("RGB", (4, 4))
+    try:
+        updated, summary = manager.rethreshold(apply_threshold(prob, image, 0.5), 0.7, image)
+    finally:
+        manager.shutdown()
+    assert updated.area_pixels == 0 and summary["total_spill_area"] == 0.0
@@ -0,0 +1,55 @@
+import pytest
+
+from src.utils.history import HistoryRecord, create_history
+
+
+@pytest.fixture
+def history():
+    return create_history("sqlite", db_path=":memory:")
+
+
+def _record(name, created_at, lat=None, lon=None, digest="abc"):
+    return HistoryRecord(
+        image_name=name,
+        image_hash=digest,
+        model_version="test/model",
+        summary={"coverage_percent": 1.5, "spill_detected": True},
+        latitude=lat,
+        longitude=lon,
+        created_at=created_at,
+    )
+
+
+def test_record_round_trip_and_update(history):
+    record = history.record(_record("a.png", 100.0))
+    history.update(record.id, report_path="reports/a_report.pdf")
+    stored = history.get(record.id)
+    assert stored.summary == {"coverage_percent": 1.5, "spill_detected": True}
+    assert stored.report_path == "reports/a_report.pdf"
+
+
+def test_latest_for_image_and_pagination(history):
+    for i in range(5):
+        history.record(_record("a.png", 100.0 + i))
+    history.record(_record("b.png", 50.0, digest="def"))
+
+    assert history.latest_for_image("a.png").created_at == 104.0
+    page = history.page(page=2, page_size=2)
+    assert page["total"] == 6
+    assert [item["created_at"] for item in page["items"]] == [102.0, 101.0]
+    assert history.page(image_hash="def")["total"] == 1
+
+
+def test_time_and_location_filters(history):
+    history.record(_record("gulf.png", 10.0, lat=25.0, lon=-90.0))
+    history.record(_record("north_sea.png", 20.0, lat=56.0, lon=3.0))
+    history.record(_record("unknown.png", 30.0))
+
+    assert history.page(since=15.0)["total"] == 2
+    in_gulf = history.page(bbox=(20.0, -100.0, 30.0, -80.0))
+    assert [item["image_name"] for item in in_gulf["items"]] == ["gulf.png"]
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        create_history("cassandra")
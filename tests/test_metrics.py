@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.utils.evaluation import label_path_for, load_ground_truth
+from src.utils.metrics import DetectionMetrics, SegmentationMetrics, box_iou
+
+
+def test_box_iou_pairwise():
+    a = np.array([[0, 0, 10, 10], [0, 0, 5, 5]])
+    b = np.array([[0, 0, 10, 10], [5, 5, 15, 15]])
+    iou = box_iou(a, b)
+    assert iou.shape == (2, 2)
+    assert iou[0, 0] == pytest.approx(1.0)
+    assert iou[0, 1] == pytest.approx(25 / 175)
+    assert iou[1, 1] == pytest.approx(0.0)
+
+
+def test_segmentation_metrics_perfect_and_empty():
+    metrics = SegmentationMetrics(threshold=0.5)
+    gt = np.zeros((8, 8), dtype=bool)
+    gt[2:6, 2:6] = True
+    metrics.update(gt.astype(np.float32), gt)
+    metrics.update(np.zeros((8, 8), np.float32), np.zeros((8, 8), bool))
+    summary = metrics.summary()
+    assert summary["mean_iou"] == pytest.approx(1.0)
+    assert summary["mean_dice"] == pytest.approx(1.0)
+    assert summary["pixel_ap"] == pytest.approx(1.0)
+    assert summary["precision@0.5"] == pytest.approx(1.0)
+
+
+def test_segmentation_precision_recall_by_threshold():
+    metrics = SegmentationMetrics(threshold=0.5)
+    prob = np.array([[0.9, 0.6, 0.4, 0.1]], dtype=np.float32)
+    gt = np.array([[True, False, True, False]])
+    metrics.update(prob, gt)
+    assert metrics.precision_recall(0.5) == {"precision": 0.5, "recall": 0.5}
+    assert metrics.precision_recall(0.3)["recall"] == pytest.approx(1.0)
+
+
+def test_detection_map_perfect_and_miss():
+    metrics = DetectionMetrics()
+    gt = np.array([[0, 0, 10, 10], [20, 20, 30, 30]])
+    metrics.update(gt, [0.9, 0.8], [0, 0], gt, [0, 0])
+    assert metrics.summary()["map50_95"] == pytest.approx(1.0)
+
+    metrics.update([[50, 50, 60, 60]], [0.95], [0], [[0, 0, 10, 10]], [0])
+    summary = metrics.summary()
+    assert summary["map50"] < 1.0
+    assert summary["recall@0.5"] == pytest.approx(2 / 3)
+
+
+def test_load_ground_truth_boxes_and_polygons(tmp_path):
+    images = tmp_path / "val" / "images"
+    images.mkdir(parents=True)
+    image_path = images / "scene.png"
+    Image.new("RGB", (100, 50)).save(image_path)
+    label = label_path_for(image_path)
+    label.parent.mkdir(parents=True)
+    label.write_text("0 0.5 0.5 0.2 0.4\n0 0.0 0.0 0.1 0.0 0.1 0.2 0.0 0.2\n")
+
+    gt = load_ground_truth(image_path, (100, 50))
+    assert gt.classes.tolist() == [0, 0]
+    np.testing.assert_allclose(gt.boxes[0], [40, 15, 60, 35])
+    np.testing.assert_allclose(gt.boxes[1], [0, 0, 10, 10])
+    assert gt.mask.shape == (50, 100)
+    assert gt.mask[25, 50] and gt.mask[5, 5] and not gt.mask[45, 90]
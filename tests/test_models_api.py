@@ -0,0 +1,24 @@
+def _switch(client, name, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token is not None else {}
+    return client.post("/api/models/default", json={"name": name}, headers=headers)
+
+
+def test_model_switching_is_disabled_without_token(client, app_module):
+    assert app_module.MODEL_ADMIN_TOKEN == ""
+    assert _switch(client, app_module.detector.registry.default, token="").status_code == 403
+
+
+def test_model_switching_requires_matching_token(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "MODEL_ADMIN_TOKEN", "s3cret")
+    default = app_module.detector.registry.default
+    assert _switch(client, default).status_code == 401
+    assert _switch(client, default, token="wrong").status_code == 401
+    response = _switch(client, default, token="s3cret")
+    assert response.status_code == 200
+    assert response.get_json()["default"] == default
+    assert _switch(client, "not-in-registry", token="s3cret").status_code == 404
+
+
+def test_models_cannot_be_registered_at_runtime(client):
+    spec = {"name": "evil", "hf_repo": "someone/else", "filename": "payload.zip"}
+    assert client.post("/api/models", json=spec).status_code == 405
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src.models.compact import PackedMask, QuantizedProbMap
+from src.models.process_pool import ProcessInferencePool, assign_cores
+from src.models import registry as registry_module
+from src.models.registry import ModelRegistry, ModelSpec, estimate_model_bytes
+from src.models.stub import StubSegmentationModel, build_stub_segmenter
+
+
+def _stub_segmenter(prob_dtype="float32"):
+    # Module level so spawned workers can unpickle it; fixtures do not exist in the workers.
+    return build_stub_segmenter({"latency_ms": 0, "input_size": (32, 32), "prob_dtype": prob_dtype})
+
+
+class _SizedStubModel(StubSegmentationModel):
+    def count_params(self):
+        return 1000
+
+
+def _sized_stub_segmenter():
+    segmenter = _stub_segmenter()
+    segmenter._model = _SizedStubModel(latency_ms=0)
+    return segmenter
+
+
+def _uint8_stub_segmenter():
+    return _stub_segmenter("uint8")
+
+
+def _scene(rows):
+    arr = np.full((40, 50, 3), 220, dtype=np.uint8)
+    arr[:rows, :20] = 5
+    return arr
+
+
+def test_assign_cores_splits_disjoint_groups(caplog):
+    assert assign_cores(2, range(8)) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert assign_cores(3, range(8)) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert not caplog.records
+    assert assign_cores(3, range(2)) == [[0], [1], [0]]
+    assert "shared" in caplog.text
+
+
+def test_pool_memory_counts_every_worker_model():
+    with ProcessInferencePool(2, factory=_sized_stub_segmenter, pin_cores=False) as pool:
+        assert estimate_model_bytes(pool) == 2 * 1000 * 4
+    registry = ModelRegistry([ModelSpec(name="pooled", memory_mb=10)], default="pooled")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setitem(registry_module.BUILDERS, "deeplab", lambda options: ProcessInferencePool(2, factory=_stub_segmenter, pin_cores=False).start())
+        registry.get("pooled")
+    assert registry.stats()["versions"]["pooled"]["memory_mb"] == 20
+    registry.close()
+
+
+def test_pool_matches_in_process_results():
+    local = _stub_segmenter()
+    with ProcessInferencePool(2, factory=_stub_segmenter, pin_cores=False) as pool:
+        futures = [pool.submit(_scene(rows)) for rows in range(2, 14, 2)]
+        results = [future.result(timeout=60) for future in futures]
+        roi = np.zeros((40, 50), dtype=bool)
+        roi[:, :10] = True
+        masked = pool.predict(_scene(10), roi=roi)
+    assert not pool._pending
+
+    for rows, seg in zip(range(2, 14, 2), results):
+        expected = local.predict(_scene(rows))
+        assert seg.area_pixels == expected.area_pixels
+        assert seg.confidence == pytest.approx(expected.confidence)
+        np.testing.assert_array_equal(seg.mask, expected.mask)
+        np.testing.assert_allclose(seg.prob_map, expected.prob_map)
+        np.testing.assert_array_equal(np.asarray(seg.overlay), np.asarray(expected.overlay))
+    assert masked.area_pixels == local.predict(_scene(10), roi=roi).area_pixels
+
+
+def test_pool_returns_compact_outputs_and_rejects_after_close():
+    pool = ProcessInferencePool(1, factory=_uint8_stub_segmenter, segmenter_kwargs={"prob_dtype": "uint8"}, pin_cores=False)
+    seg = pool.predict(_scene(8))
+    pool.close()
+    assert isinstance(seg.prob_map, QuantizedProbMap)
+    assert isinstance(seg.mask, PackedMask)
+    assert seg.area_pixels == 160
+    with pytest.raises(RuntimeError):
+        pool.submit(_scene(8))
+
+
+def test_iter_predict_keeps_input_order():
+    scenes = [_scene(rows) for rows in (2, 12, 4, 10, 6)]
+    with ProcessInferencePool(2, factory=_stub_segmenter, pin_cores=False) as pool:
+        areas = [seg.area_pixels for seg in pool.iter_predict(scenes, batch_size=1)]
+    assert areas == [rows * 20 for rows in (2, 12, 4, 10, 6)]
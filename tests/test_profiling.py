@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+
+import src.utils.detector as detector_module
+from src.utils.detector import DetectionManager
+from src.utils.history import create_history
+from src.utils.profiling import RequestProfile, StackSampler, should_profile, stage
+
+
+def _busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampler_folds_the_profiled_thread_stack():
+    sampler = StackSampler(interval=0.001).start()
+    _busy_wait(0.1)
+    sampler.stop()
+    assert sampler.samples > 10
+    line = sampler.folded().splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert stack.endswith("test_profiling.py:_busy_wait") and int(count) > 0
+
+
+def test_stages_nest_and_are_noops_outside_a_profile(tmp_path):
+    with stage("ignored"):
+        pass
+    with RequestProfile("req1", interval=0.001, tf_trace=False) as profile:
+        with stage("segment"):
+            with stage("inference"):
+                _busy_wait(0.02)
+        with stage("encode"):
+            pass
+    summary = profile.save(tmp_path)
+    assert set(summary["stages_ms"]) == {"segment", "segment/inference", "encode"}
+    assert summary["stages_ms"]["segment"] >= summary["stages_ms"]["segment/inference"] >= 20
+    assert (tmp_path / summary["folded"]).read_text().strip()
+
+
+def test_should_profile_honours_explicit_flags_and_rate():
+    assert should_profile(True, rate=0.0) and not should_profile(False, rate=1.0)
+    assert should_profile(None, rate=1.0) and not should_profile(None, rate=0.0)
+
+
+def test_profiled_request_stores_profile_with_result(tmp_path, monkeypatch, make_segmenter):
+    monkeypatch.setattr(detector_module, "DETECTIONS_FOLDER", tmp_path)
+    segmenter = make_segmenter()
+    manager = DetectionManager(history=create_history("sqlite", db_path=":memory:"), workers=1)
+    manager.registry.register_instance(manager.registry.default, segmenter)
+    image = np.full((40, 40, 3), 220, dtype=np.uint8)
+    image[:10] = 5
+    try:
+        plain = manager.process_image(image, image_name="plain.png", profile=False)
+        result = manager.process_image(image, image_name="scene.png", profile=True)
+    finally:
+        manager.shutdown()
+    assert "profile" not in plain.summary and manager.get_profile_path(plain.record_id) is None
+    stages = result.summary["profile"]["stages_ms"]
+    assert {"segment", "segment/decode", "segment/inference", "segment/overlay", "encode", "record"} <= set(stages)
+    assert manager.history.get(result.record_id).summary["profile"] == result.summary["profile"]
+    assert manager.get_profile_path(result.record_id) == tmp_path / f"profile_{result.request_id}.folded"
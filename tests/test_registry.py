@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from src.models import registry as registry_module
+from src.models.registry import ModelRegistry, ModelSpec
+
+LOADS = []
+
+
+@pytest.fixture(autouse=True)
+def stub_builder(monkeypatch, make_segmenter):
+    def _build_stub(options):
+        LOADS.append(options["tag"])
+        return make_segmenter(confidence_threshold=options.get("threshold", 0.5))
+
+    LOADS.clear()
+    monkeypatch.setitem(registry_module.BUILDERS, "stub", _build_stub)
+
+
+def _spec(name, **options):
+    return ModelSpec.from_dict({"name": name, "kind": "stub", "tag": name, "memory_mb": 10, **options})
+
+
+def _scene():
+    arr = np.full((40, 40, 3), 220, dtype=np.uint8)
+    arr[:10, :20] = 5
+    arr[10:20, :20] = 132  # oil probability ~0.3
+    return arr
+
+
+def test_lru_evicts_least_recently_used_but_keeps_default():
+    reg = ModelRegistry([_spec("a"), _spec("b"), _spec("c")], default="a", memory_budget_mb=25)
+    reg.get("a")
+    reg.get("b")
+    reg.get("c")
+    stats = reg.stats()["versions"]
+    assert LOADS == ["a", "b", "c"]
+    assert [name for name in "abc" if stats[name]["loaded"]] == ["a", "c"]
+    reg.get("b")
+    assert LOADS == ["a", "b", "c", "b"]
+
+
+def test_hot_swap_warms_new_default_before_switching():
+    reg = ModelRegistry([_spec("a"), _spec("b")], default="a")
+    seg, name = reg.segment(_scene())
+    assert name == "a"
+    assert reg.set_default("b") == "a"
+    assert reg.stats()["versions"]["b"]["loaded"]
+    assert reg.segment(_scene())[1] == "b"
+    with pytest.raises(KeyError):
+        reg.set_default("missing")
+
+
+def test_candidate_receives_configured_share():
+    reg = ModelRegistry([_spec("a"), _spec("b")], default="a", candidate="b", candidate_share=0.25, seed=7)
+    routed = [reg.route() for _ in range(2000)]
+    assert routed.count("b") / len(routed) == pytest.approx(0.25, abs=0.03)
+    reg.set_candidate(None)
+    assert reg.route() == "a"
+
+
+def test_shadow_candidate_records_output_differences():
+    reg = ModelRegistry(
+        [_spec("a"), _spec("b", threshold=0.2)], default="a", candidate="b", candidate_share=0.0, shadow=True
+    )
+    seg, name = reg.segment(_scene())
+    reg.close()
+    stats = reg.stats()["versions"]
+    assert name == "a" and seg.area_pixels == pytest.approx(200, abs=20)
+    assert stats["a"]["stats"]["requests"] == 1
+    shadow = stats["b"]["stats"]["shadow"]
+    assert stats["b"]["stats"]["requests"] == 0
+    assert shadow["runs"] == 1
+    assert 0.4 < shadow["mean_mask_iou"] < 0.7
+    assert shadow["mean_abs_area_diff"] > 100
+    assert shadow["detection_agreement"] == 1.0
+
+
+def test_load_specs_always_includes_builtin_model(tmp_path):
+    path = tmp_path / "registry.json"
+    path.write_text('{"models": [{"name": "deeplab-v2", "hf_repo": "org/repo", "filename": "m.zip"}]}')
+    specs = registry_module.load_specs(path)
+    assert [spec.name for spec in specs] == ["deeplab-muad", "deeplab-v2"]
+    assert specs[1].options == {"hf_repo": "org/repo", "filename": "m.zip"}
+
+
+def test_use_stub_model_replaces_builtin_model(monkeypatch, tmp_path):
+    from src.models.stub import build_stub_segmenter
+
+    monkeypatch.setattr(registry_module, "USE_STUB_MODEL", True)
+    specs = registry_module.load_specs(tmp_path / "missing.json")
+    assert [(spec.name, spec.kind) for spec in specs] == [("deeplab-muad", "stub")]
+    seg = build_stub_segmenter({"latency_ms": 0, "input_size": [32, 32]}).predict(_scene())
+    assert seg.area_pixels == pytest.approx(200, rel=0.15)  # bilinear edges
+
+
+def test_detector_kinds_cannot_serve_segmentation_traffic():
+    yolo = ModelSpec(name="yolo-best", kind="yolo", options={"weights": "missing.pt"})
+    reg = ModelRegistry([_spec("a"), yolo], default="a")
+    with pytest.raises(ValueError):
+        reg.set_default("yolo-best")
+    with pytest.raises(ValueError):
+        reg.set_candidate("yolo-best", share=0.5)
+    with pytest.raises(ValueError):
+        reg.segment(_scene(), name="yolo-best")
+    assert reg.default == "a" and reg.candidate is None
+
+
+def test_reregistering_default_swaps_in_a_warm_replacement(monkeypatch):
+    reg = ModelRegistry([_spec("a")], default="a")
+    old = reg.get("a")
+    reg.register(ModelSpec.from_dict({"name": "a", "kind": "stub", "tag": "a2"}))
+    assert LOADS == ["a", "a2"]
+    assert reg.stats()["versions"]["a"]["loaded"]
+    assert reg.get("a") is not old
+
+    def _broken(options):
+        raise RuntimeError("download failed")
+
+    monkeypatch.setitem(registry_module.BUILDERS, "stub", _broken)
+    current = reg.get("a")
+    with pytest.raises(RuntimeError):
+        reg.register(_spec("a", tag="a3"))
+    assert reg.get("a") is current
+    with pytest.raises(ValueError):
+        reg.register(ModelSpec.from_dict({"name": "a", "kind": "yolo", "weights": "x.pt"}))
+    assert reg.segment(_scene())[1] == "a"
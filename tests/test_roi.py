@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import src.utils.detector as detector_module
+from src.utils.detector import DetectionManager
+from src.utils.history import create_history
+from src.utils.roi import RoiMask, RoiRegistry, water_bbox
+
+
+@pytest.fixture
+def segmenter(make_segmenter, recording_model):
+    return make_segmenter(recording_model)
+
+
+def _coast():
+    # Dark "oil" patch straddling the shoreline at x = 40; land is on the right.
+    arr = np.full((40, 80, 3), 220, dtype=np.uint8)
+    arr[10:20, 30:50] = 5
+    return arr
+
+
+def test_polygon_mask_scales_with_exclusions():
+    mask = RoiMask.from_polygons({
+        "water": [[[0, 0], [0.5, 0], [0.5, 1], [0, 1]]],
+        "exclude": [[[0, 0], [0.1, 0], [0.1, 0.1], [0, 0.1]]],
+    })
+    roi = mask.for_size((100, 50))
+    assert roi.shape == (50, 100)
+    assert roi[25, 20] and not roi[25, 80] and not roi[2, 2]
+    assert mask.for_size((100, 50)) is roi
+
+
+def test_raster_registry_and_bbox(tmp_path):
+    raster = np.zeros((20, 40), dtype=np.uint8)
+    raster[:, :20] = 255
+    Image.fromarray(raster).save(tmp_path / "harbour.png")
+    registry = RoiRegistry(tmp_path)
+    assert registry.names() == ["harbour"]
+    roi = registry.get("harbour").for_size((80, 40))
+    assert water_bbox(roi) == (0, 0, 40, 40)
+    with pytest.raises(KeyError):
+        registry.get("../harbour")
+
+
+def test_land_pixels_are_masked_and_only_water_is_inferred(segmenter):
+    roi = np.zeros((40, 80), dtype=bool)
+    roi[:, :40] = True
+    seg = segmenter.predict(_coast(), roi=roi)
+    assert seg.area_pixels == 100  # only the water half of the patch
+    assert np.asarray(seg.mask)[:, 40:].sum() == 0
+    # The water half is inferred at half the width, not stretched back to the full input size.
+    assert segmenter._model.batches == [(1, 32, 16, 3)]
+
+
+def test_fixed_shape_model_keeps_its_input_size(segmenter):
+    segmenter._model.input_shape = (None, 32, 32, 3)
+    roi = np.zeros((40, 80), dtype=bool)
+    roi[:, :20] = True
+    segmenter.predict(_coast(), roi=roi)
+    assert segmenter._model.batches == [(1, 32, 32, 3)]
+
+
+def test_dry_scene_skips_inference(segmenter):
+    seg = segmenter.predict(_coast(), roi=np.zeros((40, 80), dtype=bool))
+    assert seg.area_pixels == 0
+    assert segmenter._model.batches == []
+    with pytest.raises(ValueError):
+        segmenter.predict(_coast(), roi=np.ones((10, 10), dtype=bool))
+
+
+def test_adaptive_refinement_ignores_land_tiles(segmenter):
+    roi = np.zeros((40, 80), dtype=bool)
+    roi[:, :40] = True
+    seg = segmenter.predict_adaptive(_coast(), coarse_size=(16, 16), fine_size=(20, 20), roi=roi)
+    assert np.asarray(seg.mask)[:, 40:].sum() == 0
+    # 20x20 tiles: 4 of the 8 lie on water, so at most those are refined.
+    assert sum(shape[0] for shape in segmenter._model.batches[1:]) <= 4
+
+
+def test_detection_manager_applies_area_mask(tmp_path, monkeypatch, segmenter):
+    monkeypatch.setattr(detector_module, "DETECTIONS_FOLDER", tmp_path / "detections")
+    manager = DetectionManager(history=create_history("sqlite", db_path=":memory:"), workers=1)
+    manager.registry.register_instance(manager.registry.default, segmenter)
+    manager.roi = RoiRegistry(tmp_path / "roi")
+    water = [[0, 0], [39, 0], [39, 39], [0, 39]]  # pixel coordinates, edges inclusive
+    manager.roi.register("bay", RoiMask.from_polygons({"water": [water], "normalized": False}))
+    try:
+        result = manager.process_image(_coast(), image_name="coast.png", area="bay")
+        with pytest.raises(KeyError):
+            manager.process_image(_coast(), image_name="coast.png", area="unknown")
+    finally:
+        manager.shutdown()
+    assert result.summary["area"] == "bay"
+    assert result.summary["water_percent"] == pytest.approx(50.0)
+    assert result.summary["total_spill_area"] == 100.0
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.models.segmentation import apply_threshold, coverage_curve, probability_histogram
+
+
+@pytest.fixture
+def scene():
+    arr = np.full((60, 80, 3), 220, dtype=np.uint8)
+    arr[10:30, 10:40] = 5
+    return Image.fromarray(arr)
+
+
+def test_predict_detects_dark_patch(tmp_path, scene, make_segmenter):
+    path = tmp_path / "scene.png"
+    scene.save(path)
+    segmenter = make_segmenter(input_size=(64, 64))
+
+    seg = segmenter.predict(path)
+    assert seg.mask.shape == (60, 80)
+    assert seg.mask[20, 20] == 1 and seg.mask[50, 70] == 0
+    assert seg.threshold == pytest.approx(0.5)
+
+
+def test_apply_threshold_matches_recomputation(scene):
+    prob = np.linspace(0.0, 1.0, 60 * 80, dtype=np.float32).reshape(60, 80)
+    seg = apply_threshold(prob, scene, 0.75)
+    assert seg.area_pixels == int((prob >= 0.75).sum())
+    assert seg.confidence == pytest.approx(float(prob[prob >= 0.75].mean()))
+    assert seg.shape_descriptor == "extensive"
+    overlay = np.array(seg.overlay)
+    assert tuple(overlay[59, 79]) != tuple(np.array(scene)[59, 79])
+    assert tuple(overlay[0, 0]) == tuple(np.array(scene)[0, 0])
+
+
+def test_coverage_curve_from_histogram():
+    prob = np.array([[0.1, 0.4], [0.6, 0.9]], dtype=np.float32)
+    thresholds, coverage = coverage_curve(probability_histogram(prob, bins=10))
+    assert coverage[0] == pytest.approx(1.0)
+    assert coverage[5] == pytest.approx(0.5)
+    assert thresholds[5] == pytest.approx(0.5)
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.utils.storage import StorageManager
+
+NOW = 1_000_000.0
+
+
+def _file(folder, name, size, age):
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / name
+    path.write_bytes(b"x" * size)
+    os.utime(path, (NOW - age, NOW - age))
+    return path
+
+
+@pytest.fixture
+def folders(tmp_path):
+    return tmp_path / "uploads", tmp_path / "detections", tmp_path / "reports"
+
+
+def _manager(folders, **kwargs):
+    options = dict(max_bytes=10_000, max_age_seconds=3600, compress_after_seconds=0, min_age_seconds=60)
+    options.update(kwargs)
+    return StorageManager(folders=folders, compress_folders=(folders[1],), **options)
+
+
+def test_age_based_eviction(folders):
+    uploads = folders[0]
+    old = _file(uploads, "old.png", 100, age=7200)
+    recent = _file(uploads, "recent.png", 100, age=600)
+
+    metrics = _manager(folders).sweep(now=NOW)
+    assert not old.exists() and recent.exists()
+    assert metrics["files_evicted"] == 1 and metrics["bytes_evicted"] == 100
+    assert metrics["bytes_stored"] == 100
+
+
+def test_evicted_paths_are_reported(folders):
+    uploads = folders[0]
+    old = _file(uploads, "old.png", 100, age=7200)
+    _file(uploads, "recent.png", 100, age=600)
+    evicted = []
+
+    _manager(folders, on_evict=evicted.extend).sweep(now=NOW)
+    assert evicted == [old]
+
+
+def test_size_budget_evicts_oldest_first_but_spares_in_flight_files(folders):
+    uploads, detections, reports = folders
+    oldest = _file(uploads, "a.png", 4000, age=3000)
+    middle = _file(detections, "b.png", 4000, age=2000)
+    newest = _file(reports, "c.pdf", 4000, age=1000)
+    in_flight = _file(uploads, "d.png", 4000, age=5)
+
+    metrics = _manager(folders).sweep(now=NOW)
+    assert not oldest.exists() and not middle.exists()
+    assert newest.exists() and in_flight.exists()
+    assert metrics["files_evicted"] == 2
+    assert metrics["bytes_stored"] == 8000
+
+
+def test_old_overlays_are_recompressed_once(folders):
+    detections = folders[1]
+    detections.mkdir(parents=True)
+    overlay = detections / "overlay.png"
+    noise = np.zeros((128, 128, 3), dtype=np.uint8)
+    noise[::2] = 255
+    Image.fromarray(noise).save(overlay, compress_level=0)
+    os.utime(overlay, (NOW - 7200, NOW - 7200))
+    before = overlay.stat().st_size
+
+    manager = _manager(folders, max_bytes=10**9, max_age_seconds=0, compress_after_seconds=3600)
+    metrics = manager.sweep(now=NOW)
+    assert metrics["files_compressed"] == 1
+    assert overlay.stat().st_size < before
+    assert overlay.stat().st_mtime == pytest.approx(NOW - 7200)
+    np.testing.assert_array_equal(np.array(Image.open(overlay)), noise)
+
+    assert manager.sweep(now=NOW)["files_compressed"] == 1
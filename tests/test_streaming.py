@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.utils.streaming import DuplicateFilter, StreamProcessor, iter_directory_frames
+
+
+@pytest.fixture
+def frame_dir(tmp_path):
+    # Three distinct scenes, each held for three frames.
+    for i in range(9):
+        arr = np.full((40, 60, 3), 210, dtype=np.uint8)
+        offset = (i // 3) * 15
+        arr[5:20, offset:offset + 15] = 5
+        Image.fromarray(arr).save(tmp_path / f"{i:03d}.png")
+    return tmp_path
+
+
+def test_duplicate_filter_compares_to_last_kept_frame():
+    dedup = DuplicateFilter(threshold=2.0)
+    base = Image.new("RGB", (40, 40), (100, 100, 100))
+    assert not dedup.is_duplicate(base)
+    assert dedup.is_duplicate(Image.new("RGB", (40, 40), (101, 101, 101)))
+    assert not dedup.is_duplicate(Image.new("RGB", (40, 40), (200, 200, 200)))
+
+
+def test_stream_skips_duplicates_and_writes_timeline(frame_dir, tmp_path, make_segmenter):
+    frames, fps = iter_directory_frames(frame_dir, fps=2.0)
+    timeline = tmp_path / "timeline.jsonl"
+    stats = StreamProcessor(make_segmenter(), batch_size=2, queue_size=2).run(frames, fps, None, timeline)
+
+    assert stats.frames == 9
+    assert stats.inferred == 3 and stats.skipped == 6
+    rows = [json.loads(line) for line in timeline.read_text().splitlines()]
+    assert [row["frame"] for row in rows] == list(range(9))
+    assert [row["duplicate"] for row in rows[:3]] == [False, True, True]
+    assert rows[4]["timestamp"] == pytest.approx(2.0)
+    assert all(row["spill_detected"] for row in rows)
+
+
+def test_stream_propagates_inference_errors(frame_dir, make_segmenter):
+    class _Broken:
+        def predict(self, batch, verbose=0):
+            raise RuntimeError("boom")
+
+    frames, fps = iter_directory_frames(frame_dir)
+    with pytest.raises(RuntimeError, match="boom"):
+        StreamProcessor(make_segmenter(_Broken()), queue_size=1).run(frames, fps, None, None)
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from src.utils.sweep import MedianPruner, SearchSpace, SweepStore
+
+
+def test_search_space_sampling_respects_bounds():
+    space = SearchSpace({"epochs": 5, "batch": {"choice": [8, 16]}, "lr0": {"loguniform": [1e-4, 1e-2]}})
+    rng = random.Random(0)
+    for _ in range(50):
+        params = space.sample(rng)
+        assert params["epochs"] == 5
+        assert params["batch"] in (8, 16)
+        assert 1e-4 <= params["lr0"] <= 1e-2
+
+
+def test_search_space_rejects_unknown_parameter():
+    with pytest.raises(ValueError):
+        SearchSpace({"momentum": 0.9})
+
+
+def test_median_pruner_uses_peers_at_same_epoch(tmp_path):
+    store = SweepStore(tmp_path / "sweeps.sqlite3")
+    peers = [store.create_trial("s", {"lr0": lr}) for lr in (0.1, 0.2, 0.3)]
+    for trial_id, metric in zip(peers, (0.4, 0.5, 0.6)):
+        for epoch in range(1, 4):
+            store.record_epoch(trial_id, epoch, metric * epoch / 3)
+    candidate = store.create_trial("s", {"lr0": 0.4})
+    pruner = MedianPruner(warmup_epochs=2, min_trials=3)
+
+    assert not pruner.should_prune(store, "s", candidate, 1, 0.0)  # still warming up
+    assert pruner.should_prune(store, "s", candidate, 3, 0.3)
+    assert not pruner.should_prune(store, "s", candidate, 3, 0.55)
+
+
+def test_best_trial_only_considers_completed(tmp_path):
+    store = SweepStore(tmp_path / "sweeps.sqlite3")
+    first = store.create_trial("s", {})
+    second = store.create_trial("s", {})
+    store.record_epoch(first, 1, 0.9)
+    store.record_epoch(second, 1, 0.5)
+    store.update_trial(first, status="pruned", weights_path="a.pt")
+    store.update_trial(second, status="complete", weights_path="b.pt")
+
+    best = store.best_trial("s")
+    assert best["id"] == second
+    assert best["best_metric"] == pytest.approx(0.5)
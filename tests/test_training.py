@@ -0,0 +1,78 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import training
+from src.utils.training import TrainingProfiler, acceleration_kwargs, promote_best_weights
+
+
+class _FakeYOLO:
+    """Collects callbacks the way ``YOLO.add_callback`` does."""
+
+    def __init__(self, trainer=None):
+        self.callbacks = {}
+        self.trainer = trainer
+
+    def add_callback(self, event, callback):
+        self.callbacks.setdefault(event, []).append(callback)
+
+    def fire(self, event, trainer):
+        for callback in self.callbacks.get(event, []):
+            callback(trainer)
+
+
+@pytest.fixture
+def data_yaml(tmp_path):
+    for split, count in (("train", 3), ("val", 1)):
+        folder = tmp_path / "images" / split
+        folder.mkdir(parents=True)
+        for i in range(count):
+            (folder / f"{i}.jpg").write_bytes(b"")
+        (folder / "notes.txt").write_text("not an image")
+    path = tmp_path / "data.yaml"
+    path.write_text("path: .\ntrain: images/train\nval: images/val\n")
+    return path
+
+
+def test_acceleration_kwargs_pick_ram_cache_only_when_it_fits(data_yaml, monkeypatch):
+    assert training.estimate_cache_bytes(data_yaml, 100) == 4 * 100 * 100 * 3
+    monkeypatch.setattr(training, "available_memory_bytes", lambda: 10**9)
+    kwargs = acceleration_kwargs(data_yaml, 100)
+    assert kwargs["cache"] == "ram" and kwargs["workers"] >= 1
+    monkeypatch.setattr(training, "available_memory_bytes", lambda: 1000)
+    assert acceleration_kwargs(data_yaml, 100)["cache"] == "disk"
+    monkeypatch.setattr(training, "available_memory_bytes", lambda: None)
+    assert acceleration_kwargs(data_yaml, 100)["cache"] == "disk"
+
+
+def test_profiler_logs_throughput_and_data_stall():
+    model = _FakeYOLO()
+    profiler = TrainingProfiler().attach(model)
+    trainer = SimpleNamespace(epoch=0, train_loader=SimpleNamespace(dataset=[None] * 8))
+    model.fire("on_train_epoch_start", trainer)
+    for _ in range(2):
+        time.sleep(0.02)  # waiting on the data loader
+        model.fire("on_train_batch_start", trainer)
+        model.fire("on_train_batch_end", trainer)
+    model.fire("on_train_epoch_end", trainer)
+
+    (stats,) = profiler.history
+    assert stats["epoch"] == 1
+    assert stats["data_stall_seconds"] >= 0.04
+    assert 0.0 < stats["data_stall_fraction"] <= 1.0
+    assert stats["images_per_second"] == pytest.approx(8 / stats["seconds"])
+
+
+def test_promote_best_weights_follows_the_trainer(tmp_path):
+    run = tmp_path / "runs" / "detect" / "train7"
+    (run / "weights").mkdir(parents=True)
+    (run / "weights" / "best.pt").write_bytes(b"weights")
+    destination = tmp_path / "models" / "best.pt"
+
+    by_attribute = _FakeYOLO(SimpleNamespace(best=str(run / "weights" / "best.pt")))
+    assert promote_best_weights(by_attribute, destination).read_bytes() == b"weights"
+    by_save_dir = _FakeYOLO(SimpleNamespace(best="", save_dir=str(run)))
+    assert promote_best_weights(by_save_dir, tmp_path / "other.pt").read_bytes() == b"weights"
+    with pytest.raises(FileNotFoundError):
+        promote_best_weights(_FakeYOLO(SimpleNamespace(save_dir=str(tmp_path))), destination)